@@ -0,0 +1,321 @@
+"""Instrumentación de consultas por petición
+
+Cada sesión que entregan PostgresConnection/OracleConnection.get_session
+mide sus consultas (duración, filas, nodo) y el tiempo de adquirir la
+conexión. Las mediciones alimentan histogramas por nodo y ruta (la ruta sale de la
+petición actual, guardada en un ContextVar) y la cabecera Server-Timing
+resume cada petición. Las consultas que
+superan CONSULTA_LENTA_MS se registran en el log de consultas lentas.
+"""
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Umbral del log de consultas lentas (ms) y cuántas se conservan para /instrumentacion
+CONSULTA_LENTA_MS = float(os.getenv('CONSULTA_LENTA_MS', 500))
+MAX_CONSULTAS_LENTAS = int(os.getenv('CONSULTA_LENTA_MAXIMO', 100))
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() == 'true'
+
+# Límites de los buckets de los histogramas (ms y bytes)
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+BUCKETS_FILAS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Ruta de las consultas hechas fuera de una petición (tareas de fondo) y de peticiones sin ruta (404)
+RUTA_FONDO = "(fondo)"
+SIN_RUTA = "(sin ruta)"
+
+
+class Histograma:
+    """Histograma acumulado estilo Prometheus por combinación de etiquetas"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observar(self, valores_etiquetas: tuple, valor: float):
+        serie = self._series.get(valores_etiquetas)
+        if serie is None:
+            # [conteo por bucket..., suma, total]
+            serie = self._series[valores_etiquetas] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def prometheus(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for valores, serie in sorted(self._series.items()):
+            etiquetas = ",".join(f'{k}="{v}"' for k, v in zip(self.etiquetas, valores))
+            for limite, conteo in zip(self.buckets, serie):
+                lineas.append(f'{self.nombre}_bucket{{{etiquetas},le="{limite}"}} {conteo}')
+            lineas.append(f'{self.nombre}_bucket{{{etiquetas},le="+Inf"}} {serie[-1]}')
+            lineas.append(f'{self.nombre}_sum{{{etiquetas}}} {serie[-2]:.3f}')
+            lineas.append(f'{self.nombre}_count{{{etiquetas}}} {serie[-1]}')
+        return lineas
+
+    def resumen(self) -> dict:
+        return {
+            " ".join(valores): {"total": serie[-1], "media": round(serie[-2] / serie[-1], 3) if serie[-1] else None}
+            for valores, serie in sorted(self._series.items())
+        }
+
+
+@dataclass
+class MedicionConsulta:
+    nodo: str
+    operacion: str
+    ms: float
+    filas: int
+    query: str
+
+
+class MedicionPeticion:
+    """Totales de una petición HTTP para la cabecera Server-Timing"""
+
+    def __init__(self, scope: dict):
+        self._scope = scope
+        # nodo -> [ms, consultas, filas]
+        self.por_nodo: Dict[str, list] = defaultdict(lambda: [0.0, 0, 0])
+        self.adquisicion_ms = 0.0
+        self.serializacion_ms = 0.0
+        self.bytes_serializados = 0
+
+    @property
+    def ruta(self) -> str:
+        """Plantilla de la ruta (disponible una vez que el router resolvió la petición)"""
+        return getattr(self._scope.get("route"), "path", None) or SIN_RUTA
+
+    def server_timing(self, total_ms: float) -> str:
+        """Valor de la cabecera Server-Timing: db por nodo, adquisición de conexión y serialización"""
+        partes = [
+            f'db-{nodo};dur={ms:.1f};desc="{consultas} consultas, {filas} filas"'
+            for nodo, (ms, consultas, filas) in self.por_nodo.items()
+        ]
+        if self.adquisicion_ms:
+            partes.append(f"adquisicion;dur={self.adquisicion_ms:.1f}")
+        if self.bytes_serializados:
+            partes.append(f'serializacion;dur={self.serializacion_ms:.1f};desc="{self.bytes_serializados} bytes"')
+        partes.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(partes)
+
+
+_peticion_actual: ContextVar[Optional[MedicionPeticion]] = ContextVar("medicion_peticion", default=None)
+
+
+class Instrumentacion:
+    """Histogramas por nodo y ruta y log de consultas lentas"""
+
+    def __init__(self):
+        self.consulta_ms = Histograma(
+            "db_consulta_duracion_ms", "Duración de cada consulta", ("nodo", "ruta"), BUCKETS_MS
+        )
+        self.consulta_filas = Histograma(
+            "db_consulta_filas", "Filas devueltas o afectadas por consulta", ("nodo", "ruta"), BUCKETS_FILAS
+        )
+        self.adquisicion_ms = Histograma(
+            "db_adquisicion_conexion_ms", "Espera para obtener una conexión", ("nodo", "ruta"), BUCKETS_MS
+        )
+        self.serializacion_ms = Histograma(
+            "http_serializacion_ms", "Tiempo de serializar el cuerpo JSON", ("ruta",), BUCKETS_MS
+        )
+        self.respuesta_bytes = Histograma(
+            "http_respuesta_bytes", "Bytes JSON serializados por respuesta", ("ruta",), BUCKETS_BYTES
+        )
+        self.peticion_ms = Histograma(
+            "http_peticion_duracion_ms", "Duración total de la petición", ("ruta",), BUCKETS_MS
+        )
+        self.consultas_lentas: deque = deque(maxlen=MAX_CONSULTAS_LENTAS)
+
+    def _registrar_consulta(self, consulta: MedicionConsulta, ruta: str):
+        self.consulta_ms.observar((consulta.nodo, ruta), consulta.ms)
+        self.consulta_filas.observar((consulta.nodo, ruta), consulta.filas)
+        if consulta.ms >= CONSULTA_LENTA_MS:
+            query = " ".join(consulta.query.split())[:300]
+            logger.warning(
+                f"🐢 Consulta lenta en {consulta.nodo} ({ruta}): {consulta.ms:.0f} ms, {consulta.filas} filas: {query}"
+            )
+            self.consultas_lentas.append({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "nodo": consulta.nodo,
+                "ruta": ruta,
+                "operacion": consulta.operacion,
+                "ms": round(consulta.ms, 1),
+                "filas": consulta.filas,
+                "query": query,
+            })
+
+    def consulta(self, nodo: str, operacion: str, query: str, ms: float, filas: int):
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            totales = peticion.por_nodo[nodo]
+            totales[0] += ms
+            totales[1] += 1
+            totales[2] += filas
+        self._registrar_consulta(MedicionConsulta(nodo, operacion, ms, filas, query), peticion.ruta if peticion else RUTA_FONDO)
+
+    def espera_compartida(self, nodo: str, ms: float, filas: int):
+        """Espera de una petición por una lectura coalescida (app.services.coalescencia)
+
+        La lectura compartida corre fuera de toda petición; aquí cada petición que
+        la esperó suma su espera a su propio Server-Timing, sin volver a contar la
+        consulta en los histogramas.
+        """
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            totales = peticion.por_nodo[nodo]
+            totales[0] += ms
+            totales[1] += 1
+            totales[2] += filas
+
+    def adquisicion(self, nodo: str, ms: float):
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.adquisicion_ms += ms
+        self.adquisicion_ms.observar((nodo, peticion.ruta if peticion else RUTA_FONDO), ms)
+
+    def serializacion(self, ms: float, bytes_: int):
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.serializacion_ms += ms
+            peticion.bytes_serializados += bytes_
+
+    def cerrar_peticion(self, peticion: MedicionPeticion, total_ms: float):
+        """Registra la serialización y la duración total de una petición terminada"""
+        if peticion.bytes_serializados:
+            self.serializacion_ms.observar((peticion.ruta,), peticion.serializacion_ms)
+            self.respuesta_bytes.observar((peticion.ruta,), peticion.bytes_serializados)
+        self.peticion_ms.observar((peticion.ruta,), total_ms)
+
+    def _histogramas(self):
+        return (
+            self.consulta_ms, self.consulta_filas, self.adquisicion_ms,
+            self.serializacion_ms, self.respuesta_bytes, self.peticion_ms
+        )
+
+    def prometheus(self) -> str:
+        lineas = []
+        for histograma in self._histogramas():
+            lineas += histograma.prometheus()
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self) -> dict:
+        return {
+            "umbral_consulta_lenta_ms": CONSULTA_LENTA_MS,
+            **{h.nombre: h.resumen() for h in self._histogramas()},
+        }
+
+
+instrumentacion = Instrumentacion()
+
+
+class SesionInstrumentada:
+    """Envuelve una sesión y mide execute/ejecutar/stream/fetch_dicts/copy_records
+
+    Con `permiso` (app.database.resiliencia) la latencia de las consultas
+    puntuales alimenta además el SLO del circuito del nodo, salvo con
+    slo=False (lecturas masivas o de fondo, lentas por diseño).
+    """
+
+    def __init__(self, session, nodo: str, permiso=None, slo: bool = True):
+        self._session = session
+        self._nodo = nodo
+        self._permiso = permiso
+        self._slo = slo
+
+    def _observar(self, ms: float):
+        if self._permiso is not None and self._slo:
+            self._permiso.observar(ms)
+
+    async def execute(self, query, params=None):
+        inicio = time.perf_counter()
+        result = await self._session.execute(query, params)
+        ms = (time.perf_counter() - inicio) * 1000
+        instrumentacion.consulta(self._nodo, "execute", query, ms, getattr(result, "rowcount", 0) or 0)
+        self._observar(ms)
+        return result
+
+    async def ejecutar(self, nombre, params=None):
+        inicio = time.perf_counter()
+        result = await self._session.ejecutar(nombre, params)
+        ms = (time.perf_counter() - inicio) * 1000
+        instrumentacion.consulta(self._nodo, "ejecutar", f"[{nombre}]", ms, getattr(result, "rowcount", 0) or 0)
+        self._observar(ms)
+        return result
+
+    async def stream(self, query, params=None, batch_size=1000):
+        inicio = time.perf_counter()
+        filas = 0
+        try:
+            async for lote in self._session.stream(query, params, batch_size):
+                filas += len(lote)
+                yield lote
+        finally:
+            instrumentacion.consulta(self._nodo, "stream", query, (time.perf_counter() - inicio) * 1000, filas)
+
+    async def fetch_dicts(self, query, params=None, preparar_cursor=None):
+        inicio = time.perf_counter()
+        filas = await self._session.fetch_dicts(query, params, preparar_cursor)
+        ms = (time.perf_counter() - inicio) * 1000
+        instrumentacion.consulta(self._nodo, "fetch_dicts", query, ms, len(filas))
+        self._observar(ms)
+        return filas
+
+    async def fetch_dicts_nombre(self, nombre, params=None, preparar_cursor=None):
+        inicio = time.perf_counter()
+        filas = await self._session.fetch_dicts_nombre(nombre, params, preparar_cursor)
+        ms = (time.perf_counter() - inicio) * 1000
+        instrumentacion.consulta(self._nodo, "fetch_dicts", f"[{nombre}]", ms, len(filas))
+        self._observar(ms)
+        return filas
+
+    async def copy_records(self, tabla, columnas, registros):
+        inicio = time.perf_counter()
+        await self._session.copy_records(tabla, columnas, registros)
+        instrumentacion.consulta(
+            self._nodo, "copy", f"COPY {tabla}", (time.perf_counter() - inicio) * 1000, len(registros)
+        )
+
+    def __getattr__(self, nombre):
+        return getattr(self._session, nombre)
+
+
+class MiddlewareInstrumentacion:
+    """Middleware ASGI: abre la medición de la petición, agrega Server-Timing y la vuelca al terminar"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        peticion = MedicionPeticion(scope)
+        token = _peticion_actual.set(peticion)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and SERVER_TIMING:
+                total_ms = (time.perf_counter() - inicio) * 1000
+                mensaje.setdefault("headers", [])
+                mensaje["headers"] = list(mensaje["headers"]) + [
+                    (b"server-timing", peticion.server_timing(total_ms).encode("latin-1", "replace"))
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion_actual.reset(token)
+            instrumentacion.cerrar_peticion(peticion, (time.perf_counter() - inicio) * 1000)
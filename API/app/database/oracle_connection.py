@@ -1,92 +1,171 @@
 import oracledb
 from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import List
+from app.database.pool_registry import pool_registry, oracle_params, lobs_como_valores, CUENCA
+from app.database.sessions import OraclePooledSession, ThreadedSyncSession, run_in_db_executor
+from app.database.sentencias import ORACLE
+from app.database.instrumentacion import SesionInstrumentada, instrumentacion
+from app.database.resiliencia import resiliencia, CONSULTA_TIMEOUT_MS
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Filas por viaje de red en las lecturas de Cuenca
+ORACLE_ARRAYSIZE = int(os.getenv('ORACLE_ARRAYSIZE', 1000))
+ORACLE_PREFETCHROWS = int(os.getenv('ORACLE_PREFETCHROWS', 1000))
+
+
+def _numero_sin_precision(valor: str):
+    """NUMBER declarado sin precisión (p. ej. ids): int si el valor es entero, Decimal exacto si no"""
+    try:
+        return int(valor)
+    except ValueError:
+        return Decimal(valor)
+
+
+def _output_type_handler(cursor, name, default_type, size, precision, scale):
+    """Convierte NUMBER, LOB y DATE en el fetch, sin pasar por Python fila a fila"""
+    if default_type == oracledb.DB_TYPE_NUMBER and precision > 0:
+        # NUMBER(p,s) con decimales es exacto: Decimal, como el numeric de PostgreSQL vía asyncpg
+        return cursor.var(int if scale == 0 else Decimal, arraysize=cursor.arraysize)
+    if default_type == oracledb.DB_TYPE_NUMBER and precision == 0 and scale == -127:
+        # Sin precisión el tipo no dice si es entero: se lee como texto para no perder dígitos
+        return cursor.var(str, arraysize=cursor.arraysize, outconverter=_numero_sin_precision)
+    if default_type in (oracledb.DB_TYPE_CLOB, oracledb.DB_TYPE_NCLOB, oracledb.DB_TYPE_BLOB):
+        return lobs_como_valores(cursor, name, default_type, size, precision, scale)
+    if default_type in (oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP):
+        # Mismo formato que str(datetime) en los nodos PostgreSQL
+        return cursor.var(default_type, arraysize=cursor.arraysize, outconverter=str)
+    return None
+
+
+def preparar_cursor_lectura(cursor):
+    cursor.arraysize = ORACLE_ARRAYSIZE
+    cursor.prefetchrows = ORACLE_PREFETCHROWS
+    cursor.outputtypehandler = _output_type_handler
+
+
+class EstadisticasLectura:
+    """Contadores agregados de las lecturas de Cuenca (en lugar de logs por fila)"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.filas = 0
+        self.duracion_ms = 0.0
+
+    def registrar(self, filas: int, duracion_ms: float):
+        self.consultas += 1
+        self.filas += filas
+        self.duracion_ms += duracion_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "consultas": self.consultas,
+            "filas": self.filas,
+            "duracion_total_ms": round(self.duracion_ms, 1),
+            "arraysize": ORACLE_ARRAYSIZE,
+            "prefetchrows": ORACLE_PREFETCHROWS
+        }
+
+
+estadisticas_lectura = EstadisticasLectura()
+
 class OracleConnection:
     """Manejo de conexiones a Oracle Database"""
     
     def __init__(self):
-        self.connection_params = {
-            "user": os.getenv('ORACLE_USERNAME'),
-            "password": os.getenv('ORACLE_PASSWORD'),
-            "host": os.getenv('ORACLE_HOST'),
-            "port": int(os.getenv('ORACLE_PORT', 1521)),
-            "service_name": os.getenv('ORACLE_SERVICE_NAME')
-        }
+        self.nodo = CUENCA
+        self.connection_params = oracle_params()
         self._connection = None
     
     def get_connection(self):
         """Obtiene una conexión a Oracle"""
+        if self._connection is None or not self._connection:
+            self._connection = self.nueva_conexion()
+        return self._connection
+
+    def nueva_conexion(self):
+        """Abre una conexión a Oracle propia (no compartida con otras sesiones)"""
         try:
-            if self._connection is None or not self._connection:
-                self._connection = oracledb.connect(**self.connection_params)
-                print("✅ CONEXIÓN A ORACLE ESTABLECIDA EXITOSAMENTE")
-                logger.info("Conexión a Oracle establecida exitosamente")
-            return self._connection
+            connection = oracledb.connect(**self.connection_params)
+            logger.info("Conexión a Oracle establecida exitosamente")
+            return connection
         except oracledb.Error as e:
-            print(f"❌ ERROR CONECTANDO A ORACLE: {e}")
             logger.error(f"Error conectando a Oracle: {e}")
             raise Exception(f"Error de conexión a Oracle: {str(e)}")
     
     @asynccontextmanager
-    async def get_session(self):
-        """Context manager para manejo de sesiones Oracle"""
-        connection = None
-        cursor = None
+    async def get_session(self, slo: bool = True):
+        """Context manager para manejo de sesiones Oracle, con control de admisión del nodo
+
+        slo=False para lecturas masivas o de fondo: su latencia no cuenta para el SLO del circuito
+        """
+        async with resiliencia.admitir(self.nodo) as permiso:
+            async with self._sesion(permiso, slo) as session:
+                yield session
+
+    @asynccontextmanager
+    async def _sesion(self, permiso, slo=True):
+        inicio = time.perf_counter()
+        if pool_registry.is_open(self.nodo):
+            # Conexión prestada por el pool: se devuelve al salir, no se cierra
+            async with pool_registry.acquire(self.nodo) as connection:
+                # Timeout de cada llamada al servidor (equivalente al statement_timeout de PostgreSQL)
+                connection.call_timeout = CONSULTA_TIMEOUT_MS
+                instrumentacion.adquisicion(self.nodo, (time.perf_counter() - inicio) * 1000)
+                session = SesionInstrumentada(OraclePooledSession(connection), self.nodo, permiso, slo)
+                try:
+                    yield session
+                except Exception as e:
+                    logger.error(f"Error en sesión Oracle: {e}")
+                    raise
+                finally:
+                    await session.close()
+            return
+
+        # Respaldo sin pool: driver síncrono ejecutado en el pool de hilos, con
+        # una conexión propia de la sesión para que otra sesión concurrente no la cierre
+        connection = await run_in_db_executor(self.nueva_conexion)
+        connection.call_timeout = CONSULTA_TIMEOUT_MS
+        instrumentacion.adquisicion(self.nodo, (time.perf_counter() - inicio) * 1000)
+        session = SesionInstrumentada(ThreadedSyncSession(connection, lowercase_columns=True, motor=ORACLE), self.nodo, permiso, slo)
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            # Wrapper para simular comportamiento async
-            class OracleSessionWrapper:
-                def __init__(self, cursor, connection):
-                    self.cursor = cursor
-                    self.connection = connection
-                
-                async def execute(self, query, params=None):
-                    if params:
-                        if isinstance(params, dict):
-                            # Para parámetros nombrados
-                            self.cursor.execute(query, params)
-                        else:
-                            # Para parámetros posicionales
-                            self.cursor.execute(query, params)
-                    else:
-                        self.cursor.execute(query)
-                    return self.cursor
-                
-                async def commit(self):
-                    self.connection.commit()
-                
-                async def rollback(self):
-                    self.connection.rollback()
-                
-                def fetchall(self):
-                    return self.cursor.fetchall()
-                
-                def fetchone(self):
-                    return self.cursor.fetchone()
-                
-                def fetchmany(self, size):
-                    return self.cursor.fetchmany(size)
-            
-            session = OracleSessionWrapper(cursor, connection)
             yield session
-            
         except Exception as e:
-            if connection:
-                connection.rollback()
+            await session.rollback()
             logger.error(f"Error en sesión Oracle: {e}")
             raise
         finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                connection.close()
+            await run_in_db_executor(self._cerrar, connection)
     
+    async def consultar_dicts(self, query, params=None, slo: bool = True) -> List[dict]:
+        """SELECT en Cuenca con arraysize/prefetch configurados; filas como dicts ya convertidos
+
+        slo=False para listados completos (ver get_session)
+        """
+        inicio = time.perf_counter()
+        async with self.get_session(slo) as session:
+            filas = await session.fetch_dicts(query, params, preparar_cursor_lectura)
+        estadisticas_lectura.registrar(len(filas), (time.perf_counter() - inicio) * 1000)
+        return filas
+
+    async def consultar_sentencia(self, nombre, params=None, slo: bool = True) -> List[dict]:
+        """Igual que consultar_dicts, con una sentencia del registro (app.database.sentencias)"""
+        inicio = time.perf_counter()
+        async with self.get_session(slo) as session:
+            filas = await session.fetch_dicts_nombre(nombre, params, preparar_cursor_lectura)
+        estadisticas_lectura.registrar(len(filas), (time.perf_counter() - inicio) * 1000)
+        return filas
+
+    def _cerrar(self, connection):
+        try:
+            connection.close()
+        except oracledb.Error as e:
+            logger.error(f"Error cerrando conexión Oracle: {e}")
+
     def close(self):
         """Cierra la conexión"""
         if self._connection:
@@ -0,0 +1,232 @@
+import asyncio
+import asyncpg
+import oracledb
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import os
+import time
+import logging
+
+from app.database.resiliencia import CONSULTA_TIMEOUT_MS, ConexionNoDisponible
+from app.database.sentencias import ORACLE_STMTCACHESIZE
+
+logger = logging.getLogger(__name__)
+
+# Nombres lógicos de los nodos distribuidos
+QUITO = "quito"
+GUAYAQUIL = "guayaquil"
+CUENCA = "cuenca"
+
+# db_number usado por PostgresConnection → nombre del nodo
+NODOS_POSTGRES = {1: QUITO, 2: GUAYAQUIL}
+
+
+@dataclass
+class PoolSettings:
+    """Configuración común de los pools (variables de entorno POOL_*)"""
+    min_size: int = 1
+    max_size: int = 10
+    acquire_timeout: float = 10.0
+    connect_timeout: float = 10.0
+    max_inactive_lifetime: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            min_size=int(os.getenv('POOL_MIN_SIZE', 1)),
+            max_size=int(os.getenv('POOL_MAX_SIZE', 10)),
+            acquire_timeout=float(os.getenv('POOL_ACQUIRE_TIMEOUT', 10)),
+            connect_timeout=float(os.getenv('POOL_CONNECT_TIMEOUT', 10)),
+            max_inactive_lifetime=float(os.getenv('POOL_MAX_INACTIVE_LIFETIME', 300)),
+        )
+
+
+@dataclass
+class PoolStats:
+    """Contadores de uso de un pool"""
+    en_uso: int = 0
+    en_espera: int = 0
+    adquisiciones: int = 0
+    fallos: int = 0
+    latencia_total_ms: float = 0.0
+    latencia_max_ms: float = 0.0
+    latencia_ultima_ms: float = 0.0
+
+    def registrar_adquisicion(self, latencia_ms: float):
+        self.adquisiciones += 1
+        self.latencia_total_ms += latencia_ms
+        self.latencia_ultima_ms = latencia_ms
+        self.latencia_max_ms = max(self.latencia_max_ms, latencia_ms)
+
+    def to_dict(self) -> dict:
+        promedio = self.latencia_total_ms / self.adquisiciones if self.adquisiciones else 0.0
+        return {
+            "en_uso": self.en_uso,
+            "en_espera": self.en_espera,
+            "adquisiciones": self.adquisiciones,
+            "fallos_adquisicion": self.fallos,
+            "latencia_adquisicion_ms": {
+                "promedio": round(promedio, 3),
+                "max": round(self.latencia_max_ms, 3),
+                "ultima": round(self.latencia_ultima_ms, 3)
+            }
+        }
+
+
+def postgres_params(db_number: int) -> dict:
+    """Parámetros de conexión de un nodo PostgreSQL según db_number"""
+    prefijo = "POSTGRES" if db_number == 1 else "POSTGRES2"
+    return {
+        "host": os.getenv(f'{prefijo}_HOST'),
+        "port": int(os.getenv(f'{prefijo}_PORT', 5432)),
+        "database": os.getenv(f'{prefijo}_DB'),
+        "user": os.getenv(f'{prefijo}_USERNAME'),
+        "password": os.getenv(f'{prefijo}_PASSWORD'),
+    }
+
+
+def oracle_params() -> dict:
+    """Parámetros de conexión del nodo Oracle (Cuenca)"""
+    return {
+        "user": os.getenv('ORACLE_USERNAME'),
+        "password": os.getenv('ORACLE_PASSWORD'),
+        "host": os.getenv('ORACLE_HOST'),
+        "port": int(os.getenv('ORACLE_PORT', 1521)),
+        "service_name": os.getenv('ORACLE_SERVICE_NAME'),
+        "stmtcachesize": ORACLE_STMTCACHESIZE,
+    }
+
+
+# Fallos al obtener una conexión del pool que significan "nodo no disponible" (no errores de la consulta)
+ERRORES_CONEXION = (asyncio.TimeoutError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError, oracledb.Error)
+
+
+def lobs_como_valores(cursor, name, default_type, size, precision, scale):
+    """CLOB/BLOB como str/bytes: en modo async llegarían como AsyncLOB"""
+    if default_type in (oracledb.DB_TYPE_CLOB, oracledb.DB_TYPE_NCLOB):
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if default_type == oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+    return None
+
+
+class ConexionPostgres(asyncpg.Connection):
+    """Conexión asyncpg que guarda sus sentencias preparadas por nombre"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sentencias = {}
+
+
+class PoolRegistry:
+    """Registro de pools de conexiones por nodo, compartido por todo el proceso"""
+
+    def __init__(self):
+        self.settings = PoolSettings()
+        self._pools = {}
+        self._stats = {}
+
+    def is_open(self, nodo: str) -> bool:
+        return nodo in self._pools
+
+    async def open(self, settings: PoolSettings = None):
+        """Crea los pools de Quito, Guayaquil (asyncpg) y Cuenca (oracledb async)"""
+        self.settings = settings or PoolSettings.from_env()
+        for db_number, nodo in NODOS_POSTGRES.items():
+            await self._open_pool(nodo, self._create_postgres_pool(db_number))
+        await self._open_pool(CUENCA, self._create_oracle_pool())
+
+    async def _open_pool(self, nodo: str, creador):
+        # Un nodo caído no debe impedir que la API arranque
+        try:
+            self._pools[nodo] = await creador
+            self._stats[nodo] = PoolStats()
+            logger.info(f"✅ Pool de conexiones {nodo} creado")
+        except Exception as e:
+            logger.error(f"❌ No se pudo crear el pool de {nodo}: {e}")
+
+    async def _create_postgres_pool(self, db_number: int):
+        return await asyncpg.create_pool(
+            **postgres_params(db_number),
+            min_size=self.settings.min_size,
+            max_size=self.settings.max_size,
+            max_inactive_connection_lifetime=self.settings.max_inactive_lifetime,
+            timeout=self.settings.connect_timeout,
+            # Timeout de cada sentencia; asyncpg cancela la consulta en el servidor al vencer
+            command_timeout=CONSULTA_TIMEOUT_MS / 1000,
+            connection_class=ConexionPostgres,
+        )
+
+    async def _create_oracle_pool(self):
+        # Los LOB se piden como str/bytes en cada conexión prestada (acquire), no con
+        # oracledb.defaults.fetch_lobs, que cambiaría también las conexiones síncronas
+        return oracledb.create_pool_async(
+            **oracle_params(),
+            min=self.settings.min_size,
+            max=self.settings.max_size,
+            increment=1,
+            timeout=int(self.settings.max_inactive_lifetime),
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=int(self.settings.acquire_timeout * 1000),
+            tcp_connect_timeout=self.settings.connect_timeout,
+        )
+
+    async def close(self):
+        """Cierra todos los pools"""
+        for nodo, pool in list(self._pools.items()):
+            try:
+                cierre = pool.close(force=True) if nodo == CUENCA else pool.close()
+                await asyncio.wait_for(cierre, timeout=self.settings.connect_timeout)
+                logger.info(f"Pool de conexiones {nodo} cerrado")
+            except Exception as e:
+                logger.error(f"Error cerrando pool de {nodo}: {e}")
+        self._pools.clear()
+
+    @asynccontextmanager
+    async def acquire(self, nodo: str):
+        """Presta una conexión del pool del nodo y la devuelve al salir"""
+        pool = self._pools[nodo]
+        stats = self._stats[nodo]
+        stats.en_espera += 1
+        inicio = time.perf_counter()
+        try:
+            if nodo == CUENCA:
+                connection = await pool.acquire()
+                connection.outputtypehandler = lobs_como_valores
+            else:
+                connection = await pool.acquire(timeout=self.settings.acquire_timeout)
+        except ERRORES_CONEXION as e:
+            stats.fallos += 1
+            raise ConexionNoDisponible(f"No se pudo obtener conexión del pool {nodo}: {str(e)}")
+        finally:
+            stats.en_espera -= 1
+        stats.registrar_adquisicion((time.perf_counter() - inicio) * 1000)
+
+        stats.en_uso += 1
+        try:
+            yield connection
+        finally:
+            stats.en_uso -= 1
+            await pool.release(connection)
+
+    def stats(self) -> dict:
+        """Estadísticas de cada pool: tamaño, en uso, inactivas, en espera y latencia"""
+        resultado = {}
+        for nodo, pool in self._pools.items():
+            if nodo == CUENCA:
+                tamano, inactivas = pool.opened, pool.opened - pool.busy
+                minimo, maximo = pool.min, pool.max
+            else:
+                tamano, inactivas = pool.get_size(), pool.get_idle_size()
+                minimo, maximo = pool.get_min_size(), pool.get_max_size()
+            resultado[nodo] = {
+                "min_size": minimo,
+                "max_size": maximo,
+                "tamano": tamano,
+                "inactivas": inactivas,
+                **self._stats[nodo].to_dict()
+            }
+        return resultado
+
+
+pool_registry = PoolRegistry()
@@ -1,7 +1,11 @@
-import asyncpg
 import psycopg2
 from contextlib import asynccontextmanager
+from app.database.pool_registry import pool_registry, NODOS_POSTGRES, GUAYAQUIL
+from app.database.sessions import PostgresPooledSession, ThreadedSyncSession, run_in_db_executor
+from app.database.instrumentacion import SesionInstrumentada, instrumentacion
+from app.database.resiliencia import resiliencia, CONSULTA_TIMEOUT_MS
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +16,7 @@ class PostgresConnection:
     def __init__(self, db_number=1):
         # Soporte para múltiples bases PostgreSQL
         self.db_number = db_number
+        self.nodo = NODOS_POSTGRES.get(db_number, GUAYAQUIL)
         if db_number == 1:
             self.host = os.getenv('POSTGRES_HOST')
             self.port = os.getenv('POSTGRES_PORT', 5432)
@@ -33,6 +38,12 @@ class PostgresConnection:
     
     def get_sync_connection(self):
         """Obtiene una conexión síncrona a PostgreSQL"""
+        if self._connection is None or self._connection.closed:
+            self._connection = self.nueva_conexion_sync()
+        return self._connection
+
+    def nueva_conexion_sync(self):
+        """Abre una conexión síncrona propia (no compartida con otras sesiones)"""
         try:
             # Verificar que tenemos todas las credenciales
             if not all([self.host, self.database, self.username, self.password]):
@@ -43,72 +54,67 @@ class PostgresConnection:
                 if not self.password: missing.append(f'POSTGRES{"2" if self.db_number == 2 else ""}_PASSWORD')
                 raise Exception(f"Variables de entorno faltantes: {', '.join(missing)}")
             
-            if self._connection is None or self._connection.closed:
-                self._connection = psycopg2.connect(
-                    host=self.host,
-                    port=self.port,
-                    database=self.database,
-                    user=self.username,
-                    password=self.password
-                )
-                print(f"✅ CONEXIÓN A POSTGRESQL {self.db_number} ESTABLECIDA EXITOSAMENTE")
-                logger.info(f"Conexión a PostgreSQL {self.db_number} establecida")
-            return self._connection
+            connection = psycopg2.connect(
+                host=self.host,
+                port=self.port,
+                database=self.database,
+                user=self.username,
+                password=self.password,
+                options=f"-c statement_timeout={CONSULTA_TIMEOUT_MS}"
+            )
+            logger.info(f"Conexión a PostgreSQL {self.db_number} establecida")
+            return connection
         except psycopg2.Error as e:
-            print(f"❌ ERROR CONECTANDO A POSTGRESQL {self.db_number}: {e}")
             logger.error(f"Error conectando a PostgreSQL {self.db_number}: {e}")
             raise Exception(f"Error de conexión a PostgreSQL {self.db_number}: {str(e)}")
     
     @asynccontextmanager
-    async def get_session(self):
-        """Context manager para manejo de sesiones PostgreSQL"""
-        connection = None
-        cursor = None
+    async def get_session(self, slo: bool = True):
+        """Context manager para manejo de sesiones PostgreSQL, con control de admisión del nodo
+
+        slo=False para lecturas masivas o de fondo: su latencia no cuenta para el SLO del circuito
+        """
+        async with resiliencia.admitir(self.nodo) as permiso:
+            async with self._sesion(permiso, slo) as session:
+                yield session
+
+    @asynccontextmanager
+    async def _sesion(self, permiso, slo=True):
+        inicio = time.perf_counter()
+        if pool_registry.is_open(self.nodo):
+            # Conexión prestada por el pool: se devuelve al salir, no se cierra
+            async with pool_registry.acquire(self.nodo) as connection:
+                instrumentacion.adquisicion(self.nodo, (time.perf_counter() - inicio) * 1000)
+                session = SesionInstrumentada(PostgresPooledSession(connection), self.nodo, permiso, slo)
+                try:
+                    yield session
+                except Exception as e:
+                    logger.error(f"Error en sesión PostgreSQL {self.db_number}: {e}")
+                    raise
+                finally:
+                    await session.close()
+            return
+
+        # Respaldo sin pool: driver síncrono ejecutado en el pool de hilos, con
+        # una conexión propia de la sesión para que otra sesión concurrente no la cierre
+        connection = await run_in_db_executor(self.nueva_conexion_sync)
+        instrumentacion.adquisicion(self.nodo, (time.perf_counter() - inicio) * 1000)
+        session = SesionInstrumentada(ThreadedSyncSession(connection, named_cursors=True), self.nodo, permiso, slo)
         try:
-            connection = self.get_sync_connection()
-            cursor = connection.cursor()
-            
-            # Wrapper para simular comportamiento async
-            class PostgresSessionWrapper:
-                def __init__(self, cursor, connection):
-                    self.cursor = cursor
-                    self.connection = connection
-                
-                async def execute(self, query, params=None):
-                    if params:
-                        self.cursor.execute(query, params)
-                    else:
-                        self.cursor.execute(query)
-                    return self.cursor
-                
-                async def commit(self):
-                    self.connection.commit()
-                
-                async def rollback(self):
-                    self.connection.rollback()
-                
-                def fetchall(self):
-                    return self.cursor.fetchall()
-                
-                def fetchone(self):
-                    return self.cursor.fetchone()
-                
-                def fetchmany(self, size):
-                    return self.cursor.fetchmany(size)
-            
-            session = PostgresSessionWrapper(cursor, connection)
             yield session
-            
         except Exception as e:
-            if connection:
-                connection.rollback()
+            await session.rollback()
             logger.error(f"Error en sesión PostgreSQL: {e}")
             raise
         finally:
-            if cursor:
-                cursor.close()
-            if connection:
+            await run_in_db_executor(self._cerrar, connection)
+
+    def _cerrar(self, connection):
+        try:
+            if not connection.closed:
                 connection.close()
+        except Exception as e:
+            logger.error(f"Error cerrando conexión PostgreSQL {self.db_number}: {e}")
     
     def close(self):
         """Cierra la conexión"""
@@ -0,0 +1,276 @@
+"""Control de admisión y circuit breaker por nodo
+
+Cada sesión que entregan PostgresConnection/OracleConnection.get_session
+pasa antes por el circuito de su nodo:
+
+- un limitador de concurrencia con una cola de espera acotada (si la cola
+  está llena o la espera supera RESILIENCIA_ESPERA_MAXIMA se rechaza);
+- un circuit breaker que se abre tras CIRCUITO_FALLOS fallos seguidos del
+  nodo (conexión, timeout) o CIRCUITO_LENTAS consultas seguidas por encima
+  de CIRCUITO_SLO_MS, rechaza todo durante CIRCUITO_APERTURA segundos y
+  luego deja pasar una sesión de prueba (semiabierto).
+
+Los rechazos lanzan NodoNoDisponible, que la API responde con 503 y
+Retry-After. Así un nodo degradado no acapara las peticiones de los otros dos.
+Las consultas además tienen un timeout (CONSULTA_TIMEOUT_MS).
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import math
+import os
+import time
+import logging
+
+import asyncpg
+import oracledb
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Timeout de cada sentencia (ms)
+CONSULTA_TIMEOUT_MS = int(os.getenv('CONSULTA_TIMEOUT_MS', 30000))
+# Sesiones simultáneas por nodo, sesiones en espera como máximo y espera máxima (s)
+RESILIENCIA_CONCURRENCIA = int(os.getenv('RESILIENCIA_CONCURRENCIA', 8))
+RESILIENCIA_COLA = int(os.getenv('RESILIENCIA_COLA', 16))
+RESILIENCIA_ESPERA_MAXIMA = float(os.getenv('RESILIENCIA_ESPERA_MAXIMA', 5))
+# Retry-After sugerido cuando se rechaza por la cola (s)
+RESILIENCIA_REINTENTO = int(os.getenv('RESILIENCIA_REINTENTO', 2))
+# Circuit breaker: fallos seguidos, SLO de latencia (ms), consultas lentas seguidas y segundos abierto
+CIRCUITO_FALLOS = int(os.getenv('CIRCUITO_FALLOS', 5))
+CIRCUITO_SLO_MS = float(os.getenv('CIRCUITO_SLO_MS', 2000))
+CIRCUITO_LENTAS = int(os.getenv('CIRCUITO_LENTAS', 5))
+CIRCUITO_APERTURA = float(os.getenv('CIRCUITO_APERTURA', 30))
+
+# Estados del circuito
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+# Motivos de rechazo
+CIRCUITO_ABIERTO = "circuito_abierto"
+COLA_LLENA = "cola_llena"
+ESPERA_AGOTADA = "espera_agotada"
+
+
+class ConexionNoDisponible(Exception):
+    """El pool del nodo no entregó una conexión a tiempo"""
+
+
+class NodoNoDisponible(Exception):
+    """Sesión rechazada por el control de admisión o el circuit breaker del nodo"""
+
+    def __init__(self, nodo: str, motivo: str, reintentar_en: int):
+        self.nodo = nodo
+        self.motivo = motivo
+        self.reintentar_en = reintentar_en
+        super().__init__(f"Nodo {nodo} no disponible ({motivo}); reintente en {reintentar_en}s")
+
+
+# Errores que indican que el nodo está caído o degradado (no errores de SQL de la petición)
+_FALLOS_DE_NODO = (
+    asyncio.TimeoutError,
+    OSError,
+    ConexionNoDisponible,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.QueryCanceledError,
+    oracledb.OperationalError,
+    psycopg2.OperationalError,
+)
+
+
+def _cadena(e: BaseException):
+    """La excepción y las que la originaron (raise ... from / dentro de un except)"""
+    vistas = set()
+    while e is not None and id(e) not in vistas:
+        vistas.add(id(e))
+        yield e
+        e = e.__cause__ or e.__context__
+
+
+def es_fallo_de_nodo(e: BaseException) -> bool:
+    # El timeout de llamada de Oracle (DPY-4024) llega como DatabaseError genérico
+    return any(isinstance(x, _FALLOS_DE_NODO) or "DPY-4024" in str(x) for x in _cadena(e))
+
+
+def nodo_no_disponible_en(e: BaseException) -> Optional[NodoNoDisponible]:
+    """NodoNoDisponible que originó `e`, aunque un servicio la haya envuelto en otra excepción"""
+    return next((x for x in _cadena(e) if isinstance(x, NodoNoDisponible)), None)
+
+
+class Permiso:
+    """Sesión admitida; recibe la latencia de cada consulta para el SLO"""
+
+    def __init__(self, circuito: "CircuitoNodo"):
+        self._circuito = circuito
+        self.lenta = False
+
+    def observar(self, ms: float):
+        if self._circuito.observar_latencia(ms):
+            self.lenta = True
+
+
+class CircuitoNodo:
+    """Limitador de concurrencia y circuit breaker de un nodo"""
+
+    def __init__(self, nodo: str):
+        self.nodo = nodo
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.lentas_seguidas = 0
+        self.aperturas = 0
+        self.motivo_apertura: Optional[str] = None
+        self.ultima_apertura: Optional[datetime] = None
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._limite = asyncio.Semaphore(RESILIENCIA_CONCURRENCIA)
+        self.en_curso = 0
+        self.en_espera = 0
+        self.admitidas = 0
+        self.rechazos = {CIRCUITO_ABIERTO: 0, COLA_LLENA: 0, ESPERA_AGOTADA: 0}
+
+    def _rechazar(self, motivo: str, reintentar_en: int):
+        self.rechazos[motivo] += 1
+        raise NodoNoDisponible(self.nodo, motivo, reintentar_en)
+
+    def _abrir(self, motivo: str):
+        if self.estado != ABIERTO:
+            self.aperturas += 1
+            logger.warning(f"⚡ Circuito de {self.nodo} abierto por {CIRCUITO_APERTURA}s: {motivo}")
+        self.estado = ABIERTO
+        self.motivo_apertura = motivo
+        self.ultima_apertura = datetime.now()
+        self._abierto_hasta = time.monotonic() + CIRCUITO_APERTURA
+
+    def _cerrar(self):
+        logger.info(f"✅ Circuito de {self.nodo} cerrado")
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.lentas_seguidas = 0
+
+    def _admitir_por_circuito(self) -> bool:
+        """Rechaza si el circuito está abierto; True si la sesión es la prueba del estado semiabierto"""
+        if self.estado == ABIERTO:
+            restante = self._abierto_hasta - time.monotonic()
+            if restante > 0:
+                self._rechazar(CIRCUITO_ABIERTO, math.ceil(restante))
+            self.estado = SEMIABIERTO
+        if self.estado == SEMIABIERTO:
+            if self._prueba_en_curso:
+                self._rechazar(CIRCUITO_ABIERTO, RESILIENCIA_REINTENTO)
+            self._prueba_en_curso = True
+            return True
+        return False
+
+    def observar_latencia(self, ms: float) -> bool:
+        """Registra la latencia de una consulta; True si superó el SLO"""
+        if ms <= CIRCUITO_SLO_MS:
+            self.lentas_seguidas = 0
+            return False
+        self.lentas_seguidas += 1
+        if self.lentas_seguidas >= CIRCUITO_LENTAS and self.estado == CERRADO:
+            self._abrir(f"{self.lentas_seguidas} consultas seguidas sobre {CIRCUITO_SLO_MS:.0f} ms")
+        return True
+
+    def _registrar_fallo(self, e: Exception):
+        self.fallos_seguidos += 1
+        if self.estado == SEMIABIERTO or self.fallos_seguidos >= CIRCUITO_FALLOS:
+            self._abrir(f"{self.fallos_seguidos} fallos seguidos, último: {e}")
+
+    def _registrar_exito(self, permiso: Permiso, prueba: bool):
+        self.fallos_seguidos = 0
+        if prueba and self.estado == SEMIABIERTO:
+            if permiso.lenta:
+                self._abrir(f"la sesión de prueba superó {CIRCUITO_SLO_MS:.0f} ms")
+            else:
+                self._cerrar()
+
+    @asynccontextmanager
+    async def admitir(self):
+        """Espera turno en el limitador del nodo (o rechaza) y registra el resultado de la sesión"""
+        prueba = self._admitir_por_circuito()
+        try:
+            if self.en_espera >= RESILIENCIA_COLA:
+                self._rechazar(COLA_LLENA, RESILIENCIA_REINTENTO)
+            self.en_espera += 1
+            try:
+                await asyncio.wait_for(self._limite.acquire(), RESILIENCIA_ESPERA_MAXIMA)
+            except asyncio.TimeoutError:
+                self._rechazar(ESPERA_AGOTADA, RESILIENCIA_REINTENTO)
+            finally:
+                self.en_espera -= 1
+        except BaseException:
+            if prueba:
+                self._prueba_en_curso = False
+            raise
+
+        self.en_curso += 1
+        self.admitidas += 1
+        permiso = Permiso(self)
+        try:
+            yield permiso
+        except Exception as e:
+            # Un error de SQL de la petición significa que el nodo respondió
+            if es_fallo_de_nodo(e):
+                self._registrar_fallo(e)
+            else:
+                self._registrar_exito(permiso, prueba)
+            raise
+        else:
+            self._registrar_exito(permiso, prueba)
+        finally:
+            self.en_curso -= 1
+            self._limite.release()
+            if prueba:
+                self._prueba_en_curso = False
+
+    def to_dict(self) -> dict:
+        return {
+            "estado": self.estado,
+            "motivo_apertura": self.motivo_apertura,
+            "ultima_apertura": self.ultima_apertura.isoformat() if self.ultima_apertura else None,
+            "reabre_en_s": round(max(0.0, self._abierto_hasta - time.monotonic()), 1) if self.estado == ABIERTO else None,
+            "aperturas": self.aperturas,
+            "fallos_seguidos": self.fallos_seguidos,
+            "lentas_seguidas": self.lentas_seguidas,
+            "en_curso": self.en_curso,
+            "en_espera": self.en_espera,
+            "admitidas": self.admitidas,
+            "rechazos": dict(self.rechazos),
+        }
+
+
+class Resiliencia:
+    """Circuitos por nodo"""
+
+    def __init__(self):
+        self.circuitos: Dict[str, CircuitoNodo] = {}
+
+    def circuito(self, nodo: str) -> CircuitoNodo:
+        circuito = self.circuitos.get(nodo)
+        if circuito is None:
+            circuito = self.circuitos[nodo] = CircuitoNodo(nodo)
+        return circuito
+
+    def admitir(self, nodo: str):
+        return self.circuito(nodo).admitir()
+
+    def to_dict(self) -> dict:
+        return {
+            "configuracion": {
+                "consulta_timeout_ms": CONSULTA_TIMEOUT_MS,
+                "concurrencia_por_nodo": RESILIENCIA_CONCURRENCIA,
+                "cola_por_nodo": RESILIENCIA_COLA,
+                "espera_maxima_s": RESILIENCIA_ESPERA_MAXIMA,
+                "circuito_fallos": CIRCUITO_FALLOS,
+                "circuito_slo_ms": CIRCUITO_SLO_MS,
+                "circuito_lentas": CIRCUITO_LENTAS,
+                "circuito_apertura_s": CIRCUITO_APERTURA,
+            },
+            "nodos": {nodo: circuito.to_dict() for nodo, circuito in self.circuitos.items()},
+        }
+
+
+resiliencia = Resiliencia()
@@ -0,0 +1,145 @@
+"""Registro de sentencias con nombre
+
+El SQL de las rutas calientes vive aquí y los servicios lo usan por nombre
+(session.ejecutar("peliculas.insertar", params)). En PostgreSQL cada
+conexión del pool prepara la sentencia una sola vez y la reutiliza; en
+Oracle el driver la mantiene en su cache de sentencias (stmtcachesize).
+Los contadores distinguen la primera ejecución en una conexión (fallo) de
+las siguientes (acierto).
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import os
+
+# Sentencias en la cache del driver Oracle por conexión
+ORACLE_STMTCACHESIZE = int(os.getenv('ORACLE_STMTCACHESIZE', 50))
+
+POSTGRES = "postgres"
+ORACLE = "oracle"
+
+
+@dataclass(frozen=True)
+class Sentencia:
+    """SQL de una sentencia por motor (PostgreSQL con %s, Oracle con :n)"""
+    nombre: str
+    postgres: Optional[str] = None
+    oracle: Optional[str] = None
+
+    def sql(self, motor: str) -> str:
+        sql = getattr(self, motor)
+        if sql is None:
+            raise ValueError(f"La sentencia {self.nombre} no está definida para {motor}")
+        return sql
+
+
+SENTENCIAS: Dict[str, Sentencia] = {}
+
+
+def registrar(sentencia: Sentencia) -> Sentencia:
+    SENTENCIAS[sentencia.nombre] = sentencia
+    return sentencia
+
+
+def obtener(nombre: str) -> Sentencia:
+    try:
+        return SENTENCIAS[nombre]
+    except KeyError:
+        raise ValueError(f"Sentencia desconocida: {nombre}")
+
+
+_COLUMNAS_PELICULA = "pelicula_id, titulo, genero, clasificacion, director, sinopsis, url_poster, fecha_creacion"
+
+registrar(Sentencia(
+    "peliculas.insertar",
+    postgres="""
+    INSERT INTO peliculas_catalogo (titulo, genero, clasificacion, director, sinopsis, url_poster)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    RETURNING pelicula_id, fecha_creacion
+    """
+))
+registrar(Sentencia(
+    "peliculas.existentes",
+    postgres="SELECT pelicula_id FROM peliculas_catalogo WHERE pelicula_id = ANY(%s)"
+))
+registrar(Sentencia(
+    "peliculas.listar",
+    postgres=f"SELECT {_COLUMNAS_PELICULA} FROM peliculas_catalogo ORDER BY pelicula_id",
+    oracle=f"SELECT {_COLUMNAS_PELICULA} FROM peliculas_catalogo ORDER BY pelicula_id"
+))
+registrar(Sentencia(
+    "promociones.insertar",
+    postgres="""
+    INSERT INTO promociones (codigo_promo, descripcion, descuento_porcentaje, ciudad)
+    VALUES (%s, %s, %s, %s)
+    RETURNING promocion_id, fecha_creacion
+    """
+))
+registrar(Sentencia(
+    "promociones.existentes",
+    postgres="SELECT promocion_id FROM promociones WHERE promocion_id = ANY(%s)"
+))
+registrar(Sentencia(
+    "clientes.pagina",
+    postgres="""
+    SELECT cliente_id, nombre, apellido, email, telefono, direccion, ciudad_registro, fecha_creacion
+    FROM vista_clientes_unificados
+    ORDER BY fecha_creacion DESC NULLS LAST, cliente_id DESC
+    LIMIT %s
+    """
+))
+# NULL se compara como -infinity, que con DESC queda al final igual que NULLS LAST
+registrar(Sentencia(
+    "clientes.pagina_desde",
+    postgres="""
+    SELECT cliente_id, nombre, apellido, email, telefono, direccion, ciudad_registro, fecha_creacion
+    FROM vista_clientes_unificados
+    WHERE (coalesce(fecha_creacion, '-infinity'), cliente_id)
+        < (coalesce(%s::timestamp, '-infinity'::timestamp), %s)
+    ORDER BY fecha_creacion DESC NULLS LAST, cliente_id DESC
+    LIMIT %s
+    """
+))
+
+
+class EstadisticasSentencias:
+    """Aciertos/fallos de la cache de sentencias por motor y nombre
+
+    Solo PostgreSQL mide aciertos reales (sentencias preparadas por conexión).
+    oracledb no expone su cache (stmtcachesize): sus ejecuciones se cuentan
+    como no observables y no entran en ninguna tasa de aciertos.
+    """
+
+    def __init__(self):
+        # [aciertos, fallos, sin_cache, no_observables]
+        self._contadores: Dict[tuple, list] = defaultdict(lambda: [0, 0, 0, 0])
+
+    def registrar(self, motor: str, nombre: str, acierto: Optional[bool]):
+        """acierto=None: ejecutada sin cache (driver síncrono de respaldo)"""
+        contador = self._contadores[(motor, nombre)]
+        contador[0 if acierto else 1 if acierto is False else 2] += 1
+
+    def registrar_no_observable(self, motor: str, nombre: str):
+        """Ejecutada con la cache interna del driver, sin forma de saber si acertó"""
+        self._contadores[(motor, nombre)][3] += 1
+
+    def to_dict(self) -> dict:
+        por_motor: Dict[str, dict] = {}
+        for (motor, nombre), (aciertos, fallos, sin_cache, no_observables) in sorted(self._contadores.items()):
+            resumen = por_motor.setdefault(motor, {"aciertos": 0, "fallos": 0, "sentencias": {}})
+            resumen["aciertos"] += aciertos
+            resumen["fallos"] += fallos
+            resumen["sentencias"][nombre] = {
+                "aciertos": aciertos, "fallos": fallos, "sin_cache": sin_cache, "no_observables": no_observables
+            }
+        for resumen in por_motor.values():
+            medidas = resumen["aciertos"] + resumen["fallos"]
+            resumen["tasa_aciertos"] = round(resumen["aciertos"] / medidas, 4) if medidas else None
+        return {
+            "registradas": sorted(SENTENCIAS),
+            "oracle_stmtcachesize": ORACLE_STMTCACHESIZE,
+            "por_motor": por_motor,
+        }
+
+
+estadisticas_sentencias = EstadisticasSentencias()
@@ -0,0 +1,363 @@
+import asyncio
+import csv
+import functools
+import io
+import itertools
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncpg
+
+from app.database.sentencias import ORACLE, POSTGRES, estadisticas_sentencias, obtener
+
+_PLACEHOLDER = re.compile(r"%s")
+
+# Hilos reservados para los drivers síncronos (psycopg2 / oracledb thick-thin sync)
+_db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('DB_THREADPOOL_SIZE', 8)),
+    thread_name_prefix="db-sync"
+)
+
+
+async def run_in_db_executor(fn, *args, **kwargs):
+    """Ejecuta una llamada bloqueante del driver fuera del event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
+
+
+def adaptar_placeholders(query: str) -> str:
+    """Convierte los parámetros estilo psycopg2 (%s) al estilo asyncpg ($1, $2, ...)"""
+    contador = iter(range(1, query.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(contador)}", query)
+
+
+def es_lectura(query: str) -> bool:
+    """True si la sentencia es un SELECT (no necesita transacción explícita)"""
+    return query.lstrip().upper().startswith("SELECT")
+
+
+class QueryResult:
+    """Resultado materializado de una consulta con la interfaz de un cursor DB-API"""
+
+    def __init__(self, rows, columns=None):
+        self._rows = rows
+        self._pos = 0
+        self.columns = columns or []
+
+    @property
+    def rowcount(self) -> int:
+        return len(self._rows)
+
+    def fetchall(self):
+        if self._pos == 0:
+            self._pos = len(self._rows)
+            return self._rows
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+
+class PostgresPooledSession:
+    """Sesión sobre una conexión asyncpg prestada por el pool
+
+    Igual que psycopg2, las escrituras quedan dentro de una transacción que
+    debe confirmarse con commit(); si no, se revierten al cerrar la sesión.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._transaction = None
+        self._last = QueryResult([])
+
+    async def _iniciar_transaccion(self):
+        if self._transaction is None:
+            self._transaction = self.connection.transaction()
+            await self._transaction.start()
+
+    async def execute(self, query, params=None):
+        if not es_lectura(query):
+            await self._iniciar_transaccion()
+        records = await self.connection.fetch(adaptar_placeholders(query), *(params or ()))
+        self._last = QueryResult(records, list(records[0].keys()) if records else [])
+        return self._last
+
+    async def _preparar(self, nombre, sql):
+        preparadas = self.connection.sentencias
+        preparada = preparadas.get(nombre)
+        estadisticas_sentencias.registrar(POSTGRES, nombre, preparada is not None)
+        if preparada is None:
+            preparada = preparadas[nombre] = await self.connection.prepare(adaptar_placeholders(sql))
+        return preparada
+
+    async def ejecutar(self, nombre, params=None):
+        """Ejecuta una sentencia registrada, preparada una sola vez por conexión del pool"""
+        sql = obtener(nombre).sql(POSTGRES)
+        if not es_lectura(sql):
+            await self._iniciar_transaccion()
+        preparada = await self._preparar(nombre, sql)
+        try:
+            records = await preparada.fetch(*(params or ()))
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # El esquema cambió: se vuelve a preparar (fuera de una transacción, que quedaría abortada)
+            self.connection.sentencias.pop(nombre, None)
+            if self._transaction is not None:
+                raise
+            preparada = await self._preparar(nombre, sql)
+            records = await preparada.fetch(*(params or ()))
+        self._last = QueryResult(records, [a.name for a in preparada.get_attributes()])
+        return self._last
+
+    async def stream(self, query, params=None, batch_size=1000):
+        """Recorre el resultado con un cursor del servidor, en lotes de batch_size filas"""
+        query = adaptar_placeholders(query)
+        if self._transaction is not None:
+            cursor = await self.connection.cursor(query, *(params or ()))
+            while rows := await cursor.fetch(batch_size):
+                yield rows
+            return
+        # Los cursores de asyncpg solo existen dentro de una transacción
+        async with self.connection.transaction(readonly=True):
+            cursor = await self.connection.cursor(query, *(params or ()))
+            while rows := await cursor.fetch(batch_size):
+                yield rows
+
+    async def copy_records(self, tabla, columnas, registros):
+        """COPY binario de registros a la tabla, dentro de la transacción de la sesión"""
+        await self._iniciar_transaccion()
+        await self.connection.copy_records_to_table(tabla, records=registros, columns=columnas)
+
+    async def commit(self):
+        if self._transaction is not None:
+            await self._transaction.commit()
+            self._transaction = None
+
+    async def rollback(self):
+        if self._transaction is not None:
+            await self._transaction.rollback()
+            self._transaction = None
+
+    async def close(self):
+        await self.rollback()
+
+    def fetchall(self):
+        return self._last.fetchall()
+
+    def fetchone(self):
+        return self._last.fetchone()
+
+    def fetchmany(self, size):
+        return self._last.fetchmany(size)
+
+
+class OraclePooledSession:
+    """Sesión sobre una conexión oracledb asíncrona (modo thin) prestada por el pool"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._pendiente = False
+        self._last = QueryResult([])
+
+    async def execute(self, query, params=None):
+        if not es_lectura(query):
+            self._pendiente = True
+        cursor = self.connection.cursor()
+        try:
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            if cursor.description:
+                columns = [d[0].lower() for d in cursor.description]
+                rows = await cursor.fetchall()
+            else:
+                columns, rows = [], []
+        finally:
+            cursor.close()
+        self._last = QueryResult(rows, columns)
+        return self._last
+
+    async def ejecutar(self, nombre, params=None):
+        """Ejecuta una sentencia registrada; el driver la reutiliza desde su cache (stmtcachesize)"""
+        estadisticas_sentencias.registrar_no_observable(ORACLE, nombre)
+        return await self.execute(obtener(nombre).sql(ORACLE), params)
+
+    async def fetch_dicts_nombre(self, nombre, params=None, preparar_cursor=None):
+        """fetch_dicts de una sentencia registrada"""
+        estadisticas_sentencias.registrar_no_observable(ORACLE, nombre)
+        return await self.fetch_dicts(obtener(nombre).sql(ORACLE), params, preparar_cursor)
+
+    async def stream(self, query, params=None, batch_size=1000):
+        """Recorre el resultado en lotes de batch_size filas (arraysize del cursor)"""
+        cursor = self.connection.cursor()
+        cursor.arraysize = batch_size
+        cursor.prefetchrows = batch_size
+        try:
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            while rows := await cursor.fetchmany(batch_size):
+                yield rows
+        finally:
+            cursor.close()
+
+    async def fetch_dicts(self, query, params=None, preparar_cursor=None):
+        """Ejecuta un SELECT y devuelve las filas como dicts, construidos por el cursor"""
+        cursor = self.connection.cursor()
+        try:
+            if preparar_cursor:
+                preparar_cursor(cursor)
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            columns = [d[0].lower() for d in cursor.description]
+            cursor.rowfactory = lambda *row: dict(zip(columns, row))
+            return await cursor.fetchall()
+        finally:
+            cursor.close()
+
+    async def commit(self):
+        await self.connection.commit()
+        self._pendiente = False
+
+    async def rollback(self):
+        if self._pendiente:
+            await self.connection.rollback()
+            self._pendiente = False
+
+    async def close(self):
+        await self.rollback()
+
+    def fetchall(self):
+        return self._last.fetchall()
+
+    def fetchone(self):
+        return self._last.fetchone()
+
+    def fetchmany(self, size):
+        return self._last.fetchmany(size)
+
+
+class ThreadedSyncSession:
+    """Sesión de respaldo sobre un driver síncrono (psycopg2 / oracledb sync)
+
+    Se usa cuando el pool del nodo no está disponible. Cada sentencia se
+    ejecuta y se materializa en el pool de hilos acotado, de modo que una
+    consulta lenta no bloquea el event loop.
+    """
+
+    _cursor_ids = itertools.count(1)
+
+    def __init__(self, connection, lowercase_columns=False, named_cursors=False, motor=POSTGRES):
+        self.connection = connection
+        self._lowercase_columns = lowercase_columns
+        self._named_cursors = named_cursors
+        self._motor = motor
+        self._last = QueryResult([])
+
+    def _execute_sync(self, query, params):
+        cursor = self.connection.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            if cursor.description:
+                columns = [d[0].lower() if self._lowercase_columns else d[0] for d in cursor.description]
+                return QueryResult(cursor.fetchall(), columns)
+            return QueryResult([])
+        finally:
+            cursor.close()
+
+    async def execute(self, query, params=None):
+        self._last = await run_in_db_executor(self._execute_sync, query, params)
+        return self._last
+
+    async def ejecutar(self, nombre, params=None):
+        """Ejecuta una sentencia registrada (el driver síncrono no la prepara)"""
+        estadisticas_sentencias.registrar(self._motor, nombre, None)
+        return await self.execute(obtener(nombre).sql(self._motor), params)
+
+    def _fetch_dicts_sync(self, query, params, preparar_cursor):
+        cursor = self.connection.cursor()
+        try:
+            if preparar_cursor:
+                preparar_cursor(cursor)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            columns = [d[0].lower() if self._lowercase_columns else d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    async def fetch_dicts(self, query, params=None, preparar_cursor=None):
+        """Ejecuta un SELECT en el pool de hilos y devuelve las filas como dicts"""
+        return await run_in_db_executor(self._fetch_dicts_sync, query, params, preparar_cursor)
+
+    async def fetch_dicts_nombre(self, nombre, params=None, preparar_cursor=None):
+        """fetch_dicts de una sentencia registrada"""
+        estadisticas_sentencias.registrar(self._motor, nombre, None)
+        return await self.fetch_dicts(obtener(nombre).sql(self._motor), params, preparar_cursor)
+
+    def _copy_sync(self, tabla, columnas, registros):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(registros)
+        buffer.seek(0)
+        cursor = self.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+    async def copy_records(self, tabla, columnas, registros):
+        """COPY de registros a la tabla (solo psycopg2)"""
+        await run_in_db_executor(self._copy_sync, tabla, columnas, registros)
+
+    async def stream(self, query, params=None, batch_size=1000):
+        """Recorre el resultado en lotes; en PostgreSQL usa un cursor con nombre (del servidor)"""
+        if self._named_cursors:
+            cursor = self.connection.cursor(name=f"stream_{next(self._cursor_ids)}")
+            cursor.itersize = batch_size
+        else:
+            cursor = self.connection.cursor()
+            cursor.arraysize = batch_size
+        try:
+            if params:
+                await run_in_db_executor(cursor.execute, query, params)
+            else:
+                await run_in_db_executor(cursor.execute, query)
+            while rows := await run_in_db_executor(cursor.fetchmany, batch_size):
+                yield rows
+        finally:
+            await run_in_db_executor(cursor.close)
+
+    async def commit(self):
+        await run_in_db_executor(self.connection.commit)
+
+    async def rollback(self):
+        await run_in_db_executor(self.connection.rollback)
+
+    def fetchall(self):
+        return self._last.fetchall()
+
+    def fetchone(self):
+        return self._last.fetchone()
+
+    def fetchmany(self, size):
+        return self._last.fetchmany(size)
@@ -1,19 +1,62 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from dotenv import load_dotenv
+
+# Cargar variables de entorno antes de importar módulos que leen su configuración al importarse
+load_dotenv()
+
+from app.database.pool_registry import pool_registry
+from app.database.instrumentacion import MiddlewareInstrumentacion
+from app.database.resiliencia import NodoNoDisponible, nodo_no_disponible_en
+from app.database.sessions import run_in_db_executor
+from app.services.metricas_replicacion import metricas_replicacion
+from app.services.anti_entropia import anti_entropia
+from app.services.notificaciones import escucha_notificaciones
+from app.services.serializacion import RespuestaJSON, respuesta_json
+from app.services.trabajos import cola_trabajos
+from app.services.salud_nodos import sonda_salud
 from app.routes.clientes_unificados import router as clientes_unificados_router
 from app.routes.empleados_vista_completa import router as empleados_vista_completa_router
 from app.routes.evidencia_replicacion import router as evidencia_replicacion_router
 from app.routes.replicacion_unidireccional import router as replicacion_unidireccional_router
+from app.routes.pools import router as pools_router
+from app.routes.metricas_replicacion import router as metricas_replicacion_router
+from app.routes.consistencia import router as consistencia_router
+from app.routes.cache import router as cache_router
+from app.routes.eventos import router as eventos_router
+from app.routes.carga_masiva import router as carga_masiva_router
+from app.routes.instrumentacion import router as instrumentacion_router
+from app.routes.trabajos import router as trabajos_router
+from app.routes.nodos import router as nodos_router
 
-# Cargar variables de entorno
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea los pools de conexiones al arrancar y los cierra al apagar"""
+    await pool_registry.open()
+    metricas_replicacion.iniciar()
+    anti_entropia.iniciar()
+    escucha_notificaciones.iniciar()
+    cola_trabajos.iniciar()
+    sonda_salud.iniciar()
+    yield
+    await sonda_salud.detener()
+    await cola_trabajos.detener()
+    await escucha_notificaciones.detener()
+    await anti_entropia.detener()
+    await metricas_replicacion.detener()
+    await pool_registry.close()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="API Proyecto IIB - Multi-Database Ecuador",
     description="API para consultas distribuidas: Clientes unificados (fragmentos horizontales), Empleados vista completa (fragmentos verticales), Replicación bidireccional",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Serialización medida por la instrumentación; con orjson si JSON_RAPIDO=true
+    default_response_class=RespuestaJSON
 )
 
 # Configurar CORS
@@ -23,8 +66,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El frontend puede leer los tiempos por nodo
+    expose_headers=["Server-Timing"],
 )
 
+# Tiempos de consultas, conexiones y serialización por petición
+app.add_middleware(MiddlewareInstrumentacion)
+
+def _respuesta_nodo_no_disponible(e: NodoNoDisponible):
+    """503 con Retry-After: el nodo rechazó la sesión (circuito abierto o cola llena)"""
+    return respuesta_json(
+        {"detail": str(e), "nodo": e.nodo, "motivo": e.motivo},
+        status_code=503,
+        headers={"Retry-After": str(e.reintentar_en)}
+    )
+
+@app.exception_handler(NodoNoDisponible)
+async def manejar_nodo_no_disponible(request: Request, e: NodoNoDisponible):
+    return _respuesta_nodo_no_disponible(e)
+
+@app.exception_handler(StarletteHTTPException)
+async def manejar_http_exception(request: Request, e: StarletteHTTPException):
+    # Las rutas convierten cualquier error en 500; si el origen fue un rechazo del nodo se responde 503
+    causa = nodo_no_disponible_en(e) if e.status_code == 500 else None
+    if causa is not None:
+        return _respuesta_nodo_no_disponible(causa)
+    return await http_exception_handler(request, e)
+
 # Incluir routers
 app.include_router(
     clientes_unificados_router,
@@ -50,6 +118,60 @@ app.include_router(
     tags=["Replicación Unidireccional"]
 )
 
+app.include_router(
+    pools_router,
+    prefix="/api/v1",
+    tags=["Pools de Conexiones"]
+)
+
+app.include_router(
+    metricas_replicacion_router,
+    prefix="/api/v1",
+    tags=["Métricas de Replicación"]
+)
+
+app.include_router(
+    consistencia_router,
+    prefix="/api/v1",
+    tags=["Consistencia"]
+)
+
+app.include_router(
+    cache_router,
+    prefix="/api/v1",
+    tags=["Cache"]
+)
+
+app.include_router(
+    eventos_router,
+    prefix="/api/v1",
+    tags=["Eventos"]
+)
+
+app.include_router(
+    carga_masiva_router,
+    prefix="/api/v1",
+    tags=["Carga Masiva"]
+)
+
+app.include_router(
+    instrumentacion_router,
+    prefix="/api/v1",
+    tags=["Instrumentación"]
+)
+
+app.include_router(
+    trabajos_router,
+    prefix="/api/v1",
+    tags=["Trabajos"]
+)
+
+app.include_router(
+    nodos_router,
+    prefix="/api/v1",
+    tags=["Nodos"]
+)
+
 @app.get("/")
 async def root():
     """Endpoint raíz de la API"""
@@ -85,9 +207,9 @@ async def test_oracle_connection():
         from app.database.oracle_connection import OracleConnection
         oracle_conn = OracleConnection()
         
-        # Solo intentar conectar
-        connection = oracle_conn.get_connection()
-        connection.close()
+        # Solo intentar conectar (el driver síncrono corre fuera del event loop)
+        connection = await run_in_db_executor(oracle_conn.get_connection)
+        await run_in_db_executor(connection.close)
         
         return {
             "status": "success", 
@@ -108,9 +230,9 @@ async def test_postgres1_connection():
         from app.database.postgres_connection import PostgresConnection
         postgres_conn = PostgresConnection(db_number=1)
         
-        # Solo intentar conectar
-        connection = postgres_conn.get_sync_connection()
-        connection.close()
+        # Solo intentar conectar (el driver síncrono corre fuera del event loop)
+        connection = await run_in_db_executor(postgres_conn.get_sync_connection)
+        await run_in_db_executor(connection.close)
         
         return {
             "status": "success", 
@@ -131,9 +253,9 @@ async def test_postgres2_connection():
         from app.database.postgres_connection import PostgresConnection
         postgres_conn = PostgresConnection(db_number=2)
         
-        # Solo intentar conectar
-        connection = postgres_conn.get_sync_connection()
-        connection.close()
+        # Solo intentar conectar (el driver síncrono corre fuera del event loop)
+        connection = await run_in_db_executor(postgres_conn.get_sync_connection)
+        await run_in_db_executor(connection.close)
         
         return {
             "status": "success", 
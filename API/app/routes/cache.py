@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from app.services.cache_respuestas import cache_respuestas, TTL_POR_NAMESPACE
+from app.services.coalescencia import coalescedor
+from typing import Optional
+
+router = APIRouter(prefix="/cache", tags=["Cache"])
+
+@router.get("/estadisticas")
+async def get_estadisticas_cache():
+    """Aciertos, fallos, respuestas 304 y tamaño de la cache de respuestas; lecturas coalescidas"""
+    return {**cache_respuestas.estadisticas(), "coalescencia": coalescedor.estadisticas()}
+
+@router.post("/invalidar")
+async def invalidar_cache(namespace: Optional[str] = None):
+    """Vacía la cache de un namespace (clientes, empleados) o completa"""
+    if namespace and namespace not in TTL_POR_NAMESPACE:
+        raise HTTPException(status_code=404, detail=f"Namespace desconocido: {namespace}")
+    borradas = await cache_respuestas.invalidar(namespace)
+    return {"namespace": namespace or "todos", "entradas_borradas": borradas}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.services.carga_masiva import cargar, ENLACES_CARGA, CARGA_MAXIMA, LOTE_MAXIMO, INSERT
+from typing import Literal
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/carga-masiva", tags=["Carga Masiva"])
+
+@router.post("/{enlace}")
+async def carga_masiva(
+    enlace: str,
+    cantidad: int = Query(default=10000, ge=1, le=CARGA_MAXIMA, description="Filas a insertar en el nodo origen"),
+    lote: int = Query(default=10000, ge=1, le=LOTE_MAXIMO, description="Filas por sentencia/commit"),
+    metodo: Literal["insert", "copy"] = Query(default=INSERT, description="INSERT multi-fila con RETURNING o COPY")
+):
+    """📦 CARGA MASIVA: inserta por lotes en el origen del enlace y mide filas/s en origen y réplica
+
+    Responde NDJSON con el progreso de cada lote, el avance de la réplica y un resumen final.
+    Enlaces: guayaquil_quito, quito_cuenca, promociones_quito_guayaquil.
+    """
+    if enlace not in ENLACES_CARGA:
+        raise HTTPException(status_code=404, detail=f"Enlace desconocido: {enlace}")
+
+    async def generar():
+        try:
+            async for evento in cargar(enlace, cantidad, lote, metodo):
+                yield json.dumps(evento, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"❌ Error en carga masiva {enlace}: {e}")
+            yield json.dumps({"tipo": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
@@ -1,15 +1,79 @@
-from fastapi import APIRouter, HTTPException
-from app.services.clientes_unificados_service import ClientesUnificadosService
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.services.clientes_unificados_service import (
+    ClientesUnificadosService, LIMITE_PAGINA, LIMITE_PAGINA_MAXIMO, LOTE_STREAMING
+)
+from app.services.cache_respuestas import cache_respuestas, CLIENTES
+from typing import List, Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/clientes-unificados", tags=["Clientes Unificados"])
 
 @router.get("/", response_model=List[dict])
-async def get_clientes_unificados():
+async def get_clientes_unificados(
+    request: Request,
+    compacto: bool = Query(False, description='Responder {"columnas": [...], "filas": [[...]]} en lugar de un objeto por cliente')
+):
     """Obtiene todos los clientes de las tres ciudades (Cuenca, Quito, Guayaquil)"""
     try:
         service = ClientesUnificadosService()
-        clientes = await service.get_all_clientes_unificados()
-        return clientes
+        return await cache_respuestas.responder(
+            CLIENTES, request, lambda: service.get_all_clientes_unificados(compacto)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/pagina")
+async def get_clientes_unificados_pagina(
+    request: Request,
+    limit: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior")
+):
+    """Página de clientes ordenada por fecha_creacion DESC con cursor opaco"""
+    try:
+        service = ClientesUnificadosService()
+        return await cache_respuestas.responder(
+            CLIENTES, request, lambda: service.get_clientes_pagina(limit, cursor)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/federado")
+async def get_clientes_federados(
+    request: Request,
+    ciudad: Optional[str] = Query(None, description="Quito, Guayaquil o Cuenca; sin valor consulta los tres fragmentos"),
+    limit: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO)
+):
+    """Clientes más recientes consultando directamente los fragmentos necesarios"""
+    try:
+        service = ClientesUnificadosService()
+        return await cache_respuestas.responder(
+            CLIENTES, request, lambda: service.get_clientes_federados(ciudad, limit)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stream")
+async def stream_clientes_unificados(batch_size: int = Query(LOTE_STREAMING, ge=1, le=10000)):
+    """Exporta todos los clientes como NDJSON (un cliente por línea) en memoria constante"""
+    service = ClientesUnificadosService()
+
+    async def generar():
+        try:
+            async for clientes in service.stream_clientes_unificados(batch_size):
+                yield "".join(
+                    json.dumps(c, default=str, ensure_ascii=False) + "\n" for c in clientes
+                )
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error va como última línea
+            logger.error(f"Error en streaming de clientes unificados: {e}")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
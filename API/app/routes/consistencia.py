@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+from app.services.anti_entropia import anti_entropia, COMPARACIONES, INTERVALO_CHEQUEO
+
+router = APIRouter(prefix="/consistencia", tags=["Consistencia"])
+
+@router.get("")
+async def get_consistencia():
+    """🌳 Último chequeo de anti-entropía de peliculas_catalogo (divergencias por par de nodos)"""
+    if anti_entropia.ultimo_resultado is None:
+        return {
+            "comparaciones": {nombre: f"{origen} → {destino}" for nombre, (origen, destino, _) in COMPARACIONES.items()},
+            "ultimo_chequeo": None,
+            "intervalo_s": INTERVALO_CHEQUEO,
+            "mensaje": "Aún no se ha ejecutado ningún chequeo de consistencia" + (
+                "" if INTERVALO_CHEQUEO > 0 else
+                " (chequeo periódico desactivado: configurar CONSISTENCIA_INTERVALO o usar POST /consistencia/verificar)"
+            )
+        }
+    return anti_entropia.ultimo_resultado
+
+@router.post("/verificar")
+async def verificar_consistencia():
+    """Ejecuta ahora el chequeo de anti-entropía entre Quito, Guayaquil y Cuenca"""
+    try:
+        return await anti_entropia.verificar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
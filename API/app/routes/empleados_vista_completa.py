@@ -1,15 +1,94 @@
-from fastapi import APIRouter, HTTPException
-from app.services.empleados_vista_completa_service import EmpleadosVistaCompletaService
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.services.empleados_vista_completa_service import (
+    EmpleadosVistaCompletaService, COLUMNAS_EMPLEADO, LIMITE_PAGINA, LIMITE_PAGINA_MAXIMO, LOTE_STREAMING,
+    MODO_VISTA
+)
+from app.services.cache_respuestas import cache_respuestas, EMPLEADOS
+from typing import List, Literal, Optional
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/empleados-vista-completa", tags=["Empleados Vista Completa"])
 
+# "vista": join dentro de PostgreSQL (Quito); "merge": sort-merge join de los fragmentos en la API
+Modo = Literal["vista", "merge"]
+
 @router.get("/", response_model=List[dict])
-async def get_empleados_vista_completa():
+async def get_empleados_vista_completa(
+    request: Request,
+    ciudad_tienda: Optional[str] = None,
+    cargo: Optional[str] = None,
+    modo: Modo = MODO_VISTA
+):
     """Obtiene empleados con fragmentos verticales unidos (Quito + Guayaquil)"""
     try:
         service = EmpleadosVistaCompletaService()
-        empleados = await service.get_all_empleados_completos()
-        return empleados
+        return await cache_respuestas.responder(
+            EMPLEADOS, request, lambda: service.get_all_empleados_completos(ciudad_tienda, cargo, modo)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/pagina")
+async def get_empleados_vista_completa_pagina(
+    request: Request,
+    limit: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    after_id: Optional[int] = Query(None, description="siguiente_after_id de la página anterior"),
+    ciudad_tienda: Optional[str] = None,
+    cargo: Optional[str] = None,
+    modo: Modo = MODO_VISTA
+):
+    """Página de empleados ordenada por empleado_id, con filtros aplicados en SQL"""
+    try:
+        service = EmpleadosVistaCompletaService()
+        return await cache_respuestas.responder(
+            EMPLEADOS, request, lambda: service.get_empleados_pagina(limit, after_id, ciudad_tienda, cargo, modo)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _lote_csv(empleados: List[dict], encabezado: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNAS_EMPLEADO)
+    if encabezado:
+        writer.writeheader()
+    writer.writerows(empleados)
+    return buffer.getvalue()
+
+@router.get("/stream")
+async def stream_empleados_vista_completa(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    batch_size: int = Query(LOTE_STREAMING, ge=1, le=10000),
+    ciudad_tienda: Optional[str] = None,
+    cargo: Optional[str] = None,
+    modo: Modo = MODO_VISTA
+):
+    """Exporta los empleados como NDJSON o CSV, por lotes y en memoria constante"""
+    service = EmpleadosVistaCompletaService()
+
+    async def generar():
+        primero = True
+        try:
+            async for empleados in service.stream_empleados_completos(batch_size, ciudad_tienda, cargo, modo):
+                if formato == "csv":
+                    yield _lote_csv(empleados, encabezado=primero)
+                else:
+                    yield "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in empleados)
+                primero = False
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error va al final del cuerpo
+            logger.error(f"❌ Error en streaming de empleados: {e}")
+            yield (f"# error: {e}\n" if formato == "csv"
+                   else json.dumps({"error": str(e)}, ensure_ascii=False) + "\n")
+
+    if formato == "csv":
+        return StreamingResponse(
+            generar(), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="empleados.csv"'}
+        )
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.services.bus_eventos import bus_eventos
+from app.services.notificaciones import escucha_notificaciones
+import json
+import os
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+# Cada cuánto se envía un comentario para mantener viva la conexión SSE (segundos)
+KEEPALIVE_SSE = float(os.getenv('EVENTOS_KEEPALIVE', 15))
+
+def _sse(evento: dict) -> str:
+    return f"event: {evento.get('tipo', 'cambio')}\ndata: {json.dumps(evento, default=str, ensure_ascii=False)}\n\n"
+
+@router.get("/stream")
+async def stream_eventos(request: Request):
+    """Server-Sent Events con los cambios notificados por los nodos y su estado de escucha"""
+    suscripcion = bus_eventos.suscribir()
+
+    async def generar():
+        try:
+            # Estado inicial de los listeners para que el cliente pinte los nodos
+            for nodo, conectado in escucha_notificaciones.conectados.items():
+                yield _sse({"tipo": "estado", "nodo": nodo, "escuchando": conectado})
+            while not await request.is_disconnected():
+                evento = await suscripcion.siguiente(timeout=KEEPALIVE_SSE)
+                yield _sse(evento) if evento else ": keepalive\n\n"
+        finally:
+            bus_eventos.cancelar(suscripcion)
+
+    return StreamingResponse(
+        generar(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/estado")
+async def get_estado_eventos():
+    """Estado de los listeners LISTEN/NOTIFY por nodo y del bus de eventos"""
+    return escucha_notificaciones.estado()
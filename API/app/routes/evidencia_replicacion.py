@@ -1,15 +1,27 @@
 from fastapi import APIRouter, HTTPException
+from app.database.pool_registry import QUITO, GUAYAQUIL
+from app.routes.trabajos import encolar_trabajo
 from app.services.promociones_service import PromocionesService
-from typing import Dict
+from app.services.serializacion import respuesta_json
+from app.services.snapshot_columnar import FORMATO_FILAS
+from typing import Dict, Literal
+import functools
 
 router = APIRouter(tags=["Replicación Bidireccional"])
 
 @router.post("/replicacion-bidireccional")
 async def evidenciar_replicacion_bidireccional(
     nodo_para_insertar: str,
-    cantidad_registros: int
+    cantidad_registros: int,
+    incluir_tablas: bool = False,
+    formato_tablas: Literal["filas", "columnar"] = FORMATO_FILAS,
+    esperar: bool = False
 ):
-    """ EVIDENCIA REPLICACIÓN BIDIRECCIONAL: Consulta ambos promociones GYE - UIO ANTES/DESPUÉS de insertar"""
+    """ EVIDENCIA REPLICACIÓN BIDIRECCIONAL: Consulta ambos promociones GYE - UIO ANTES/DESPUÉS de insertar
+    
+    Por defecto devuelve conteos y un diff de claves; incluir_tablas=true agrega las tablas completas.
+    Responde 202 con el id de un trabajo (GET /jobs/{id}); esperar=true devuelve la evidencia en la misma petición.
+    """
     try:
         if nodo_para_insertar not in ["Quito", "Guayaquil"]:
             raise HTTPException(status_code=400, detail="NodoParaInsertar debe ser 'Quito' o 'Guayaquil'")
@@ -18,8 +30,12 @@ async def evidenciar_replicacion_bidireccional(
             raise HTTPException(status_code=400, detail="Cantidad debe estar entre 1 y 50")
             
         service = PromocionesService(nodo_insercion=nodo_para_insertar)
-        evidencia = await service.evidenciar_replicacion_bidireccional(cantidad_registros)
-        return evidencia
+        evidenciar = functools.partial(
+            service.evidenciar_replicacion_bidireccional, cantidad_registros, incluir_tablas, formato_tablas
+        )
+        if not esperar:
+            return encolar_trabajo("replicacion_bidireccional", (QUITO, GUAYAQUIL), evidenciar)
+        return respuesta_json(await evidenciar())
         
     except HTTPException:
         raise
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.database.instrumentacion import instrumentacion
+
+router = APIRouter(prefix="/instrumentacion", tags=["Instrumentación"])
+
+@router.get("")
+async def get_instrumentacion():
+    """⏱️ Consultas por nodo y ruta, adquisición de conexiones y serialización (total y media)"""
+    return instrumentacion.resumen()
+
+@router.get("/consultas-lentas")
+async def get_consultas_lentas():
+    """Últimas consultas que superaron CONSULTA_LENTA_MS"""
+    return {"consultas": list(instrumentacion.consultas_lentas)}
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_instrumentacion_prometheus():
+    """Histogramas por nodo y ruta en formato de texto de Prometheus"""
+    return instrumentacion.prometheus()
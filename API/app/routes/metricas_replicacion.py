@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.services.metricas_replicacion import metricas_replicacion, ENLACES
+from typing import Optional
+
+router = APIRouter(prefix="/replicacion/metricas", tags=["Métricas de Replicación"])
+
+@router.get("")
+async def get_metricas_replicacion():
+    """📏 Lag de replicación por enlace (p50/p95/p99/max sobre una ventana móvil)"""
+    return {
+        "enlaces": metricas_replicacion.resumen()
+    }
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_metricas_prometheus():
+    """Lag de replicación en formato de texto de Prometheus"""
+    return metricas_replicacion.prometheus()
+
+@router.post("/sondear")
+async def sondear_enlaces(
+    enlace: Optional[str] = Query(default=None, description=f"Enlace a sondear: {', '.join(ENLACES)}. Si se omite, se sondean todos")
+):
+    """Escribe una fila sonda en el origen y mide cuánto tarda en verse en el destino"""
+    if enlace is not None and enlace not in ENLACES:
+        raise HTTPException(status_code=400, detail=f"Enlace debe ser uno de: {', '.join(ENLACES)}")
+    try:
+        if enlace is None:
+            return {"sondas": await metricas_replicacion.sondear_todos()}
+        convergencia = await metricas_replicacion.sondear(enlace)
+        return {"sondas": {enlace: convergencia.to_dict()}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from app.services.salud_nodos import sonda_salud
+
+router = APIRouter(prefix="/nodos", tags=["Nodos"])
+
+@router.get("/estado")
+async def get_estado_nodos():
+    """🩺 Estado, latencia y filas estimadas de cada nodo según el último sondeo (servido desde memoria)"""
+    return Response(content=sonda_salud.cuerpo, media_type="application/json")
+
+@router.post("/estado/sondear")
+async def sondear_nodos():
+    """Sondea ahora los tres nodos y devuelve el estado actualizado"""
+    await sonda_salud.sondear()
+    return Response(content=sonda_salud.cuerpo, media_type="application/json")
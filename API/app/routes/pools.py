@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app.database.pool_registry import pool_registry
+from app.database.oracle_connection import estadisticas_lectura
+from app.database.sentencias import estadisticas_sentencias
+from app.database.resiliencia import resiliencia
+
+router = APIRouter(prefix="/pools", tags=["Pools de Conexiones"])
+
+@router.get("/estadisticas")
+async def get_estadisticas_pools():
+    """Estadísticas de los pools de conexiones por nodo (en uso, inactivas, en espera, latencia)"""
+    return {
+        "configuracion": {
+            "min_size": pool_registry.settings.min_size,
+            "max_size": pool_registry.settings.max_size,
+            "acquire_timeout_s": pool_registry.settings.acquire_timeout,
+            "max_inactive_lifetime_s": pool_registry.settings.max_inactive_lifetime
+        },
+        "pools": pool_registry.stats(),
+        "lecturas_cuenca": estadisticas_lectura.to_dict(),
+        "sentencias": estadisticas_sentencias.to_dict(),
+        "resiliencia": resiliencia.to_dict()
+    }
@@ -1,112 +1,186 @@
 from fastapi import APIRouter, HTTPException, Query
+from typing import Literal
+import functools
+from app.database.pool_registry import QUITO, GUAYAQUIL, CUENCA
+from app.routes.trabajos import encolar_trabajo
 from app.services.replicacion_unidireccional_service import ReplicacionUnidireccionalService
 from app.services.replicacion_quito_cuenca_service import ReplicacionQuitoCuencaService
+from app.services.consulta_paralela import consultar_nodos_en_paralelo, errores_por_nodo
+from app.services.convergencia import esperar_replicacion
+from app.services.serializacion import respuesta_json
+from app.services.snapshot_columnar import FORMATO_FILAS, con_formato
+from app.services.trabajos import reportar_progreso
+from app.services.verificacion_claves import leer_claves, claves_de_filas, comparar_claves, COLUMNAS_HASH_PELICULAS
 
 router = APIRouter(prefix="/replicacion-unidireccional", tags=["Replicación Unidireccional"])
 
 @router.post("/quito-cuenca")
 async def replicacion_quito_cuenca(
-    cantidad: int = Query(default=2, ge=1, le=5, description="Cantidad de películas a insertar en Quito")
+    cantidad: int = Query(default=2, ge=1, le=5, description="Cantidad de películas a insertar en Quito"),
+    incluir_tablas: bool = Query(default=False, description="Incluir el contenido completo de ambas tablas antes/después"),
+    formato_tablas: Literal["filas", "columnar"] = Query(default=FORMATO_FILAS, description="Tablas como lista de objetos o por columnas"),
+    esperar: bool = Query(default=False, description="Devolver la evidencia en la misma petición en lugar de un trabajo")
 ):
     """🎬 REPLICACIÓN UNIDIRECCIONAL: Quito → Cuenca (catalogo_peliculas)
     
     - Inserta películas en Quito 
-    - Verifica replicación unidireccional hacia Cuenca
-    - Retorna contenido completo de ambas tablas antes/después
+    - Verifica replicación unidireccional hacia Cuenca comparando claves
+    - Con incluir_tablas retorna contenido completo de ambas tablas antes/después
+    - Responde 202 con el id de un trabajo (GET /jobs/{id}) salvo que esperar=true
     """
+    evidenciar = functools.partial(evidencia_quito_cuenca, cantidad, incluir_tablas, formato_tablas)
+    if not esperar:
+        return encolar_trabajo("replicacion_quito_cuenca", (QUITO, CUENCA), evidenciar)
     try:
-        service = ReplicacionQuitoCuencaService()
-        resultado = await service.evidenciar_replicacion_quito_cuenca(cantidad_peliculas=cantidad)
-        
-        return {
-            "success": True,
-            "message": "Replicación unidireccional Quito → Cuenca completada",
-            "tablas_antes": {
-                "quito_peliculas": resultado["estado_inicial"]["quito_peliculas"],
-                "cuenca_peliculas": resultado["estado_inicial"]["cuenca_peliculas"]
-            },
-            "operacion": {
-                "cantidad_insertada": cantidad,
-                "registros_insertados": resultado["operacion"]["detalles"]
-            },
-            "tablas_despues": {
-                "quito_peliculas": resultado["estado_final"]["quito_peliculas"],
-                "cuenca_peliculas": resultado["estado_final"]["cuenca_peliculas"]
-            },
-            "resumen": {
-                "quito_antes": len(resultado["estado_inicial"]["quito_peliculas"]),
-                "quito_despues": len(resultado["estado_final"]["quito_peliculas"]),
-                "cuenca_antes": len(resultado["estado_inicial"]["cuenca_peliculas"]),
-                "cuenca_despues": len(resultado["estado_final"]["cuenca_peliculas"]),
-                "replicacion_exitosa": resultado["evidencia_replicacion"]["replicacion_exitosa"]
-            }
-        }
-        
+        return respuesta_json(await evidenciar())
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error en replicación Quito-Cuenca: {str(e)}"
         )
 
+async def evidencia_quito_cuenca(cantidad: int, incluir_tablas: bool, formato_tablas: str) -> dict:
+    """Inserta en Quito, espera la replicación a Cuenca y arma la respuesta de la evidencia"""
+    service = ReplicacionQuitoCuencaService()
+    resultado = await service.evidenciar_replicacion_quito_cuenca(
+        cantidad_peliculas=cantidad, incluir_tablas=incluir_tablas
+    )
+    inicial, final = resultado["estado_inicial"], resultado["estado_final"]
+    
+    respuesta = {
+        "success": True,
+        "message": "Replicación unidireccional Quito → Cuenca completada",
+        "operacion": {
+            "cantidad_insertada": cantidad,
+            "registros_insertados": resultado["operacion"]["detalles"]
+        },
+        "resumen": {
+            "quito_antes": inicial["quito_count"],
+            "quito_despues": final["quito_count"],
+            "cuenca_antes": inicial["cuenca_count"],
+            "cuenca_despues": final["cuenca_count"],
+            "replicacion_exitosa": resultado["evidencia_replicacion"]["replicacion_exitosa"],
+            "verificacion_claves": resultado["evidencia_replicacion"]["verificacion_claves"],
+            "convergencia": resultado["evidencia_replicacion"]["convergencia"],
+            "errores_nodos": {
+                "antes": inicial["errores"],
+                "despues": final["errores"]
+            }
+        }
+    }
+    if incluir_tablas:
+        respuesta["tablas_antes"] = {
+            "quito_peliculas": con_formato(inicial["quito_peliculas"], formato_tablas),
+            "cuenca_peliculas": con_formato(inicial["cuenca_peliculas"], formato_tablas)
+        }
+        respuesta["tablas_despues"] = {
+            "quito_peliculas": con_formato(final["quito_peliculas"], formato_tablas),
+            "cuenca_peliculas": con_formato(final["cuenca_peliculas"], formato_tablas)
+        }
+    return respuesta
+
 @router.post("/guayaquil-cuenca")
 async def replicacion_guayaquil_cuenca(
-    cantidad: int = Query(default=2, ge=1, le=5, description="Cantidad de películas a insertar en Guayaquil")
+    cantidad: int = Query(default=2, ge=1, le=5, description="Cantidad de películas a insertar en Guayaquil"),
+    incluir_tablas: bool = Query(default=False, description="Incluir el contenido completo de ambas tablas antes/después"),
+    formato_tablas: Literal["filas", "columnar"] = Query(default=FORMATO_FILAS, description="Tablas como lista de objetos o por columnas"),
+    esperar: bool = Query(default=False, description="Devolver la evidencia en la misma petición en lugar de un trabajo")
 ):
     """🎬 REPLICACIÓN UNIDIRECCIONAL: Guayaquil → Cuenca (catalogo_peliculas)
     
     - Inserta películas en Guayaquil
-    - Verifica replicación unidireccional hacia Cuenca
-    - Retorna contenido completo de ambas tablas antes/después
+    - Verifica replicación unidireccional hacia Cuenca comparando claves
+    - Con incluir_tablas retorna contenido completo de ambas tablas antes/después
+    - Responde 202 con el id de un trabajo (GET /jobs/{id}) salvo que esperar=true
     """
+    evidenciar = functools.partial(evidencia_guayaquil_cuenca, cantidad, incluir_tablas, formato_tablas)
+    if not esperar:
+        return encolar_trabajo("replicacion_guayaquil_cuenca", (GUAYAQUIL, CUENCA), evidenciar)
     try:
-        # Para mostrar Guayaquil y Cuenca necesitamos consultar ambas bases
-        from app.services.replicacion_quito_cuenca_service import ReplicacionQuitoCuencaService
-        
-        # Obtener estado inicial de ambas tablas
-        service_gye = ReplicacionUnidireccionalService()
-        service_cuenca = ReplicacionQuitoCuencaService()
-        
-        # Estado inicial
-        guayaquil_antes = await service_gye.consultar_peliculas_nodo(2)  # DB2 = Guayaquil
-        cuenca_antes = await service_cuenca.consultar_peliculas_cuenca()
-        
-        # Insertar en Guayaquil
-        peliculas_insertadas = await service_gye.insertar_peliculas_guayaquil(cantidad)
-        
-        # Esperar replicación
-        import asyncio
-        await asyncio.sleep(3)
-        
-        # Estado final
-        guayaquil_despues = await service_gye.consultar_peliculas_nodo(2)  # DB2 = Guayaquil
-        cuenca_despues = await service_cuenca.consultar_peliculas_cuenca()
-        
-        return {
-            "success": True,
-            "message": "Replicación unidireccional Guayaquil → Cuenca completada",
-            "tablas_antes": {
-                "guayaquil_peliculas": guayaquil_antes,
-                "cuenca_peliculas": cuenca_antes
-            },
-            "operacion": {
-                "cantidad_insertada": cantidad,
-                "registros_insertados": peliculas_insertadas
-            },
-            "tablas_despues": {
-                "guayaquil_peliculas": guayaquil_despues,
-                "cuenca_peliculas": cuenca_despues
-            },
-            "resumen": {
-                "guayaquil_antes": len(guayaquil_antes),
-                "guayaquil_despues": len(guayaquil_despues),
-                "cuenca_antes": len(cuenca_antes),
-                "cuenca_despues": len(cuenca_despues),
-                "replicacion_exitosa": (len(guayaquil_despues) - len(guayaquil_antes)) == (len(cuenca_despues) - len(cuenca_antes)) == cantidad
-            }
-        }
-        
+        return respuesta_json(await evidenciar())
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error en replicación Guayaquil-Cuenca: {str(e)}"
         )
+
+async def evidencia_guayaquil_cuenca(cantidad: int, incluir_tablas: bool, formato_tablas: str) -> dict:
+    """Inserta en Guayaquil, espera la replicación a Cuenca y arma la respuesta de la evidencia"""
+    # Para mostrar Guayaquil y Cuenca necesitamos consultar ambas bases
+    service_gye = ReplicacionUnidireccionalService()
+    service_cuenca = ReplicacionQuitoCuencaService()
+    
+    async def consultar_estado():
+        # Guayaquil (DB2) y Cuenca se consultan en paralelo
+        if incluir_tablas:
+            return await consultar_nodos_en_paralelo({
+                "guayaquil": service_gye.consultar_peliculas_nodo(2),
+                "cuenca": service_cuenca.consultar_peliculas_cuenca()
+            }, default=[])
+        return await consultar_nodos_en_paralelo({
+            "guayaquil": leer_claves(service_gye.guayaquil_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS),
+            "cuenca": leer_claves(service_cuenca.cuenca_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS)
+        }, default={})
+    
+    # Estado inicial
+    reportar_progreso("consultando estado inicial", 0.0)
+    antes = await consultar_estado()
+    guayaquil_antes = antes["guayaquil"].datos
+    cuenca_antes = antes["cuenca"].datos
+    
+    # Insertar en Guayaquil
+    reportar_progreso("insertando en Guayaquil", 0.25)
+    peliculas_insertadas = await service_gye.insertar_peliculas_guayaquil(cantidad)
+    
+    # Esperar replicación: sondear Cuenca hasta ver las películas insertadas
+    reportar_progreso("esperando replicación en Cuenca", 0.5)
+    convergencia = await esperar_replicacion(
+        service_cuenca.buscar_peliculas_cuenca,
+        [p["pelicula_id"] for p in peliculas_insertadas]
+    )
+    
+    # Estado final
+    reportar_progreso("consultando estado final", 0.75)
+    despues = await consultar_estado()
+    guayaquil_despues = despues["guayaquil"].datos
+    cuenca_despues = despues["cuenca"].datos
+    if incluir_tablas:
+        verificacion = comparar_claves(
+            claves_de_filas(guayaquil_despues, "pelicula_id", COLUMNAS_HASH_PELICULAS),
+            claves_de_filas(cuenca_despues, "pelicula_id", COLUMNAS_HASH_PELICULAS),
+            solo_origen=True
+        )
+    else:
+        verificacion = comparar_claves(guayaquil_despues, cuenca_despues, solo_origen=True)
+    
+    respuesta = {
+        "success": True,
+        "message": "Replicación unidireccional Guayaquil → Cuenca completada",
+        "operacion": {
+            "cantidad_insertada": cantidad,
+            "registros_insertados": peliculas_insertadas
+        },
+        "resumen": {
+            "guayaquil_antes": len(guayaquil_antes),
+            "guayaquil_despues": len(guayaquil_despues),
+            "cuenca_antes": len(cuenca_antes),
+            "cuenca_despues": len(cuenca_despues),
+            "replicacion_exitosa": (len(guayaquil_despues) - len(guayaquil_antes)) == (len(cuenca_despues) - len(cuenca_antes)) == cantidad,
+            "verificacion_claves": verificacion.to_dict(),
+            "convergencia": convergencia.to_dict(),
+            "errores_nodos": {
+                "antes": errores_por_nodo(antes),
+                "despues": errores_por_nodo(despues)
+            }
+        }
+    }
+    if incluir_tablas:
+        respuesta["tablas_antes"] = {
+            "guayaquil_peliculas": con_formato(guayaquil_antes, formato_tablas),
+            "cuenca_peliculas": con_formato(cuenca_antes, formato_tablas)
+        }
+        respuesta["tablas_despues"] = {
+            "guayaquil_peliculas": con_formato(guayaquil_despues, formato_tablas),
+            "cuenca_peliculas": con_formato(cuenca_despues, formato_tablas)
+        }
+    return respuesta
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+from app.services.serializacion import respuesta_json
+from app.services.trabajos import cola_trabajos, ColaLlena
+
+router = APIRouter(prefix="/jobs", tags=["Trabajos"])
+
+# Segundos que se sugiere esperar antes de reintentar con la cola llena
+REINTENTAR_EN = "5"
+
+
+def encolar_trabajo(tipo, nodos, funcion):
+    """Encola el trabajo y responde 202 con su id y la URL para consultarlo (503 si la cola está llena)"""
+    try:
+        trabajo = cola_trabajos.encolar(tipo, nodos, funcion)
+    except ColaLlena as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": REINTENTAR_EN})
+    url = f"/api/v1/jobs/{trabajo.id}"
+    return respuesta_json({**trabajo.to_dict(), "url": url}, status_code=202, headers={"Location": url})
+
+
+@router.get("/metricas")
+async def get_metricas_trabajos():
+    """🧵 Profundidad de la cola, trabajos en curso por nodo y duración por tipo"""
+    return cola_trabajos.metricas()
+
+@router.get("/metricas/prometheus", response_class=PlainTextResponse)
+async def get_metricas_trabajos_prometheus():
+    """Métricas de la cola de trabajos en formato de texto de Prometheus"""
+    return cola_trabajos.prometheus()
+
+@router.get("/{trabajo_id}")
+async def get_trabajo(trabajo_id: str):
+    """Estado, progreso y (al terminar) resultado o error de un trabajo"""
+    trabajo = cola_trabajos.obtener(trabajo_id)
+    if trabajo is not None:
+        return respuesta_json(trabajo.to_dict())
+    # Encolado por otro proceso o antes de un reinicio (TRABAJOS_BACKEND=redis)
+    cuerpo = await cola_trabajos.obtener_persistido(trabajo_id)
+    if cuerpo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return Response(cuerpo, media_type="application/json")
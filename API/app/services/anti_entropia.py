@@ -0,0 +1,193 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+import logging
+
+from app.database.postgres_connection import PostgresConnection
+from app.database.oracle_connection import OracleConnection
+from app.services.verificacion_claves import (
+    leer_claves, comparar_claves, expresion_hash, COLUMNAS_HASH_PELICULAS
+)
+
+logger = logging.getLogger(__name__)
+
+# Tamaño (en rango de pelicula_id) de las hojas del árbol y ramas por nivel
+TAMANO_HOJA = int(os.getenv('CONSISTENCIA_TAMANO_HOJA', 256))
+FANOUT = int(os.getenv('CONSISTENCIA_FANOUT', 16))
+NIVELES = int(os.getenv('CONSISTENCIA_NIVELES', 3))
+# Intervalo del chequeo en segundo plano (0 = desactivado: cada chequeo recorre las tablas completas)
+INTERVALO_CHEQUEO = float(os.getenv('CONSISTENCIA_INTERVALO', 0))
+
+TABLA = "peliculas_catalogo"
+COLUMNA_ID = "pelicula_id"
+
+# Comparaciones: (origen, destino, solo_origen). Cuenca es réplica completa de
+# Quito; Guayaquil solo envía a Quito (y de ahí a Cuenca) y nunca recibe, así
+# que de Guayaquil solo se exige que sus filas estén en los destinos.
+COMPARACIONES = {
+    "quito_cuenca": ("quito", "cuenca", False),
+    "guayaquil_quito": ("guayaquil", "quito", True),
+    "guayaquil_cuenca": ("guayaquil", "cuenca", True),
+}
+
+
+def _conexion(nodo: str):
+    if nodo == "cuenca":
+        return OracleConnection()
+    return PostgresConnection(db_number=1 if nodo == "quito" else 2)
+
+# Digest de un bucket: (filas, suma de los primeros 32 bits del md5, suma de los siguientes 32)
+Digest = Tuple[int, int, int]
+
+
+def _condicion_rangos(rangos: List[Tuple[int, int]]) -> str:
+    return " OR ".join(
+        f"({COLUMNA_ID} >= {desde} AND {COLUMNA_ID} < {hasta})" for desde, hasta in rangos
+    )
+
+
+def _query_digests(conn, tamano: int, rangos: Optional[List[Tuple[int, int]]]) -> str:
+    """GROUP BY por bucket con un digest independiente del orden, calculado en la base"""
+    hash_fila = expresion_hash(conn, COLUMNAS_HASH_PELICULAS)
+    filtro = f"WHERE {_condicion_rangos(rangos)}" if rangos else ""
+    if isinstance(conn, OracleConnection):
+        return f"""
+        SELECT FLOOR({COLUMNA_ID} / {tamano}) AS bucket, COUNT(*),
+               SUM(TO_NUMBER(SUBSTR(UPPER(h), 1, 8), 'XXXXXXXX')),
+               SUM(TO_NUMBER(SUBSTR(UPPER(h), 9, 8), 'XXXXXXXX'))
+        FROM (SELECT {COLUMNA_ID}, {hash_fila} AS h FROM {TABLA} {filtro}) t
+        GROUP BY FLOOR({COLUMNA_ID} / {tamano})
+        """
+    return f"""
+    SELECT floor({COLUMNA_ID} / {tamano})::bigint AS bucket, count(*),
+           sum(('x' || substr(h, 1, 8))::bit(32)::bigint),
+           sum(('x' || substr(h, 9, 8))::bit(32)::bigint)
+    FROM (SELECT {COLUMNA_ID}, {hash_fila} AS h FROM {TABLA} {filtro}) t
+    GROUP BY 1
+    """
+
+
+async def leer_digests(conn, tamano: int, rangos: Optional[List[Tuple[int, int]]] = None) -> Dict[int, Digest]:
+    """Digest por bucket de tamaño `tamano`, opcionalmente solo dentro de `rangos`"""
+    # Tarea de fondo sobre la tabla completa: fuera del SLO de latencia del circuito
+    async with conn.get_session(slo=False) as session:
+        result = await session.execute(_query_digests(conn, tamano, rangos))
+        return {int(row[0]): (int(row[1]), int(row[2]), int(row[3])) for row in result.fetchall()}
+
+
+def _buckets_distintos(a: Dict[int, Digest], b: Dict[int, Digest]) -> List[int]:
+    return sorted(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+
+
+async def comparar_nodos(referencia, replica, solo_origen: bool = False) -> dict:
+    """Desciende el árbol solo por los buckets cuyo digest difiere entre dos nodos
+
+    Con `solo_origen` las filas que solo existen en la réplica no son
+    divergencias: se descartan los buckets sin filas en la referencia y
+    no se reportan sobrantes.
+    """
+    tamano = TAMANO_HOJA * FANOUT ** (NIVELES - 1)
+    rangos = None
+    niveles = []
+    while True:
+        digests_ref, digests_rep = await asyncio.gather(
+            leer_digests(referencia, tamano, rangos), leer_digests(replica, tamano, rangos)
+        )
+        distintos = _buckets_distintos(digests_ref, digests_rep)
+        if solo_origen:
+            distintos = [b for b in distintos if b in digests_ref]
+        niveles.append({
+            "tamano_bucket": tamano,
+            "buckets_comparados": len(digests_ref.keys() | digests_rep.keys()),
+            "buckets_distintos": len(distintos)
+        })
+        if not distintos:
+            return {"niveles": niveles, "diferencias": comparar_claves({}, {})}
+        rangos = [(b * tamano, (b + 1) * tamano) for b in distintos]
+        if tamano <= TAMANO_HOJA:
+            break
+        tamano = max(TAMANO_HOJA, tamano // FANOUT)
+
+    # Solo las hojas divergentes se leen fila a fila
+    filtro = _condicion_rangos(rangos)
+    claves_ref, claves_rep = await asyncio.gather(
+        leer_claves(referencia, TABLA, COLUMNA_ID, COLUMNAS_HASH_PELICULAS, filtro),
+        leer_claves(replica, TABLA, COLUMNA_ID, COLUMNAS_HASH_PELICULAS, filtro)
+    )
+    return {"niveles": niveles, "diferencias": comparar_claves(claves_ref, claves_rep, solo_origen)}
+
+
+class VerificadorAntiEntropia:
+    """Chequeo periódico de consistencia de peliculas_catalogo entre los tres nodos"""
+
+    def __init__(self):
+        self.ultimo_resultado: Optional[dict] = None
+        self.ultimo_chequeo: Optional[datetime] = None
+        self._tarea = None
+        self._lock = asyncio.Lock()
+
+    async def verificar(self) -> dict:
+        """Ejecuta las comparaciones de COMPARACIONES en paralelo y guarda el resultado"""
+        async with self._lock:
+            inicio = time.perf_counter()
+            # Cada comparación usa sus propias conexiones
+            resultados = await asyncio.gather(
+                *(
+                    comparar_nodos(_conexion(origen), _conexion(destino), solo_origen)
+                    for origen, destino, solo_origen in COMPARACIONES.values()
+                ),
+                return_exceptions=True
+            )
+            comparaciones = {}
+            for nombre, resultado in zip(COMPARACIONES, resultados):
+                origen, destino, solo_origen = COMPARACIONES[nombre]
+                base = {"origen": origen, "destino": destino, "solo_filas_del_origen": solo_origen}
+                if isinstance(resultado, Exception):
+                    logger.error(f"❌ Anti-entropía {origen}-{destino} falló: {resultado}")
+                    comparaciones[nombre] = {**base, "error": str(resultado)}
+                    continue
+                diferencias = resultado["diferencias"]
+                comparaciones[nombre] = {
+                    **base,
+                    "divergencias": len(diferencias.faltantes) + len(diferencias.sobrantes) + len(diferencias.distintas),
+                    "sincronizado": diferencias.sincronizado,
+                    "niveles": resultado["niveles"],
+                    "detalle": diferencias.to_dict()
+                }
+            self.ultimo_chequeo = datetime.now()
+            self.ultimo_resultado = {
+                "ultimo_chequeo": self.ultimo_chequeo.isoformat(),
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+                "comparaciones": comparaciones
+            }
+            logger.info(f"🌳 Anti-entropía completada: { {n: r.get('divergencias') for n, r in comparaciones.items()} }")
+            return self.ultimo_resultado
+
+    async def _bucle(self, intervalo: float):
+        while True:
+            try:
+                await self.verificar()
+            except Exception as e:
+                logger.error(f"❌ Error en chequeo de anti-entropía: {e}")
+            await asyncio.sleep(intervalo)
+
+    def iniciar(self, intervalo: float = None):
+        """Arranca el chequeo periódico si hay intervalo configurado"""
+        intervalo = INTERVALO_CHEQUEO if intervalo is None else intervalo
+        if intervalo > 0 and self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle(intervalo))
+            logger.info(f"🌳 Anti-entropía cada {intervalo}s")
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+anti_entropia = VerificadorAntiEntropia()
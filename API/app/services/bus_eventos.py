@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Dict, Optional, Set
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Eventos que puede acumular cada suscriptor lento antes de descartar los más viejos
+TAMANO_COLA_SUSCRIPTOR = int(os.getenv('EVENTOS_COLA_SUSCRIPTOR', 1000))
+
+
+class Suscripcion:
+    """Cola de eventos de un suscriptor; si se llena se descartan los más antiguos"""
+
+    def __init__(self, tamano: int = TAMANO_COLA_SUSCRIPTOR):
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=tamano)
+        self.descartados = 0
+
+    def entregar(self, evento: dict):
+        if self.cola.full():
+            self.cola.get_nowait()
+            self.descartados += 1
+        self.cola.put_nowait(evento)
+
+    async def siguiente(self, timeout: float = None) -> Optional[dict]:
+        """Próximo evento, o None si pasa `timeout` sin eventos"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BusEventos:
+    """Pub/sub en proceso para los cambios notificados por los nodos"""
+
+    def __init__(self):
+        self._suscripciones: Set[Suscripcion] = set()
+        # Una espera por tabla: se libera (y se renueva) con cada evento de esa tabla
+        self._esperas: Dict[str, asyncio.Event] = {}
+        self.publicados = 0
+        self.ultimo_evento: Optional[dict] = None
+
+    def publicar(self, evento: dict):
+        """Entrega el evento a todos los suscriptores y despierta a quien espere su tabla"""
+        evento.setdefault("recibido", datetime.now().isoformat())
+        self.publicados += 1
+        self.ultimo_evento = evento
+        for suscripcion in self._suscripciones:
+            suscripcion.entregar(evento)
+        espera = self._esperas.pop(evento.get("tabla"), None)
+        if espera is not None:
+            espera.set()
+
+    def suscribir(self) -> Suscripcion:
+        suscripcion = Suscripcion()
+        self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        self._suscripciones.discard(suscripcion)
+
+    async def esperar_cambio(self, tabla: str, timeout: float) -> bool:
+        """Espera hasta un evento de `tabla` o hasta `timeout`; True si hubo evento"""
+        espera = self._esperas.setdefault(tabla, asyncio.Event())
+        try:
+            await asyncio.wait_for(espera.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def estadisticas(self) -> dict:
+        return {
+            "eventos_publicados": self.publicados,
+            "suscriptores": len(self._suscripciones),
+            "descartados": sum(s.descartados for s in self._suscripciones),
+            "ultimo_evento": self.ultimo_evento,
+        }
+
+
+bus_eventos = BusEventos()
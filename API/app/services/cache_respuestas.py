@@ -0,0 +1,248 @@
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+import asyncio
+import hashlib
+import os
+import time
+import logging
+
+from fastapi import Request, Response
+
+from app.services.serializacion import respuesta_json, serializar
+
+logger = logging.getLogger(__name__)
+
+# Entradas máximas en memoria (LRU) y backend: "memoria" o "redis" (compartido entre procesos)
+MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', 256))
+BACKEND = os.getenv('CACHE_BACKEND', 'memoria')
+REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Namespaces cacheados: TTL (segundos, 0 = sin cache) y tablas de las que dependen
+CLIENTES = "clientes"
+EMPLEADOS = "empleados"
+
+TTL_POR_NAMESPACE = {
+    CLIENTES: float(os.getenv('CACHE_TTL_CLIENTES', 30)),
+    EMPLEADOS: float(os.getenv('CACHE_TTL_EMPLEADOS', 60)),
+}
+
+DEPENDENCIAS = {
+    CLIENTES: {
+        "vista_clientes_unificados",
+        os.getenv('CLIENTES_FRAGMENTO_QUITO', 'clientes_quito'),
+        os.getenv('CLIENTES_FRAGMENTO_GUAYAQUIL', 'clientes_guayaquil'),
+        os.getenv('CLIENTES_FRAGMENTO_CUENCA', 'clientes_cuenca'),
+    },
+    EMPLEADOS: {
+        "empleados_vista_completa",
+        os.getenv('EMPLEADOS_FRAGMENTO_PRINCIPAL', 'empleados_principal'),
+        os.getenv('EMPLEADOS_FRAGMENTO_COMPLEMENTARIO', 'empleados_complementario'),
+    },
+}
+
+
+@dataclass
+class EntradaCache:
+    """Respuesta ya serializada con su ETag"""
+    cuerpo: bytes
+    etag: str
+    expira: float
+
+
+class BackendMemoria:
+    """LRU acotado por número de entradas, local al proceso"""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, EntradaCache]" = OrderedDict()
+        self.expulsiones = 0
+
+    async def get(self, clave: str) -> Optional[EntradaCache]:
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada.expira <= time.monotonic():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    async def set(self, clave: str, entrada: EntradaCache):
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.expulsiones += 1
+
+    async def borrar_prefijo(self, prefijo: str) -> int:
+        claves = [c for c in self._entradas if c.startswith(prefijo)]
+        for clave in claves:
+            del self._entradas[clave]
+        return len(claves)
+
+    def tamano(self) -> int:
+        return len(self._entradas)
+
+
+class BackendRedis:
+    """Backend compartido entre workers; requiere el paquete redis (opcional)"""
+
+    def __init__(self, url: str = REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requiere instalar el paquete 'redis'")
+        self._redis = redis.from_url(url)
+
+    async def get(self, clave: str) -> Optional[EntradaCache]:
+        valor = await self._redis.hmget(clave, "cuerpo", "etag")
+        if valor[0] is None:
+            return None
+        return EntradaCache(valor[0], valor[1].decode(), 0)
+
+    async def set(self, clave: str, entrada: EntradaCache):
+        ttl = max(1, int(entrada.expira - time.monotonic()))
+        async with self._redis.pipeline() as pipe:
+            pipe.hset(clave, mapping={"cuerpo": entrada.cuerpo, "etag": entrada.etag})
+            pipe.expire(clave, ttl)
+            await pipe.execute()
+
+    async def borrar_prefijo(self, prefijo: str) -> int:
+        claves = [c async for c in self._redis.scan_iter(match=f"{prefijo}*")]
+        if claves:
+            await self._redis.delete(*claves)
+        return len(claves)
+
+    def tamano(self) -> Optional[int]:
+        return None
+
+
+BACKENDS: Dict[str, Callable] = {
+    "memoria": BackendMemoria,
+    "redis": BackendRedis,
+}
+
+
+def etag_coincide(etag: str, if_none_match: str) -> bool:
+    """Comparación débil de If-None-Match: lista separada por comas, prefijo W/ y comodín *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    valor = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == valor:
+            return True
+    return False
+
+
+class CacheRespuestas:
+    """Cache de respuestas JSON por namespace con TTL, LRU y ETag"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or BACKENDS[BACKEND]()
+        self.aciertos = 0
+        self.fallos = 0
+        self.no_modificados = 0
+        self.invalidaciones = 0
+        self.descartadas = 0
+        # Un solo cálculo por clave aunque lleguen varias peticiones a la vez:
+        # clave -> [lock, peticiones que lo usan o esperan]
+        self._locks: Dict[str, list] = {}
+        # Generación por namespace: una invalidación durante producir() descarta el resultado
+        self._generaciones: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def clave(namespace: str, request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{namespace}:{request.url.path}?{query}"
+
+    @staticmethod
+    def _respuesta(entrada: EntradaCache, request: Request, ttl: float, estado: str) -> Response:
+        headers = {"ETag": entrada.etag, "Cache-Control": f"max-age={int(ttl)}", "X-Cache": estado}
+        if etag_coincide(entrada.etag, request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+        return Response(entrada.cuerpo, media_type="application/json", headers=headers)
+
+    async def responder(self, namespace: str, request: Request, producir: Callable[[], Awaitable]) -> Response:
+        """Devuelve la respuesta cacheada o la produce, guarda y responde (304 si el ETag coincide)"""
+        ttl = TTL_POR_NAMESPACE.get(namespace, 0)
+        if ttl <= 0:
+            return respuesta_json(await producir())
+        clave = self.clave(namespace, request)
+        entrada = await self.backend.get(clave)
+        estado = "HIT"
+        if entrada is None:
+            uso = self._locks.get(clave)
+            if uso is None:
+                uso = self._locks[clave] = [asyncio.Lock(), 0]
+            uso[1] += 1
+            try:
+                async with uso[0]:
+                    entrada = await self.backend.get(clave)
+                    if entrada is None:
+                        estado = "MISS"
+                        generacion = self._generaciones[namespace]
+                        cuerpo = serializar(await producir())
+                        etag = f'"{hashlib.md5(cuerpo).hexdigest()}"'
+                        entrada = EntradaCache(cuerpo, etag, time.monotonic() + ttl)
+                        # Si se invalidó mientras se producía, el resultado puede ser anterior al cambio
+                        if self._generaciones[namespace] == generacion:
+                            await self.backend.set(clave, entrada)
+                        else:
+                            self.descartadas += 1
+            finally:
+                # El lock se borra solo cuando nadie más lo espera (también si producir() falla)
+                uso[1] -= 1
+                if uso[1] == 0 and self._locks.get(clave) is uso:
+                    del self._locks[clave]
+        if estado == "HIT":
+            self.aciertos += 1
+        else:
+            self.fallos += 1
+        respuesta = self._respuesta(entrada, request, ttl, estado)
+        if respuesta.status_code == 304:
+            self.no_modificados += 1
+        return respuesta
+
+    async def invalidar(self, namespace: Optional[str] = None) -> int:
+        """Borra las entradas de un namespace (o de todos)"""
+        namespaces = [namespace] if namespace else list(TTL_POR_NAMESPACE)
+        borradas = 0
+        for ns in namespaces:
+            self._generaciones[ns] += 1
+            borradas += await self.backend.borrar_prefijo(f"{ns}:")
+        self.invalidaciones += 1
+        return borradas
+
+    async def invalidar_tablas(self, tablas: Iterable[str]) -> Set[str]:
+        """Invalida los namespaces que leen alguna de las tablas modificadas"""
+        tablas = set(tablas)
+        afectados = {ns for ns, deps in DEPENDENCIAS.items() if deps & tablas}
+        for ns in afectados:
+            await self.invalidar(ns)
+        if afectados:
+            logger.info(f"🧹 Cache invalidada por cambios en {sorted(tablas)}: {sorted(afectados)}")
+        return afectados
+
+    def estadisticas(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "entradas": self.backend.tamano(),
+            "max_entradas": getattr(self.backend, "max_entradas", None),
+            "expulsiones": getattr(self.backend, "expulsiones", None),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "respuestas_304": self.no_modificados,
+            "invalidaciones": self.invalidaciones,
+            "descartadas_por_invalidacion": self.descartadas,
+            "ttl_por_namespace": TTL_POR_NAMESPACE,
+            "dependencias": {ns: sorted(deps) for ns, deps in DEPENDENCIAS.items()},
+        }
+
+
+cache_respuestas = CacheRespuestas()
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List
+import asyncio
+import os
+import time
+import uuid
+import logging
+
+from app.database.postgres_connection import PostgresConnection
+from app.database.oracle_connection import OracleConnection
+from app.services.cache_respuestas import cache_respuestas
+from app.services.metricas_replicacion import GUAYAQUIL_QUITO, QUITO_CUENCA, PROMOCIONES_QUITO_GUAYAQUIL
+
+logger = logging.getLogger(__name__)
+
+# Filas máximas por carga y por lote, y espera máxima a que la réplica alcance al origen
+CARGA_MAXIMA = int(os.getenv('CARGA_MASIVA_MAXIMO', 200000))
+LOTE_MAXIMO = int(os.getenv('CARGA_MASIVA_LOTE_MAXIMO', 50000))
+DEADLINE_REPLICA = float(os.getenv('CARGA_MASIVA_DEADLINE', 120))
+INTERVALO_REPLICA = float(os.getenv('CARGA_MASIVA_INTERVALO_REPLICA', 0.5))
+
+INSERT = "insert"
+COPY = "copy"
+
+GENEROS = ["Acción", "Drama", "Comedia", "Terror", "Sci-Fi"]
+CLASIFICACIONES = ["G", "PG", "PG-13", "R"]
+
+
+def nueva_marca() -> str:
+    """Prefijo corto y único por carga para reconocer sus filas en origen y réplica
+
+    De ancho fijo y seguido siempre de '-' en las filas, para que ninguna
+    marca sea prefijo de las filas de otra carga.
+    """
+    return f"BK{uuid.uuid4().hex[:8].upper()}"
+
+
+def _fila_pelicula(marca: str, i: int) -> tuple:
+    return (
+        f"{marca}-{i} Película masiva",
+        GENEROS[i % len(GENEROS)],
+        CLASIFICACIONES[i % len(CLASIFICACIONES)],
+        f"Director {i}",
+        f"Película de carga masiva {i} para medir el throughput de replicación",
+        f"https://ejemplo.com/poster_{i}.jpg"
+    )
+
+
+def _fila_promocion(marca: str, i: int) -> tuple:
+    return (f"{marca}-{i}", f"Promoción masiva {i} desde Quito", 10.0 + (i % 50), "Quito")
+
+
+@dataclass
+class EspecCarga:
+    """Tabla de origen, columnas y nodo réplica de un enlace de replicación"""
+    origen: int
+    replica: Callable
+    tabla: str
+    columna_id: str
+    columnas: List[str]
+    tipos: List[str]
+    columna_marca: str
+    generar_fila: Callable[[str, int], tuple]
+
+
+COLUMNAS_PELICULA = ["titulo", "genero", "clasificacion", "director", "sinopsis", "url_poster"]
+
+ENLACES_CARGA = {
+    GUAYAQUIL_QUITO: EspecCarga(
+        2, lambda: PostgresConnection(db_number=1), "peliculas_catalogo", "pelicula_id",
+        COLUMNAS_PELICULA, ["text"] * 6, "titulo", _fila_pelicula
+    ),
+    QUITO_CUENCA: EspecCarga(
+        1, OracleConnection, "peliculas_catalogo", "pelicula_id",
+        COLUMNAS_PELICULA, ["text"] * 6, "titulo", _fila_pelicula
+    ),
+    PROMOCIONES_QUITO_GUAYAQUIL: EspecCarga(
+        1, lambda: PostgresConnection(db_number=2), "promociones", "promocion_id",
+        ["codigo_promo", "descripcion", "descuento_porcentaje", "ciudad"],
+        ["text", "text", "float8", "text"], "codigo_promo", _fila_promocion
+    ),
+}
+
+
+async def insertar_lote(session, espec: EspecCarga, filas: List[tuple], metodo: str = INSERT) -> int:
+    """Inserta un lote en una sola sentencia: INSERT ... SELECT unnest(...) RETURNING o COPY"""
+    if metodo == COPY:
+        await session.copy_records(espec.tabla, espec.columnas, filas)
+        return len(filas)
+    arreglos = ", ".join(f"%s::{tipo}[]" for tipo in espec.tipos)
+    query = f"""
+    INSERT INTO {espec.tabla} ({", ".join(espec.columnas)})
+    SELECT * FROM unnest({arreglos})
+    RETURNING {espec.columna_id}
+    """
+    result = await session.execute(query, tuple(list(columna) for columna in zip(*filas)))
+    return len(result.fetchall())
+
+
+async def contar_marca(conn, espec: EspecCarga, marca: str) -> int:
+    """Filas de la carga `marca` presentes en el nodo"""
+    query = f"SELECT COUNT(*) FROM {espec.tabla} WHERE {espec.columna_marca} LIKE '{marca}-%'"
+    # Recorre la tabla completa (sin índice sobre la marca): fuera del SLO del circuito
+    async with conn.get_session(slo=False) as session:
+        result = await session.execute(query)
+        return int(result.fetchone()[0])
+
+
+def _por_segundo(filas: int, segundos: float) -> float:
+    return round(filas / segundos, 1) if segundos > 0 else 0.0
+
+
+async def cargar(enlace: str, cantidad: int, lote: int, metodo: str = INSERT) -> AsyncIterator[dict]:
+    """Inserta `cantidad` filas en lotes en el origen del enlace y sigue su llegada a la réplica
+
+    Produce eventos de progreso (origen y réplica) y un resumen final con filas/s.
+    """
+    espec = ENLACES_CARGA[enlace]
+    marca = nueva_marca()
+    origen = PostgresConnection(db_number=espec.origen)
+    yield {"tipo": "inicio", "enlace": enlace, "marca": marca, "cantidad": cantidad, "lote": lote, "metodo": metodo}
+
+    inicio = time.perf_counter()
+    insertadas = 0
+    # Lotes de miles de filas: lentos por diseño, no deben abrir el circuito del nodo
+    async with origen.get_session(slo=False) as session:
+        for desde in range(0, cantidad, lote):
+            filas = [espec.generar_fila(marca, i) for i in range(desde, min(desde + lote, cantidad))]
+            insertadas += await insertar_lote(session, espec, filas, metodo)
+            # Commit por lote: la réplica empieza a recibir mientras seguimos insertando
+            await session.commit()
+            segundos = time.perf_counter() - inicio
+            yield {
+                "tipo": "origen", "insertadas": insertadas, "total": cantidad,
+                "segundos": round(segundos, 3), "filas_por_s": _por_segundo(insertadas, segundos)
+            }
+    segundos_origen = time.perf_counter() - inicio
+    logger.info(f"📦 Carga masiva {enlace}: {insertadas} filas en {segundos_origen:.2f}s ({metodo})")
+    await cache_respuestas.invalidar_tablas([espec.tabla])
+
+    replica = espec.replica()
+    replicadas = 0
+    while True:
+        try:
+            replicadas = await contar_marca(replica, espec, marca)
+        except Exception as e:
+            logger.warning(f"⚠️ Error contando filas replicadas de {enlace}: {e}")
+        segundos = time.perf_counter() - inicio
+        completa = replicadas >= insertadas
+        yield {
+            "tipo": "replica", "replicadas": replicadas, "total": insertadas,
+            "segundos": round(segundos, 3), "filas_por_s": _por_segundo(replicadas, segundos)
+        }
+        if completa or segundos - segundos_origen >= DEADLINE_REPLICA:
+            break
+        await asyncio.sleep(INTERVALO_REPLICA)
+
+    yield {
+        "tipo": "resumen",
+        "enlace": enlace,
+        "marca": marca,
+        "metodo": metodo,
+        "origen": {
+            "filas": insertadas,
+            "segundos": round(segundos_origen, 3),
+            "filas_por_s": _por_segundo(insertadas, segundos_origen)
+        },
+        "replica": {
+            "filas": replicadas,
+            "completa": completa,
+            "segundos": round(segundos, 3),
+            "filas_por_s": _por_segundo(replicadas, segundos),
+            "retraso_tras_origen_ms": round((segundos - segundos_origen) * 1000, 1) if completa else None
+        }
+    }
@@ -1,9 +1,91 @@
-from typing import List
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional
 from app.database.postgres_connection import PostgresConnection
+from app.database.oracle_connection import OracleConnection
+from app.services.consulta_paralela import consultar_nodos_en_paralelo, errores_por_nodo
+from app.services.coalescencia import consultar_compartido, ejecutar_compartido
+from app.services.serializacion import Filas
+import base64
+import heapq
+import itertools
+import json
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Tamaño de página por defecto/máximo y filas por lote al hacer streaming
+LIMITE_PAGINA = int(os.getenv('CLIENTES_LIMITE_PAGINA', 100))
+LIMITE_PAGINA_MAXIMO = int(os.getenv('CLIENTES_LIMITE_PAGINA_MAXIMO', 1000))
+LOTE_STREAMING = int(os.getenv('CLIENTES_LOTE_STREAMING', 1000))
+
+COLUMNAS_CLIENTE = [
+    "cliente_id", "nombre", "apellido", "email", "telefono",
+    "direccion", "ciudad_registro", "fecha_creacion"
+]
+
+# Fragmentos horizontales de la vista: predicado ciudad_registro = ciudad -> (nodo, tabla)
+FRAGMENTOS_CLIENTES = {
+    "Quito": (1, os.getenv('CLIENTES_FRAGMENTO_QUITO', 'clientes_quito')),
+    "Guayaquil": (2, os.getenv('CLIENTES_FRAGMENTO_GUAYAQUIL', 'clientes_guayaquil')),
+    "Cuenca": (None, os.getenv('CLIENTES_FRAGMENTO_CUENCA', 'clientes_cuenca')),
+}
+
+
+def _fila_a_cliente(row) -> dict:
+    return dict(zip(COLUMNAS_CLIENTE, row))
+
+
+def codificar_cursor(cliente: dict) -> str:
+    """Cursor opaco con la posición (fecha_creacion, cliente_id) del último cliente entregado"""
+    fecha = cliente["fecha_creacion"]
+    posicion = {"f": fecha.isoformat() if fecha is not None else None, "id": cliente["cliente_id"]}
+    return base64.urlsafe_b64encode(json.dumps(posicion).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple:
+    """Inverso de codificar_cursor; ValueError si el cursor no es válido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        posicion = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        fecha, cliente_id = posicion["f"], posicion["id"]
+        if type(cliente_id) is not int:
+            raise ValueError
+        return (datetime.fromisoformat(fecha) if fecha is not None else None), cliente_id
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def fragmentos_para_ciudad(ciudad: Optional[str]) -> List[str]:
+    """Poda de fragmentos: solo las ciudades cuyo predicado puede cumplir el filtro
+
+    ValueError si la ciudad no corresponde a ningún fragmento.
+    """
+    if not ciudad:
+        return list(FRAGMENTOS_CLIENTES)
+    ciudades = [c for c in FRAGMENTOS_CLIENTES if c.lower() == ciudad.strip().lower()]
+    if not ciudades:
+        raise ValueError(f"Ciudad debe ser una de: {', '.join(FRAGMENTOS_CLIENTES)}")
+    return ciudades
+
+
+def _clave_orden(cliente: dict):
+    """(fecha_creacion, cliente_id) comparable entre nodos, el mismo orden que el cursor de /pagina
+
+    Oracle DATE llega como datetime y PostgreSQL puede dar date. NULL se
+    mapea a datetime.min para que, en orden descendente, quede al final
+    igual que el NULLS LAST de las consultas de cada fragmento.
+    """
+    fecha = cliente["fecha_creacion"]
+    if fecha is None:
+        fecha = datetime.min
+    elif isinstance(fecha, date) and not isinstance(fecha, datetime):
+        fecha = datetime(fecha.year, fecha.month, fecha.day)
+    elif isinstance(fecha, datetime):
+        fecha = fecha.replace(tzinfo=None)
+    return fecha, cliente["cliente_id"]
+
+
 class ClientesUnificadosService:
     """Servicio para consultar la vista unificada de clientes de todas las ciudades"""
     
@@ -11,35 +93,96 @@ class ClientesUnificadosService:
         # Usamos Quito (PostgreSQL 1) donde está la vista
         self.postgres_conn = PostgresConnection(db_number=1)
     
-    async def get_all_clientes_unificados(self) -> List[dict]:
+    async def get_all_clientes_unificados(self, compacto: bool = False) -> Filas:
         """Obtiene todos los clientes de la vista unificada (Cuenca, Quito, Guayaquil)"""
         try:
-            async with self.postgres_conn.get_session() as session:
-                query = """
-                SELECT cliente_id, nombre, apellido, email, telefono, 
-                       direccion, ciudad_registro, fecha_creacion
-                FROM vista_clientes_unificados
-                ORDER BY fecha_creacion DESC
-                """
-                result = await session.execute(query)
-                rows = result.fetchall()
-                
-                clientes = []
-                for row in rows:
-                    cliente = {
-                        "cliente_id": row[0],
-                        "nombre": row[1],
-                        "apellido": row[2],
-                        "email": row[3],
-                        "telefono": row[4],
-                        "direccion": row[5],
-                        "ciudad_registro": row[6],
-                        "fecha_creacion": row[7]
-                    }
-                    clientes.append(cliente)
-                
-                return clientes
+            query = f"""
+            SELECT {", ".join(COLUMNAS_CLIENTE)}
+            FROM vista_clientes_unificados
+            ORDER BY fecha_creacion DESC
+            """
+            filas = await consultar_compartido(self.postgres_conn, query, etiqueta="clientes.todos")
+            return Filas(COLUMNAS_CLIENTE, filas, compacto)
                 
         except Exception as e:
             logger.error(f"Error obteniendo clientes unificados: {e}")
             raise Exception(f"Error al consultar vista unificada: {str(e)}")
+
+    async def get_clientes_pagina(self, limite: int = LIMITE_PAGINA, cursor: Optional[str] = None) -> dict:
+        """Página de clientes por keyset sobre (fecha_creacion, cliente_id), del más reciente al más antiguo"""
+        limite = max(1, min(limite, LIMITE_PAGINA_MAXIMO))
+        sentencia = "clientes.pagina"
+        params = []
+        if cursor:
+            sentencia = "clientes.pagina_desde"
+            params.extend(decodificar_cursor(cursor))
+        # Se pide una fila extra para saber si hay página siguiente
+        params.append(limite + 1)
+        try:
+            filas = await ejecutar_compartido(self.postgres_conn, sentencia, params)
+            clientes = [_fila_a_cliente(row) for row in filas]
+        except Exception as e:
+            logger.error(f"Error obteniendo página de clientes unificados: {e}")
+            raise Exception(f"Error al consultar vista unificada: {str(e)}")
+
+        hay_mas = len(clientes) > limite
+        clientes = clientes[:limite]
+        return {
+            "items": clientes,
+            "limite": limite,
+            "siguiente_cursor": codificar_cursor(clientes[-1]) if hay_mas else None
+        }
+
+    async def stream_clientes_unificados(self, lote: int = LOTE_STREAMING) -> AsyncIterator[List[dict]]:
+        """Recorre toda la vista con un cursor del servidor, entregando lotes de clientes"""
+        query = f"""
+        SELECT {", ".join(COLUMNAS_CLIENTE)}
+        FROM vista_clientes_unificados
+        ORDER BY fecha_creacion DESC NULLS LAST, cliente_id DESC
+        """
+        total = 0
+        async with self.postgres_conn.get_session() as session:
+            async for rows in session.stream(query, batch_size=lote):
+                total += len(rows)
+                yield [_fila_a_cliente(row) for row in rows]
+        logger.info(f"📤 Streaming de clientes unificados completado: {total} filas")
+
+    def _conexion_fragmento(self, ciudad: str):
+        db_number, _ = FRAGMENTOS_CLIENTES[ciudad]
+        if db_number is None:
+            return OracleConnection()
+        # Cada fragmento usa su propia conexión para poder consultarse en paralelo
+        return PostgresConnection(db_number=db_number)
+
+    async def _consultar_fragmento(self, ciudad: str, limite: int) -> List[dict]:
+        """Primeros `limite` clientes del fragmento, ya ordenados por fecha_creacion DESC"""
+        conn = self._conexion_fragmento(ciudad)
+        _, tabla = FRAGMENTOS_CLIENTES[ciudad]
+        columnas = ", ".join(COLUMNAS_CLIENTE)
+        orden = "ORDER BY fecha_creacion DESC NULLS LAST, cliente_id DESC"
+        if isinstance(conn, OracleConnection):
+            query = f"SELECT {columnas} FROM {tabla} {orden} FETCH FIRST {int(limite)} ROWS ONLY"
+        else:
+            query = f"SELECT {columnas} FROM {tabla} {orden} LIMIT {int(limite)}"
+        async with conn.get_session() as session:
+            result = await session.execute(query)
+            return [_fila_a_cliente(row) for row in result.fetchall()]
+
+    async def get_clientes_federados(self, ciudad: Optional[str] = None, limite: int = LIMITE_PAGINA) -> Dict:
+        """Consulta federada: poda por ciudad, fragmentos en paralelo y k-way merge por fecha_creacion DESC"""
+        limite = max(1, min(limite, LIMITE_PAGINA_MAXIMO))
+        ciudades = fragmentos_para_ciudad(ciudad)
+        resultados = await consultar_nodos_en_paralelo(
+            {c: self._consultar_fragmento(c, limite) for c in ciudades}, default=[]
+        )
+        # Cada fragmento ya viene ordenado: basta un merge de k listas cortado en `limite`
+        fusionados = heapq.merge(*(r.datos for r in resultados.values()), key=_clave_orden, reverse=True)
+        clientes = list(itertools.islice(fusionados, limite))
+        logger.info(f"🔎 Consulta federada de clientes ({', '.join(ciudades) or 'sin fragmentos'}): {len(clientes)} filas")
+        return {
+            "items": clientes,
+            "limite": limite,
+            "fragmentos_consultados": ciudades,
+            "duracion_por_fragmento_ms": {c: round(r.duracion_ms, 1) for c, r in resultados.items()},
+            "errores_nodos": errores_por_nodo(resultados)
+        }
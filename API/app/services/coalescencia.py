@@ -0,0 +1,120 @@
+"""Coalescencia de lecturas idénticas concurrentes (single-flight)
+
+Cuando varias peticiones piden a la vez la misma consulta (mismo nodo,
+mismo SQL normalizado y mismos parámetros, incluidos límite y cursor de
+página) solo la primera va a la base; las demás esperan esa misma
+ejecución y comparten las filas materializadas, que por eso no deben
+modificarse. La consulta corre en su propia tarea, con un contexto vacío:
+si la petición que la inició se cancela, las demás la siguen esperando, y
+no se carga a la medición de ninguna petición; cada una registra en cambio
+su propia espera (instrumentacion.espera_compartida).
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import contextvars
+import logging
+import time
+
+from app.database.instrumentacion import instrumentacion
+
+# Entrada de Server-Timing para lecturas compartidas que abarcan varios nodos
+NODO_COMPARTIDO = "compartida"
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_query(query: str) -> str:
+    """SQL con los espacios colapsados: el mismo texto con otra indentación es la misma consulta"""
+    return " ".join(query.split())
+
+
+def _congelar(valor) -> Hashable:
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    return valor
+
+
+class Coalescedor:
+    """Consultas en vuelo por clave y contadores de peticiones coalescidas"""
+
+    def __init__(self):
+        self._en_vuelo: Dict[Hashable, asyncio.Future] = {}
+        # etiqueta -> [ejecutadas, coalescidas]
+        self._contadores: Dict[str, list] = defaultdict(lambda: [0, 0])
+
+    async def compartir(self, clave: Hashable, producir: Callable[[], Awaitable], etiqueta: str,
+                        nodo: Optional[str] = None) -> Any:
+        """Resultado de producir(); si ya hay una ejecución en vuelo con la misma clave, se espera esa
+
+        La espera se registra en la medición de la petición actual bajo `nodo`
+        (NODO_COMPARTIDO si la lectura abarca varios nodos).
+        """
+        contador = self._contadores[etiqueta]
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            contador[0] += 1
+            # Contexto vacío, sin la medición de la petición que la inició
+            # (create_task(context=...) exigiría Python 3.11)
+            tarea = contextvars.Context().run(asyncio.ensure_future, producir())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+        else:
+            contador[1] += 1
+        inicio = time.perf_counter()
+        resultado = None
+        try:
+            resultado = await asyncio.shield(tarea)
+            return resultado
+        finally:
+            filas = len(resultado) if isinstance(resultado, list) else 0
+            instrumentacion.espera_compartida(nodo or NODO_COMPARTIDO, (time.perf_counter() - inicio) * 1000, filas)
+
+    def _terminar(self, clave: Hashable, tarea: asyncio.Future):
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        # Si todas las peticiones se cancelaron nadie recoge el error
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def estadisticas(self) -> dict:
+        ejecutadas = sum(c[0] for c in self._contadores.values())
+        coalescidas = sum(c[1] for c in self._contadores.values())
+        return {
+            "en_vuelo": len(self._en_vuelo),
+            "ejecutadas": ejecutadas,
+            "coalescidas": coalescidas,
+            "tasa_coalescencia": round(coalescidas / (ejecutadas + coalescidas), 4) if ejecutadas + coalescidas else None,
+            "por_consulta": {
+                etiqueta: {"ejecutadas": e, "coalescidas": c} for etiqueta, (e, c) in sorted(self._contadores.items())
+            },
+        }
+
+
+coalescedor = Coalescedor()
+
+
+async def consultar_compartido(conn, query: str, params=None, etiqueta: str = None) -> list:
+    """Filas de un SELECT en el nodo de `conn`, compartidas entre llamadas idénticas concurrentes"""
+    params = tuple(params or ())
+
+    async def producir():
+        async with conn.get_session() as session:
+            return (await session.execute(query, params)).fetchall()
+
+    clave = (conn.nodo, normalizar_query(query), _congelar(params))
+    return await coalescedor.compartir(clave, producir, etiqueta or conn.nodo, conn.nodo)
+
+
+async def ejecutar_compartido(conn, nombre: str, params=None) -> list:
+    """Igual que consultar_compartido, con una sentencia del registro (app.database.sentencias)"""
+    params = tuple(params or ())
+
+    async def producir():
+        async with conn.get_session() as session:
+            return (await session.ejecutar(nombre, params)).fetchall()
+
+    clave = (conn.nodo, nombre, _congelar(params))
+    return await coalescedor.compartir(clave, producir, nombre, conn.nodo)
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Optional
+import asyncio
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo por nodo en una consulta multinodo (segundos)
+TIMEOUT_POR_NODO = float(os.getenv('FANOUT_TIMEOUT', 30))
+
+
+@dataclass
+class ResultadoNodo:
+    """Resultado de la consulta a un nodo: datos o marca de error"""
+    nodo: str
+    datos: Any = None
+    error: Optional[str] = None
+    duracion_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _consultar_nodo(nodo: str, consulta: Awaitable, timeout: float, default) -> ResultadoNodo:
+    inicio = time.perf_counter()
+    try:
+        datos = await asyncio.wait_for(consulta, timeout=timeout)
+        return ResultadoNodo(nodo, datos, duracion_ms=(time.perf_counter() - inicio) * 1000)
+    except asyncio.TimeoutError:
+        error = f"Timeout tras {timeout}s"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    logger.error(f"   ✗ Nodo {nodo} sin respuesta en consulta paralela: {error}")
+    return ResultadoNodo(nodo, default, error, (time.perf_counter() - inicio) * 1000)
+
+
+async def consultar_nodos_en_paralelo(
+    consultas: Dict[str, Awaitable],
+    timeout: float = None,
+    default: Any = None
+) -> Dict[str, ResultadoNodo]:
+    """Lanza las consultas de cada nodo a la vez y espera a todas
+
+    Cada nodo tiene su propio timeout; un nodo que falla no cancela a los
+    demás, sino que devuelve `default` como datos y el motivo en `error`.
+    """
+    timeout = timeout or TIMEOUT_POR_NODO
+    resultados = await asyncio.gather(*(
+        _consultar_nodo(nodo, consulta, timeout, default)
+        for nodo, consulta in consultas.items()
+    ))
+    return {resultado.nodo: resultado for resultado in resultados}
+
+
+def errores_por_nodo(resultados: Dict[str, ResultadoNodo]) -> Dict[str, str]:
+    """Marcas de error de los nodos que fallaron (vacío si todos respondieron)"""
+    return {nodo: r.error for nodo, r in resultados.items() if not r.ok}
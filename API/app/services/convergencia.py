@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Optional
+import asyncio
+import os
+import time
+import logging
+
+from app.services.bus_eventos import bus_eventos
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima para que las claves insertadas aparezcan en el nodo destino (segundos)
+DEADLINE_REPLICACION = float(os.getenv('REPLICACION_DEADLINE', 10))
+# Primer intervalo de sondeo y tope del backoff exponencial (segundos)
+INTERVALO_INICIAL = float(os.getenv('REPLICACION_INTERVALO_INICIAL', 0.05))
+INTERVALO_MAXIMO = float(os.getenv('REPLICACION_INTERVALO_MAXIMO', 1.0))
+
+
+@dataclass
+class ResultadoConvergencia:
+    """Resultado de esperar a que el nodo destino tenga las claves insertadas"""
+    convergio: bool
+    espera_ms: float
+    intentos: int
+    claves_pendientes: List = field(default_factory=list)
+
+    @property
+    def lag_ms(self) -> Optional[float]:
+        """Lag de replicación medido (None si no convergió antes del deadline)"""
+        return self.espera_ms if self.convergio else None
+
+    def to_dict(self) -> dict:
+        return {
+            "convergio": self.convergio,
+            "lag_replicacion_ms": round(self.lag_ms, 1) if self.convergio else None,
+            "espera_ms": round(self.espera_ms, 1),
+            "intentos": self.intentos,
+            "claves_pendientes": self.claves_pendientes
+        }
+
+
+async def esperar_replicacion(
+    buscar_claves: Callable[[List], Awaitable[Iterable]],
+    claves: Iterable,
+    deadline: float = None,
+    inicio: float = None,
+    tabla: str = None
+) -> ResultadoConvergencia:
+    """Sondea el nodo destino hasta ver todas las claves o agotar el deadline
+
+    `buscar_claves` recibe las claves aún pendientes y devuelve las que ya
+    existen en el destino. Entre sondeos se espera con backoff exponencial.
+    `inicio` (time.perf_counter) marca el commit en el origen; por defecto
+    es el momento de la llamada. Con `tabla`, una notificación de cambio en
+    esa tabla adelanta el siguiente sondeo sin esperar el backoff.
+    """
+    if deadline is None:
+        deadline = DEADLINE_REPLICACION
+    if inicio is None:
+        inicio = time.perf_counter()
+    pendientes = set(claves)
+    intervalo = INTERVALO_INICIAL
+    intentos = 0
+
+    while True:
+        if pendientes:
+            intentos += 1
+            try:
+                pendientes -= set(await buscar_claves(sorted(pendientes)))
+            except Exception as e:
+                logger.warning(f"⚠️ Error sondeando nodo destino (intento {intentos}): {e}")
+        transcurrido = time.perf_counter() - inicio
+        if not pendientes:
+            return ResultadoConvergencia(True, transcurrido * 1000, intentos)
+        if transcurrido >= deadline:
+            logger.warning(f"⚠️ Replicación sin converger tras {deadline}s: faltan {len(pendientes)} claves")
+            return ResultadoConvergencia(False, transcurrido * 1000, intentos, sorted(pendientes))
+        espera = min(intervalo, deadline - transcurrido)
+        if tabla:
+            await bus_eventos.esperar_cambio(tabla, espera)
+        else:
+            await asyncio.sleep(espera)
+        intervalo = min(intervalo * 2, INTERVALO_MAXIMO)
@@ -1,57 +1,303 @@
-from typing import List, Dict
+from collections import deque
+from typing import AsyncIterator, List, Dict, Optional
 from app.database.postgres_connection import PostgresConnection
+from app.services.coalescencia import coalescedor, consultar_compartido
+import asyncio
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Tamaño de página por defecto/máximo y filas por lote al hacer streaming
+LIMITE_PAGINA = int(os.getenv('EMPLEADOS_LIMITE_PAGINA', 100))
+LIMITE_PAGINA_MAXIMO = int(os.getenv('EMPLEADOS_LIMITE_PAGINA_MAXIMO', 1000))
+LOTE_STREAMING = int(os.getenv('EMPLEADOS_LOTE_STREAMING', 1000))
+
+# Fragmentos verticales que une la vista (deben coincidir con su definición)
+FRAGMENTO_PRINCIPAL = os.getenv('EMPLEADOS_FRAGMENTO_PRINCIPAL', 'empleados_principal')
+FRAGMENTO_COMPLEMENTARIO = os.getenv('EMPLEADOS_FRAGMENTO_COMPLEMENTARIO', 'empleados_complementario')
+
+# Modos de ejecución: la vista de Quito o el merge join de los fragmentos en la API
+MODO_VISTA = "vista"
+MODO_MERGE = "merge"
+
+COLUMNAS_EMPLEADO = [
+    "empleado_id", "nombre", "apellido", "cargo", "ciudad_tienda",
+    "salario", "fecha_contratacion", "contacto_emergencia"
+]
+
+
+def _fila_a_empleado(row) -> Dict:
+    return {
+        "empleado_id": row[0],
+        "nombre": row[1],
+        "apellido": row[2],
+        "cargo": row[3],
+        "ciudad_tienda": row[4],
+        "salario": float(row[5]) if row[5] else None,
+        "fecha_contratacion": str(row[6]) if row[6] else None,
+        "contacto_emergencia": row[7]
+    }
+
+
+COLUMNAS_PRINCIPAL = ["empleado_id", "nombre", "apellido", "cargo", "ciudad_tienda"]
+COLUMNAS_COMPLEMENTARIO = ["empleado_id", "salario", "fecha_contratacion", "contacto_emergencia"]
+
+
+def _condiciones(ciudad_tienda: Optional[str] = None, cargo: Optional[str] = None,
+                 after_id: Optional[int] = None):
+    """WHERE con los filtros indicados, evaluados en PostgreSQL"""
+    condiciones = []
+    params = []
+    if ciudad_tienda:
+        condiciones.append("ciudad_tienda = %s")
+        params.append(ciudad_tienda)
+    if cargo:
+        condiciones.append("cargo = %s")
+        params.append(cargo)
+    if after_id is not None:
+        condiciones.append("empleado_id > %s")
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return where, params
+
+
+class _LectorFragmento:
+    """Lotes de un fragmento ordenado por empleado_id, consumidos fila a fila"""
+
+    def __init__(self, lotes: AsyncIterator[list]):
+        self._lotes = lotes
+        self.filas = deque()
+        self.agotado = False
+
+    async def rellenar(self):
+        try:
+            self.filas.extend(await self._lotes.__anext__())
+        except StopAsyncIteration:
+            self.agotado = True
+
+    @property
+    def necesita_lote(self) -> bool:
+        return not self.filas and not self.agotado
+
+
+async def merge_join_por_id(principal: AsyncIterator[list], complementario: AsyncIterator[list]) -> AsyncIterator[list]:
+    """Sort-merge join (inner) de dos flujos de lotes ordenados por la clave en row[0]
+
+    Cuando ambos lados necesitan datos se piden a la vez, así la lectura de
+    los dos nodos se solapa. Devuelve lotes de pares (fila_principal, fila_complementaria).
+    """
+    izq, der = _LectorFragmento(principal), _LectorFragmento(complementario)
+    while True:
+        pendientes = [lector for lector in (izq, der) if lector.necesita_lote]
+        if pendientes:
+            await asyncio.gather(*(lector.rellenar() for lector in pendientes))
+            continue
+        if not izq.filas or not der.filas:
+            return
+        lote = []
+        while izq.filas and der.filas:
+            clave_izq, clave_der = izq.filas[0][0], der.filas[0][0]
+            if clave_izq == clave_der:
+                lote.append((izq.filas.popleft(), der.filas.popleft()))
+            elif clave_izq < clave_der:
+                izq.filas.popleft()
+            else:
+                der.filas.popleft()
+        if lote:
+            yield lote
+
+
 class EmpleadosVistaCompletaService:
     """Servicio para consultar empleados con fragmentos verticales unidos (Quito + Guayaquil)"""
     
     def __init__(self):
         # Usar nodo de Quito que tiene la vista que une ambos fragmentos
         self.postgres_conn = PostgresConnection(db_number=1)
+        # Fragmento complementario, leído directamente en modo merge
+        self.guayaquil_conn = PostgresConnection(db_number=2)
     
-    async def get_all_empleados_completos(self) -> List[Dict]:
+    async def get_all_empleados_completos(self, ciudad_tienda: Optional[str] = None,
+                                          cargo: Optional[str] = None, modo: str = MODO_VISTA) -> List[Dict]:
         """
         Obtiene todos los empleados con datos completos usando la vista que une
         fragmentos verticales de Quito (datos principales) y Guayaquil (datos complementarios)
         """
+        if modo == MODO_MERGE:
+            # El merge lee dos nodos: se comparte el resultado completo entre peticiones idénticas
+            return await coalescedor.compartir(
+                ("empleados.merge", ciudad_tienda, cargo),
+                lambda: self._merge_completo(ciudad_tienda, cargo),
+                "empleados.merge"
+            )
         try:
-            async with self.postgres_conn.get_session() as session:
-                # Consultar la vista que une los fragmentos verticales
-                query = """
-                SELECT 
-                    empleado_id,
-                    nombre,
-                    apellido,
-                    cargo,
-                    ciudad_tienda,
-                    salario,
-                    fecha_contratacion,
-                    contacto_emergencia
-                FROM empleados_vista_completa
-                ORDER BY empleado_id
-                """
-                
-                result = await session.execute(query)
-                empleados = []
-                
-                for row in result.fetchall():
-                    empleado = {
-                        "empleado_id": row[0],
-                        "nombre": row[1],
-                        "apellido": row[2],
-                        "cargo": row[3],
-                        "ciudad_tienda": row[4],
-                        "salario": float(row[5]) if row[5] else None,
-                        "fecha_contratacion": str(row[6]) if row[6] else None,
-                        "contacto_emergencia": row[7]
-                    }
-                    empleados.append(empleado)
-                
-                logger.info(f"✅ Obtenidos {len(empleados)} empleados de la vista completa")
-                return empleados
+            # Consultar la vista que une los fragmentos verticales
+            where, params = _condiciones(ciudad_tienda, cargo)
+            query = f"""
+            SELECT 
+                empleado_id,
+                nombre,
+                apellido,
+                cargo,
+                ciudad_tienda,
+                salario,
+                fecha_contratacion,
+                contacto_emergencia
+            FROM empleados_vista_completa
+            {where}
+            ORDER BY empleado_id
+            """
+            
+            filas = await consultar_compartido(self.postgres_conn, query, params, etiqueta="empleados.todos")
+            empleados = [_fila_a_empleado(row) for row in filas]
+            
+            logger.info(f"✅ Obtenidos {len(empleados)} empleados de la vista completa")
+            return empleados
                 
         except Exception as e:
             logger.error(f"❌ Error obteniendo empleados completos: {e}")
             raise Exception(f"Error al consultar empleados: {str(e)}")
+
+    async def _merge_completo(self, ciudad_tienda: Optional[str], cargo: Optional[str]) -> List[Dict]:
+        empleados = []
+        async for lote in self.stream_empleados_merge(ciudad_tienda=ciudad_tienda, cargo=cargo):
+            empleados.extend(lote)
+        logger.info(f"✅ Obtenidos {len(empleados)} empleados con merge join de fragmentos")
+        return empleados
+
+    async def get_empleados_pagina(self, limite: int = LIMITE_PAGINA, after_id: Optional[int] = None,
+                                   ciudad_tienda: Optional[str] = None, cargo: Optional[str] = None,
+                                   modo: str = MODO_VISTA) -> Dict:
+        """Página de empleados por keyset sobre empleado_id (empleado_id > after_id)"""
+        limite = max(1, min(limite, LIMITE_PAGINA_MAXIMO))
+        if modo == MODO_MERGE:
+            empleados = []
+            lotes = self.stream_empleados_merge(limite + 1, ciudad_tienda, cargo, after_id)
+            try:
+                async for lote in lotes:
+                    empleados.extend(lote)
+                    if len(empleados) > limite:
+                        break
+            finally:
+                await lotes.aclose()
+            return self._pagina(empleados, limite)
+        where, params = _condiciones(ciudad_tienda, cargo, after_id)
+        query = f"""
+        SELECT {", ".join(COLUMNAS_EMPLEADO)}
+        FROM empleados_vista_completa
+        {where}
+        ORDER BY empleado_id
+        LIMIT %s
+        """
+        # Una fila extra indica si hay página siguiente
+        params.append(limite + 1)
+        try:
+            filas = await consultar_compartido(self.postgres_conn, query, params, etiqueta="empleados.pagina")
+            empleados = [_fila_a_empleado(row) for row in filas]
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo página de empleados: {e}")
+            raise Exception(f"Error al consultar empleados: {str(e)}")
+
+        return self._pagina(empleados, limite)
+
+    @staticmethod
+    def _pagina(empleados: List[Dict], limite: int) -> Dict:
+        hay_mas = len(empleados) > limite
+        empleados = empleados[:limite]
+        return {
+            "items": empleados,
+            "limite": limite,
+            "siguiente_after_id": empleados[-1]["empleado_id"] if hay_mas else None
+        }
+
+    async def stream_empleados_completos(self, lote: int = LOTE_STREAMING, ciudad_tienda: Optional[str] = None,
+                                         cargo: Optional[str] = None, modo: str = MODO_VISTA) -> AsyncIterator[List[Dict]]:
+        """Recorre la vista con un cursor del servidor, entregando lotes de empleados"""
+        if modo == MODO_MERGE:
+            async for empleados in self.stream_empleados_merge(lote, ciudad_tienda, cargo):
+                yield empleados
+            return
+        where, params = _condiciones(ciudad_tienda, cargo)
+        query = f"""
+        SELECT {", ".join(COLUMNAS_EMPLEADO)}
+        FROM empleados_vista_completa
+        {where}
+        ORDER BY empleado_id
+        """
+        total = 0
+        async with self.postgres_conn.get_session() as session:
+            async for rows in session.stream(query, tuple(params), batch_size=lote):
+                total += len(rows)
+                yield [_fila_a_empleado(row) for row in rows]
+        logger.info(f"📤 Streaming de empleados completado: {total} filas")
+
+    async def _stream_fragmento(self, conn, tabla: str, columnas: List[str], condiciones: tuple,
+                                lote: int) -> AsyncIterator[list]:
+        where, params = condiciones
+        query = f"SELECT {', '.join(columnas)} FROM {tabla} {where} ORDER BY empleado_id"
+        async with conn.get_session() as session:
+            async for rows in session.stream(query, tuple(params), batch_size=lote):
+                yield rows
+
+    async def _complementario_por_claves(self, principal: AsyncIterator[list]) -> AsyncIterator[list]:
+        """Join dirigido: por cada lote del principal lee en Guayaquil solo esas claves
+
+        La consulta de las claves de un lote se solapa con la lectura del
+        lote siguiente del principal. Devuelve lotes de pares como merge_join_por_id.
+        """
+        query = (
+            f"SELECT {', '.join(COLUMNAS_COMPLEMENTARIO)} FROM {FRAGMENTO_COMPLEMENTARIO} "
+            "WHERE empleado_id = ANY(%s) ORDER BY empleado_id"
+        )
+
+        async def siguiente_lote():
+            try:
+                return await principal.__anext__()
+            except StopAsyncIteration:
+                return None
+
+        async with self.guayaquil_conn.get_session() as session:
+            async def complementar(filas):
+                result = await session.execute(query, ([fila[0] for fila in filas],))
+                return {fila[0]: fila for fila in result.fetchall()}
+
+            filas = await siguiente_lote()
+            while filas:
+                complementarias, siguientes = await asyncio.gather(complementar(filas), siguiente_lote())
+                pares = [(fila, complementarias[fila[0]]) for fila in filas if fila[0] in complementarias]
+                if pares:
+                    yield pares
+                filas = siguientes
+
+    async def stream_empleados_merge(self, lote: int = LOTE_STREAMING, ciudad_tienda: Optional[str] = None,
+                                     cargo: Optional[str] = None, after_id: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """Une en la API los fragmentos de Quito y Guayaquil en orden de empleado_id
+
+        Sin filtros ambos fragmentos se leen completos a la vez (merge join).
+        Los filtros de la vista son columnas del fragmento principal: con
+        ellos el complementario se lee solo por las claves que pasan el
+        filtro, así el costo sigue a la selectividad y no al tamaño de la tabla.
+        """
+        principal = self._stream_fragmento(
+            self.postgres_conn, FRAGMENTO_PRINCIPAL, COLUMNAS_PRINCIPAL,
+            _condiciones(ciudad_tienda, cargo, after_id), lote
+        )
+        if ciudad_tienda or cargo:
+            complementario = None
+            pares_por_lote = self._complementario_por_claves(principal)
+        else:
+            # after_id acota ambos fragmentos
+            complementario = self._stream_fragmento(
+                self.guayaquil_conn, FRAGMENTO_COMPLEMENTARIO, COLUMNAS_COMPLEMENTARIO,
+                _condiciones(after_id=after_id), lote
+            )
+            pares_por_lote = merge_join_por_id(principal, complementario)
+        total = 0
+        try:
+            async for pares in pares_por_lote:
+                total += len(pares)
+                yield [_fila_a_empleado(tuple(p) + tuple(c[1:])) for p, c in pares]
+        finally:
+            abiertos = [pares_por_lote, principal] + ([complementario] if complementario else [])
+            await asyncio.gather(*(g.aclose() for g in abiertos), return_exceptions=True)
+        logger.info(f"🔀 Merge join de fragmentos de empleados: {total} filas")
@@ -0,0 +1,213 @@
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import math
+import os
+import time
+import logging
+
+from app.services.convergencia import ResultadoConvergencia, esperar_replicacion
+
+logger = logging.getLogger(__name__)
+
+# Enlaces de replicación medidos
+GUAYAQUIL_QUITO = "guayaquil_quito"
+QUITO_CUENCA = "quito_cuenca"
+PROMOCIONES_QUITO_GUAYAQUIL = "promociones_quito_guayaquil"
+
+ENLACES = {
+    GUAYAQUIL_QUITO: "Guayaquil → Quito (peliculas_catalogo)",
+    QUITO_CUENCA: "Quito → Cuenca vía trigger (peliculas_catalogo)",
+    PROMOCIONES_QUITO_GUAYAQUIL: "Quito ⇄ Guayaquil (promociones)",
+}
+
+# Muestras que conserva la ventana móvil de cada enlace
+VENTANA_MUESTRAS = int(os.getenv('LAG_VENTANA_MUESTRAS', 1000))
+# Intervalo del sondeo en segundo plano (0 = desactivado, las sondas escriben filas)
+INTERVALO_SONDEO = float(os.getenv('LAG_SONDEO_INTERVALO', 0))
+
+CUANTILES = (0.5, 0.95, 0.99)
+
+
+def _percentil(ordenadas: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    indice = max(0, math.ceil(q * len(ordenadas)) - 1)
+    return ordenadas[indice]
+
+
+class HistogramaLag:
+    """Ventana móvil de lags medidos para un enlace"""
+
+    def __init__(self, tamano: int = VENTANA_MUESTRAS):
+        self.muestras = deque(maxlen=tamano)
+        self.total = 0
+        self.fallos = 0
+        self.ultima_medicion: Optional[datetime] = None
+        self.ultimo_lag_ms: Optional[float] = None
+
+    def registrar(self, lag_ms: Optional[float]):
+        """Registra un lag medido; None indica que no convergió (fallo)"""
+        self.ultima_medicion = datetime.now()
+        self.ultimo_lag_ms = lag_ms
+        if lag_ms is None:
+            self.fallos += 1
+            return
+        self.muestras.append(lag_ms)
+        self.total += 1
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        if not self.muestras:
+            return {"p50": None, "p95": None, "p99": None, "max": None}
+        ordenadas = sorted(self.muestras)
+        return {
+            "p50": round(_percentil(ordenadas, 0.5), 1),
+            "p95": round(_percentil(ordenadas, 0.95), 1),
+            "p99": round(_percentil(ordenadas, 0.99), 1),
+            "max": round(ordenadas[-1], 1)
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "muestras_ventana": len(self.muestras),
+            "mediciones_total": self.total,
+            "fallos": self.fallos,
+            "ultimo_lag_ms": round(self.ultimo_lag_ms, 1) if self.ultimo_lag_ms is not None else None,
+            "ultima_medicion": self.ultima_medicion.isoformat() if self.ultima_medicion else None,
+            "lag_ms": self.percentiles()
+        }
+
+
+async def _sonda_guayaquil_quito() -> ResultadoConvergencia:
+    from app.services.replicacion_unidireccional_service import ReplicacionUnidireccionalService
+    service = ReplicacionUnidireccionalService()
+    insertadas = await service.insertar_peliculas_guayaquil(1)
+    inicio = time.perf_counter()
+    return await esperar_replicacion(
+        lambda ids: service.buscar_peliculas_nodo(1, ids),
+        [p["pelicula_id"] for p in insertadas],
+        inicio=inicio,
+        tabla="peliculas_catalogo"
+    )
+
+
+async def _sonda_quito_cuenca() -> ResultadoConvergencia:
+    from app.services.replicacion_quito_cuenca_service import ReplicacionQuitoCuencaService
+    service = ReplicacionQuitoCuencaService()
+    insertadas = await service.insertar_peliculas_quito(1)
+    inicio = time.perf_counter()
+    return await esperar_replicacion(
+        service.buscar_peliculas_cuenca,
+        [p["pelicula_id"] for p in insertadas],
+        inicio=inicio
+    )
+
+
+async def _sonda_promociones() -> ResultadoConvergencia:
+    from app.services.promociones_service import PromocionesService
+    service = PromocionesService(nodo_insercion="Quito")
+    insertadas = await service.insertar_promociones_automaticas(1)
+    inicio = time.perf_counter()
+    return await esperar_replicacion(
+        service.buscar_promociones_otro_nodo,
+        [r["promocion_id"] for r in insertadas],
+        inicio=inicio,
+        tabla="promociones"
+    )
+
+
+SONDAS = {
+    GUAYAQUIL_QUITO: _sonda_guayaquil_quito,
+    QUITO_CUENCA: _sonda_quito_cuenca,
+    PROMOCIONES_QUITO_GUAYAQUIL: _sonda_promociones,
+}
+
+
+class MetricasReplicacion:
+    """Histogramas de lag por enlace, alimentados por sondas y por los flujos de evidencia"""
+
+    def __init__(self):
+        self.histogramas = {enlace: HistogramaLag() for enlace in ENLACES}
+        self._tarea = None
+
+    def registrar(self, enlace: str, convergencia: ResultadoConvergencia):
+        self.histogramas[enlace].registrar(convergencia.lag_ms)
+
+    async def sondear(self, enlace: str) -> ResultadoConvergencia:
+        """Escribe una fila sonda en el origen y mide cuándo aparece en el destino"""
+        convergencia = await SONDAS[enlace]()
+        self.registrar(enlace, convergencia)
+        logger.info(f"📏 Sonda {enlace}: {convergencia.to_dict()}")
+        return convergencia
+
+    async def sondear_todos(self) -> Dict[str, dict]:
+        """Sondea los tres enlaces en paralelo"""
+        resultados = await asyncio.gather(
+            *(self.sondear(enlace) for enlace in ENLACES), return_exceptions=True
+        )
+        return {
+            enlace: {"error": str(r)} if isinstance(r, Exception) else r.to_dict()
+            for enlace, r in zip(ENLACES, resultados)
+        }
+
+    async def _bucle_sondeo(self, intervalo: float):
+        while True:
+            await self.sondear_todos()
+            await asyncio.sleep(intervalo)
+
+    def iniciar(self, intervalo: float = None):
+        """Arranca el sondeo periódico si hay intervalo configurado"""
+        intervalo = INTERVALO_SONDEO if intervalo is None else intervalo
+        if intervalo > 0 and self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle_sondeo(intervalo))
+            logger.info(f"📏 Sondeo de lag de replicación cada {intervalo}s")
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def resumen(self) -> dict:
+        return {
+            enlace: {"descripcion": ENLACES[enlace], **histograma.to_dict()}
+            for enlace, histograma in self.histogramas.items()
+        }
+
+    def prometheus(self) -> str:
+        """Métricas en formato de texto de Prometheus"""
+        lineas = [
+            "# HELP replicacion_lag_ms Lag de replicación medido por enlace (ventana móvil)",
+            "# TYPE replicacion_lag_ms summary",
+        ]
+        # Cuantiles, suma y conteo salen de la misma ventana para que sean coherentes entre sí
+        for enlace, h in self.histogramas.items():
+            if h.muestras:
+                ordenadas = sorted(h.muestras)
+                for q in CUANTILES:
+                    lineas.append(f'replicacion_lag_ms{{enlace="{enlace}",quantile="{q}"}} {_percentil(ordenadas, q):.3f}')
+            lineas.append(f'replicacion_lag_ms_sum{{enlace="{enlace}"}} {sum(h.muestras):.3f}')
+            lineas.append(f'replicacion_lag_ms_count{{enlace="{enlace}"}} {len(h.muestras)}')
+        lineas += [
+            "# HELP replicacion_lag_max_ms Lag máximo en la ventana móvil",
+            "# TYPE replicacion_lag_max_ms gauge",
+        ]
+        lineas += [
+            f'replicacion_lag_max_ms{{enlace="{enlace}"}} {max(h.muestras):.3f}'
+            for enlace, h in self.histogramas.items() if h.muestras
+        ]
+        lineas += [
+            "# HELP replicacion_fallos_total Mediciones que no convergieron antes del deadline",
+            "# TYPE replicacion_fallos_total counter",
+        ]
+        lineas += [
+            f'replicacion_fallos_total{{enlace="{enlace}"}} {h.fallos}'
+            for enlace, h in self.histogramas.items()
+        ]
+        return "\n".join(lineas) + "\n"
+
+
+metricas_replicacion = MetricasReplicacion()
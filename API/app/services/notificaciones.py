@@ -0,0 +1,182 @@
+"""Escucha LISTEN/NOTIFY en los nodos PostgreSQL y publica los cambios en el bus
+
+Cada tabla observada notifica por el canal `cambios_<tabla>` con un payload
+JSON opcional. Los triggers (a nivel de sentencia: una notificación por
+INSERT/UPDATE/DELETE, con la cantidad de filas) están en sql/notificaciones.sql
+y se crean en Quito y Guayaquil.
+
+Cada listener encola las notificaciones y una sola tarea por nodo las
+procesa por lotes: una invalidación de cache por tabla y un evento del bus
+por (tabla, operación), aunque el lote traiga miles de notificaciones.
+"""
+from collections import defaultdict
+from typing import Dict, List
+import asyncio
+import json
+import os
+import logging
+
+import asyncpg
+
+from app.database.pool_registry import NODOS_POSTGRES, pool_registry, postgres_params
+from app.services.bus_eventos import bus_eventos
+from app.services.cache_respuestas import cache_respuestas
+
+logger = logging.getLogger(__name__)
+
+# Tablas observadas (coma separadas) y activación de los listeners
+TABLAS_NOTIFICADAS = [
+    t.strip() for t in os.getenv(
+        'NOTIFY_TABLAS',
+        'peliculas_catalogo,promociones,clientes_quito,clientes_guayaquil,empleados_principal,empleados_complementario'
+    ).split(",") if t.strip()
+]
+NOTIFY_HABILITADO = os.getenv('NOTIFY_HABILITADO', 'true').lower() == 'true'
+# Espera máxima entre reintentos de conexión de un listener (segundos)
+REINTENTO_MAXIMO = float(os.getenv('NOTIFY_REINTENTO_MAXIMO', 30))
+# Ventana para acumular notificaciones en un mismo lote (ms) y tamaño máximo del lote
+VENTANA_LOTE_MS = float(os.getenv('NOTIFY_VENTANA_MS', 100))
+MAX_LOTE = int(os.getenv('NOTIFY_MAX_LOTE', 10000))
+# Ids listados por evento agrupado (la cantidad siempre se informa)
+MAX_IDS_EVENTO = 20
+
+PREFIJO_CANAL = "cambios_"
+
+
+def canal_de_tabla(tabla: str) -> str:
+    return f"{PREFIJO_CANAL}{tabla}"
+
+
+def construir_evento(nodo: str, canal: str, payload: str) -> dict:
+    """Evento del bus a partir de una notificación; el payload puede no ser JSON"""
+    evento = {"tipo": "cambio", "nodo": nodo, "tabla": canal[len(PREFIJO_CANAL):]}
+    if payload:
+        try:
+            datos = json.loads(payload)
+            evento.update(datos if isinstance(datos, dict) else {"payload": datos})
+        except ValueError:
+            evento["payload"] = payload
+    return evento
+
+
+def agrupar_eventos(eventos: List[dict]) -> List[dict]:
+    """Un evento por (nodo, tabla, operación) con la cantidad de filas y los primeros ids"""
+    grupos: Dict[tuple, List[dict]] = defaultdict(list)
+    for evento in eventos:
+        grupos[(evento["nodo"], evento["tabla"], evento.get("operacion"))].append(evento)
+    agrupados = []
+    for (nodo, tabla, operacion), grupo in grupos.items():
+        if len(grupo) == 1:
+            agrupados.append(grupo[0])
+            continue
+        ids = [e["id"] for e in grupo if e.get("id") is not None]
+        agrupado = {"tipo": "cambio", "nodo": nodo, "tabla": tabla, "cantidad": sum(e.get("filas", 1) for e in grupo)}
+        if operacion is not None:
+            agrupado["operacion"] = operacion
+        if ids:
+            agrupado["ids"] = ids[:MAX_IDS_EVENTO]
+        agrupados.append(agrupado)
+    return agrupados
+
+
+class EscuchaNotificaciones:
+    """Un listener asyncpg de larga duración por nodo PostgreSQL"""
+
+    def __init__(self):
+        self.conectados: Dict[str, bool] = {nodo: False for nodo in NODOS_POSTGRES.values()}
+        self.recibidas: Dict[str, int] = {nodo: 0 for nodo in NODOS_POSTGRES.values()}
+        self._tareas: Dict[str, asyncio.Task] = {}
+        self._colas: Dict[str, asyncio.Queue] = {}
+
+    def _recibir(self, nodo: str, canal: str, payload: str):
+        self.recibidas[nodo] += 1
+        self._colas[nodo].put_nowait(construir_evento(nodo, canal, payload))
+
+    async def _consumir(self, cola: asyncio.Queue):
+        """Procesa la cola del nodo por lotes: invalida cada tabla una vez y publica los eventos agrupados"""
+        while True:
+            lote = [await cola.get()]
+            await asyncio.sleep(VENTANA_LOTE_MS / 1000)
+            while not cola.empty() and len(lote) < MAX_LOTE:
+                lote.append(cola.get_nowait())
+            try:
+                await cache_respuestas.invalidar_tablas(sorted({evento["tabla"] for evento in lote}))
+            except Exception as e:
+                logger.error(f"❌ Error invalidando cache por notificaciones: {e}")
+            for evento in agrupar_eventos(lote):
+                bus_eventos.publicar(evento)
+
+    def _estado(self, nodo: str, conectado: bool):
+        if self.conectados[nodo] != conectado:
+            self.conectados[nodo] = conectado
+            bus_eventos.publicar({"tipo": "estado", "nodo": nodo, "escuchando": conectado})
+
+    async def _escuchar(self, nodo: str, db_number: int):
+        cola = self._colas[nodo] = asyncio.Queue()
+        consumidor = asyncio.create_task(self._consumir(cola))
+        try:
+            await self._reconectar(nodo, db_number)
+        finally:
+            consumidor.cancel()
+
+    async def _reconectar(self, nodo: str, db_number: int):
+        espera = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(
+                    **postgres_params(db_number), timeout=pool_registry.settings.connect_timeout
+                )
+                cerrada = asyncio.Event()
+                conn.add_termination_listener(lambda _: cerrada.set())
+                for tabla in TABLAS_NOTIFICADAS:
+                    await conn.add_listener(
+                        canal_de_tabla(tabla),
+                        lambda _conn, _pid, canal, payload: self._recibir(nodo, canal, payload)
+                    )
+                logger.info(f"📡 Escuchando cambios en {nodo}: {', '.join(TABLAS_NOTIFICADAS)}")
+                self._estado(nodo, True)
+                espera = 1.0
+                await cerrada.wait()
+                logger.warning(f"⚠️ Conexión de notificaciones de {nodo} cerrada")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Listener de notificaciones de {nodo}: {e}")
+            finally:
+                self._estado(nodo, False)
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, REINTENTO_MAXIMO)
+
+    def iniciar(self):
+        """Arranca un listener por nodo PostgreSQL"""
+        if not NOTIFY_HABILITADO or self._tareas:
+            return
+        for db_number, nodo in NODOS_POSTGRES.items():
+            self._tareas[nodo] = asyncio.create_task(self._escuchar(nodo, db_number))
+
+    async def detener(self):
+        for tarea in self._tareas.values():
+            tarea.cancel()
+        await asyncio.gather(*self._tareas.values(), return_exceptions=True)
+        self._tareas.clear()
+
+    def estado(self) -> dict:
+        return {
+            "habilitado": NOTIFY_HABILITADO,
+            "canales": [canal_de_tabla(t) for t in TABLAS_NOTIFICADAS],
+            "nodos": {
+                nodo: {
+                    "escuchando": self.conectados[nodo],
+                    "notificaciones_recibidas": self.recibidas[nodo],
+                    "en_cola": self._colas[nodo].qsize() if nodo in self._colas else 0
+                }
+                for nodo in self.conectados
+            },
+            "bus": bus_eventos.estadisticas()
+        }
+
+
+escucha_notificaciones = EscuchaNotificaciones()
@@ -1,5 +1,12 @@
 from typing import List, Dict
 from app.database.postgres_connection import PostgresConnection
+from app.services.consulta_paralela import consultar_nodos_en_paralelo, errores_por_nodo
+from app.services.convergencia import esperar_replicacion
+from app.services.metricas_replicacion import metricas_replicacion, PROMOCIONES_QUITO_GUAYAQUIL
+from app.services.verificacion_claves import leer_claves, claves_de_filas, comparar_claves, COLUMNAS_HASH_PROMOCIONES
+from app.services.cache_respuestas import cache_respuestas
+from app.services.snapshot_columnar import SnapshotColumnar, ESQUEMA_PROMOCIONES, FORMATO_FILAS, con_formato, leer_snapshot
+from app.services.trabajos import reportar_progreso
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,56 +22,64 @@ class PromocionesService:
             self.postgres_conn = PostgresConnection(db_number=2)  # Nodo Guayaquil
         self.nodo_insercion = nodo_insercion
     
-    async def consultar_estado_tablas(self, momento: str) -> Dict:
-        """Consulta el estado de las tablas promociones en ambos nodos"""
+    async def _consultar_promociones(self, conn: PostgresConnection) -> SnapshotColumnar:
+        """Lee la tabla promociones de un nodo"""
+        return await leer_snapshot(conn, "promociones", ESQUEMA_PROMOCIONES, "promocion_id")
+    
+    async def buscar_promociones_otro_nodo(self, ids: List[int]) -> List[int]:
+        """Devuelve cuáles de los promocion_id dados ya existen en el otro nodo"""
+        other_conn = PostgresConnection(db_number=2 if self.nodo_insercion == "Quito" else 1)
         try:
-            # Consultar desde el nodo actual (donde se inserta)
-            async with self.postgres_conn.get_session() as session:
-                query = "SELECT * FROM promociones ORDER BY promocion_id"
-                result = await session.execute(query)
-                promociones_nodo_actual = [
-                    {
-                        "promocion_id": row[0],
-                        "codigo_promo": row[1],
-                        "descripcion": row[2],
-                        "descuento_porcentaje": float(row[3]) if row[3] else None,
-                        "fecha_creacion": row[4],
-                        "ciudad": row[5]
-                    }
-                    for row in result.fetchall()
-                ]
-            
-            # Consultar desde el otro nodo (para evidenciar replicación)
+            async with other_conn.get_session() as session:
+                result = await session.ejecutar("promociones.existentes", (list(ids),))
+                return [row[0] for row in result.fetchall()]
+        finally:
+            other_conn.close()
+    
+    async def consultar_estado_tablas(
+        self, momento: str, incluir_tablas: bool = False, formato_tablas: str = FORMATO_FILAS
+    ) -> Dict:
+        """Consulta el estado de las tablas promociones en ambos nodos (en paralelo)
+        
+        Por defecto solo lee claves y hash de contenido, y devuelve un diff
+        compacto; con incluir_tablas devuelve además las tablas completas.
+        """
+        try:
+            # El otro nodo sirve para evidenciar la replicación
             otro_nodo = "Guayaquil" if self.nodo_insercion == "Quito" else "Quito"
             otro_nodo_num = 2 if self.nodo_insercion == "Quito" else 1
             other_conn = PostgresConnection(db_number=otro_nodo_num)
             
             try:
-                async with other_conn.get_session() as session:
-                    query = "SELECT * FROM promociones ORDER BY promocion_id"
-                    result = await session.execute(query)
-                    promociones_otro_nodo = [
-                        {
-                            "promocion_id": row[0],
-                            "codigo_promo": row[1],
-                            "descripcion": row[2],
-                            "descuento_porcentaje": float(row[3]) if row[3] else None,
-                            "fecha_creacion": row[4],
-                            "ciudad": row[5]
-                        }
-                        for row in result.fetchall()
-                    ]
+                if incluir_tablas:
+                    resultados = await consultar_nodos_en_paralelo({
+                        self.nodo_insercion: self._consultar_promociones(self.postgres_conn),
+                        otro_nodo: self._consultar_promociones(other_conn)
+                    }, default=[])
+                else:
+                    resultados = await consultar_nodos_en_paralelo({
+                        self.nodo_insercion: leer_claves(self.postgres_conn, "promociones", "promocion_id", COLUMNAS_HASH_PROMOCIONES),
+                        otro_nodo: leer_claves(other_conn, "promociones", "promocion_id", COLUMNAS_HASH_PROMOCIONES)
+                    }, default={})
             finally:
                 other_conn.close()  # Asegurar que se cierre la conexión
             
-            return {
+            promociones_nodo_actual = resultados[self.nodo_insercion].datos
+            promociones_otro_nodo = resultados[otro_nodo].datos
+            if incluir_tablas:
+                claves_nodo_actual = claves_de_filas(promociones_nodo_actual, "promocion_id", COLUMNAS_HASH_PROMOCIONES)
+                claves_otro_nodo = claves_de_filas(promociones_otro_nodo, "promocion_id", COLUMNAS_HASH_PROMOCIONES)
+            else:
+                claves_nodo_actual, claves_otro_nodo = promociones_nodo_actual, promociones_otro_nodo
+            
+            estado = {
                 "momento": momento,
                 "nodo_insercion": self.nodo_insercion,
-                f"promociones_{self.nodo_insercion.lower()}": promociones_nodo_actual,
-                f"promociones_{otro_nodo.lower()}": promociones_otro_nodo,
                 "total_registros_nodo_insercion": len(promociones_nodo_actual),
                 "total_registros_otro_nodo": len(promociones_otro_nodo),
                 "replicacion_sincronizada": len(promociones_nodo_actual) == len(promociones_otro_nodo),
+                "verificacion_claves": comparar_claves(claves_nodo_actual, claves_otro_nodo).to_dict(),
+                "errores": errores_por_nodo(resultados),
                 "debug_info": {
                     "nodo_insercion_db": f"DB{1 if self.nodo_insercion == 'Quito' else 2}",
                     "otro_nodo_db": f"DB{otro_nodo_num}",
@@ -72,6 +87,10 @@ class PromocionesService:
                     "conexion_otro_nodo": f"{other_conn.host}:{other_conn.port}"
                 }
             }
+            if incluir_tablas:
+                estado[f"promociones_{self.nodo_insercion.lower()}"] = con_formato(promociones_nodo_actual, formato_tablas)
+                estado[f"promociones_{otro_nodo.lower()}"] = con_formato(promociones_otro_nodo, formato_tablas)
+            return estado
                 
         except Exception as e:
             print(f"Error al consultar estado de tablas: {e}")
@@ -103,12 +122,7 @@ class PromocionesService:
                     descuento = 15.0 + (i * 1.5)
                     ciudad = self.nodo_insercion
                     
-                    query_insert = """
-                    INSERT INTO promociones (codigo_promo, descripcion, descuento_porcentaje, ciudad)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING promocion_id
-                    """
-                    result = await session.execute(query_insert, (codigo_promo, descripcion, descuento, ciudad))
+                    result = await session.ejecutar("promociones.insertar", (codigo_promo, descripcion, descuento, ciudad))
                     nuevo_id = result.fetchone()[0]
                     
                     registros_insertados.append({
@@ -122,6 +136,7 @@ class PromocionesService:
                 # COMMIT EXPLÍCITO para asegurar que los cambios se persistan
                 await session.commit()
                 logger.info(f"✅ Insertados {cantidad} registros en {self.nodo_insercion} con commit exitoso")
+            await cache_respuestas.invalidar_tablas(["promociones"])
             
             return registros_insertados
                 
@@ -129,27 +144,37 @@ class PromocionesService:
             logger.error(f"Error insertando promociones en {self.nodo_insercion}: {e}")
             raise Exception(f"Error al insertar promociones: {str(e)}")
     
-    async def evidenciar_replicacion_bidireccional(self, cantidad_registros: int) -> Dict:
+    async def evidenciar_replicacion_bidireccional(
+        self, cantidad_registros: int, incluir_tablas: bool = False, formato_tablas: str = FORMATO_FILAS
+    ) -> Dict:
         """Evidencia completa de replicación bidireccional con tiempo de espera mejorado"""
         try:
             logger.info(f"🔄 Iniciando evidencia de replicación bidireccional - Nodo: {self.nodo_insercion}")
             
             # 1. Estado ANTES
             logger.info("📊 Consultando estado ANTES de la inserción...")
-            estado_antes = await self.consultar_estado_tablas("ANTES de la inserción")
+            reportar_progreso("consultando estado inicial", 0.0)
+            estado_antes = await self.consultar_estado_tablas("ANTES de la inserción", incluir_tablas, formato_tablas)
             
             # 2. INSERCIÓN
             logger.info(f"📝 Insertando {cantidad_registros} registros en {self.nodo_insercion}...")
+            reportar_progreso(f"insertando en {self.nodo_insercion}", 0.25)
             registros_insertados = await self.insertar_promociones_automaticas(cantidad_registros)
             
-            # 3. Espera más larga para la replicación
-            import asyncio
-            logger.info("⏳ Esperando 3 segundos para que se complete la replicación...")
-            await asyncio.sleep(3)  # Aumentamos a 3 segundos
+            # 3. Esperar a que las promociones insertadas aparezcan en el otro nodo
+            logger.info("⏳ Esperando a que se complete la replicación...")
+            reportar_progreso("esperando replicación", 0.5)
+            convergencia = await esperar_replicacion(
+                self.buscar_promociones_otro_nodo,
+                [r["promocion_id"] for r in registros_insertados],
+                tabla="promociones"
+            )
+            metricas_replicacion.registrar(PROMOCIONES_QUITO_GUAYAQUIL, convergencia)
             
             # 4. Estado DESPUÉS
             logger.info("📊 Consultando estado DESPUÉS de la inserción...")
-            estado_despues = await self.consultar_estado_tablas("DESPUÉS de la inserción")
+            reportar_progreso("consultando estado final", 0.75)
+            estado_despues = await self.consultar_estado_tablas("DESPUÉS de la inserción", incluir_tablas, formato_tablas)
             
             # 5. Análisis de replicación
             incremento_nodo_insercion = estado_despues["total_registros_nodo_insercion"] - estado_antes["total_registros_nodo_insercion"]
@@ -176,6 +201,7 @@ class PromocionesService:
                         "incremento_otro_nodo": incremento_otro_nodo,
                         "replicacion_funciona": replicacion_exitosa,
                         "ambos_nodos_sincronizados": estado_despues["replicacion_sincronizada"],
+                        "convergencia": convergencia.to_dict(),
                         "diagnostico": {
                             "esperado_incremento": cantidad_registros,
                             "obtenido_nodo_insercion": incremento_nodo_insercion,
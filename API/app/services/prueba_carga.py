@@ -0,0 +1,309 @@
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+import logging
+
+from app.database.postgres_connection import PostgresConnection
+from app.database.oracle_connection import OracleConnection
+from app.services.metricas_replicacion import (
+    ENLACES, GUAYAQUIL_QUITO, QUITO_CUENCA, PROMOCIONES_QUITO_GUAYAQUIL, _percentil
+)
+
+logger = logging.getLogger(__name__)
+
+# Claves por consulta al buscar en el destino (Oracle admite hasta 1000 en un IN)
+CLAVES_POR_CONSULTA = int(os.getenv('PRUEBA_CARGA_CLAVES_POR_CONSULTA', 1000))
+# Un paso está saturado si el lag de la segunda mitad supera en este factor al de la primera
+UMBRAL_SATURACION = float(os.getenv('PRUEBA_CARGA_UMBRAL_SATURACION', 2.0))
+
+
+@dataclass
+class Escritor:
+    """Operaciones de un enlace construidas sobre los métodos existentes de los servicios"""
+    insertar: Callable[[int], Awaitable[List]]
+    buscar: Callable[[List], Awaitable[List]]
+
+
+def _escritor(enlace: str) -> Escritor:
+    from app.services.replicacion_unidireccional_service import ReplicacionUnidireccionalService
+    from app.services.replicacion_quito_cuenca_service import ReplicacionQuitoCuencaService
+    from app.services.promociones_service import PromocionesService
+
+    if enlace == GUAYAQUIL_QUITO:
+        service = ReplicacionUnidireccionalService()
+        return Escritor(
+            lambda n: _claves(service.insertar_peliculas_guayaquil(n), "pelicula_id"),
+            lambda ids: service.buscar_peliculas_nodo(1, ids)
+        )
+    if enlace == QUITO_CUENCA:
+        service = ReplicacionQuitoCuencaService()
+        return Escritor(
+            lambda n: _claves(service.insertar_peliculas_quito(n), "pelicula_id"),
+            service.buscar_peliculas_cuenca
+        )
+    service = PromocionesService(nodo_insercion="Quito")
+    return Escritor(
+        lambda n: _claves(service.insertar_promociones_automaticas(n), "promocion_id"),
+        service.buscar_promociones_otro_nodo
+    )
+
+
+async def _claves(insercion: Awaitable[List[dict]], columna_id: str) -> List:
+    return [fila[columna_id] for fila in await insercion]
+
+
+# Tabla y nodo destino de cada enlace, para muestrear el conteo de filas
+DESTINOS = {
+    GUAYAQUIL_QUITO: (lambda: PostgresConnection(db_number=1), "peliculas_catalogo"),
+    QUITO_CUENCA: (OracleConnection, "peliculas_catalogo"),
+    PROMOCIONES_QUITO_GUAYAQUIL: (lambda: PostgresConnection(db_number=2), "promociones"),
+}
+
+
+async def contar_destino(enlace: str) -> int:
+    crear_conexion, tabla = DESTINOS[enlace]
+    # COUNT(*) de la tabla completa en cada muestra: fuera del SLO del circuito
+    async with crear_conexion().get_session(slo=False) as session:
+        result = await session.execute(f"SELECT COUNT(*) FROM {tabla}")
+        return int(result.fetchone()[0])
+
+
+async def buscar_por_partes(buscar: Callable[[List], Awaitable[List]], claves: List) -> List:
+    encontradas = []
+    for i in range(0, len(claves), CLAVES_POR_CONSULTA):
+        encontradas.extend(await buscar(claves[i:i + CLAVES_POR_CONSULTA]))
+    return encontradas
+
+
+@dataclass
+class ConfigPrueba:
+    """Tasas a recorrer (escrituras/s por enlace), duración de cada paso y concurrencia"""
+    enlaces: List[str] = field(default_factory=lambda: list(ENLACES))
+    tasas: List[float] = field(default_factory=lambda: [1.0, 2.0, 5.0, 10.0])
+    duracion_paso: float = 30.0
+    escritores: int = 4
+    filas_por_escritura: int = 1
+    intervalo_muestreo: float = 0.5
+    drenaje: float = 30.0
+
+    def __post_init__(self):
+        if not self.tasas or any(t <= 0 for t in self.tasas):
+            raise ValueError("Las tasas deben ser mayores que 0 escrituras/s")
+        if self.escritores < 1 or self.filas_por_escritura < 1:
+            raise ValueError("Se necesita al menos un escritor y una fila por escritura")
+
+
+class Limitador:
+    """Reparte turnos a ritmo constante entre los escritores concurrentes"""
+
+    def __init__(self, tasa: float = 1.0):
+        self.tasa = tasa
+        self._siguiente = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def tasa(self) -> float:
+        return self._tasa
+
+    @tasa.setter
+    def tasa(self, tasa: float):
+        if tasa <= 0:
+            raise ValueError(f"Tasa inválida: {tasa} (debe ser mayor que 0)")
+        self._tasa = tasa
+
+    async def turno(self):
+        async with self._lock:
+            ahora = time.perf_counter()
+            turno = max(self._siguiente, ahora)
+            self._siguiente = turno + 1 / self.tasa
+        await asyncio.sleep(turno - ahora)
+
+
+class EstadoEnlace:
+    """Claves escritas, pendientes en el destino, lags observados y muestras de un enlace"""
+
+    def __init__(self, enlace: str):
+        self.enlace = enlace
+        self.inicio = time.perf_counter()
+        self.escritas: Dict = {}              # clave -> instante del commit
+        self.pendientes: Dict = {}            # claves aún no vistas en el destino
+        self.llegadas: List[Tuple[float, float, float]] = []  # (commit, llegada, lag_ms)
+        self.duplicadas_origen: List = []
+        self.errores_escritura = 0
+        self.muestras: List[dict] = []
+
+    def relativo(self, instante: float) -> float:
+        return round(instante - self.inicio, 3)
+
+
+async def _escribir(estado: EstadoEnlace, limitador: Limitador, filas: int, detener: asyncio.Event):
+    escritor = _escritor(estado.enlace)
+    while True:
+        await limitador.turno()
+        if detener.is_set():
+            return
+        try:
+            claves = await escritor.insertar(filas)
+        except Exception as e:
+            estado.errores_escritura += 1
+            logger.warning(f"⚠️ Escritura fallida en {estado.enlace}: {e}")
+            continue
+        commit = time.perf_counter()
+        for clave in claves:
+            if clave in estado.escritas:
+                estado.duplicadas_origen.append(clave)
+            estado.escritas[clave] = commit
+            estado.pendientes[clave] = commit
+
+
+async def _muestrear(estado: EstadoEnlace, intervalo: float, detener: asyncio.Event):
+    escritor = _escritor(estado.enlace)
+    while not detener.is_set():
+        claves = sorted(estado.pendientes)
+        try:
+            encontradas, conteo = await asyncio.gather(
+                buscar_por_partes(escritor.buscar, claves), contar_destino(estado.enlace)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Error muestreando {estado.enlace}: {e}")
+            encontradas, conteo = [], None
+        ahora = time.perf_counter()
+        lags = []
+        for clave in set(encontradas):
+            commit = estado.pendientes.pop(clave, None)
+            if commit is not None:
+                lags.append((ahora - commit) * 1000)
+                estado.llegadas.append((commit, ahora, lags[-1]))
+        lags.sort()
+        estado.muestras.append({
+            "t": estado.relativo(ahora),
+            "escritas": len(estado.escritas),
+            "pendientes": len(estado.pendientes),
+            "conteo_destino": conteo,
+            "lag_p50_ms": round(_percentil(lags, 0.5), 1) if lags else None,
+            "lag_max_ms": round(lags[-1], 1) if lags else None
+        })
+        await asyncio.sleep(intervalo)
+
+
+def _mediana(valores: List[float]) -> Optional[float]:
+    return _percentil(sorted(valores), 0.5) if valores else None
+
+
+def _resumen_paso(estado: EstadoEnlace, tasa: float, desde: float, hasta: float, tolerancia_ms: float) -> dict:
+    segundos = hasta - desde
+    escritas = sum(1 for t in estado.escritas.values() if desde <= t < hasta)
+    replicadas = sum(1 for _, llegada, _ in estado.llegadas if desde <= llegada < hasta)
+    lags = sorted(lag for commit, _, lag in estado.llegadas if desde <= commit < hasta)
+    sin_replicar = sum(1 for t in estado.pendientes.values() if desde <= t < hasta)
+    # Si el destino no da abasto, la cola crece y el lag sube a lo largo del paso
+    mitad = (desde + hasta) / 2
+    lag_inicio = _mediana([lag for commit, _, lag in estado.llegadas if desde <= commit < mitad])
+    lag_final = _mediana([lag for commit, _, lag in estado.llegadas if mitad <= commit < hasta])
+    lag_creciente = (
+        lag_inicio is not None and lag_final is not None
+        and lag_final > UMBRAL_SATURACION * lag_inicio + tolerancia_ms
+    )
+    return {
+        "tasa_objetivo": tasa,
+        "desde_s": estado.relativo(desde),
+        "hasta_s": estado.relativo(hasta),
+        "filas_por_s_origen": round(escritas / segundos, 2),
+        "filas_por_s_destino": round(replicadas / segundos, 2),
+        "lag_p50_ms": round(_percentil(lags, 0.5), 1) if lags else None,
+        "lag_p95_ms": round(_percentil(lags, 0.95), 1) if lags else None,
+        "lag_max_ms": round(lags[-1], 1) if lags else None,
+        "lag_mediana_inicio_ms": round(lag_inicio, 1) if lag_inicio is not None else None,
+        "lag_mediana_final_ms": round(lag_final, 1) if lag_final is not None else None,
+        "lag_creciente": lag_creciente,
+        "sin_replicar": sin_replicar
+    }
+
+
+def _saturacion(pasos: List[dict]) -> Optional[dict]:
+    """Primer paso en que la réplica no sigue el ritmo del origen"""
+    for paso in pasos:
+        if paso["sin_replicar"]:
+            return {"tasa": paso["tasa_objetivo"], "motivo": f"{paso['sin_replicar']} claves sin replicar tras el drenaje"}
+        if paso["lag_creciente"]:
+            return {"tasa": paso["tasa_objetivo"], "motivo": "el lag crece durante el paso (cola acumulándose)"}
+    return None
+
+
+async def _verificar(estado: EstadoEnlace) -> dict:
+    """Claves perdidas (no están en el destino) y duplicadas (aparecen más de una vez)"""
+    claves = sorted(estado.escritas)
+    try:
+        apariciones = Counter(await buscar_por_partes(_escritor(estado.enlace).buscar, claves))
+    except Exception as e:
+        return {"error": str(e)}
+    perdidas = [c for c in claves if apariciones[c] == 0]
+    duplicadas = sorted(c for c, n in apariciones.items() if n > 1)
+    return {
+        "escritas": len(claves),
+        "perdidas": {"total": len(perdidas), "claves": perdidas[:100]},
+        "duplicadas_destino": {"total": len(duplicadas), "claves": duplicadas[:100]},
+        "duplicadas_origen": {"total": len(estado.duplicadas_origen), "claves": estado.duplicadas_origen[:100]}
+    }
+
+
+async def ejecutar_enlace(enlace: str, config: ConfigPrueba) -> dict:
+    """Recorre las tasas configuradas sobre un enlace y mide su replicación"""
+    estado = EstadoEnlace(enlace)
+    limitador = Limitador()
+    detener_escritura, detener_muestreo = asyncio.Event(), asyncio.Event()
+    escritores = [
+        asyncio.create_task(_escribir(estado, limitador, config.filas_por_escritura, detener_escritura))
+        for _ in range(config.escritores)
+    ]
+    muestreo = asyncio.create_task(_muestrear(estado, config.intervalo_muestreo, detener_muestreo))
+
+    limites = []
+    try:
+        for tasa in config.tasas:
+            limitador.tasa = tasa
+            desde = time.perf_counter()
+            logger.info(f"🚦 {enlace}: {tasa} escrituras/s durante {config.duracion_paso}s")
+            await asyncio.sleep(config.duracion_paso)
+            limites.append((tasa, desde, time.perf_counter()))
+    finally:
+        detener_escritura.set()
+        await asyncio.gather(*escritores, return_exceptions=True)
+
+    # Drenaje: se sigue muestreando hasta que el destino alcance al origen o se agote el plazo
+    fin_drenaje = time.perf_counter() + config.drenaje
+    while estado.pendientes and time.perf_counter() < fin_drenaje:
+        await asyncio.sleep(config.intervalo_muestreo)
+    detener_muestreo.set()
+    await muestreo
+
+    # El muestreo solo ve llegadas cada intervalo: diferencias menores no cuentan como crecimiento
+    tolerancia_ms = config.intervalo_muestreo * 1000
+    pasos = [_resumen_paso(estado, tasa, desde, hasta, tolerancia_ms) for tasa, desde, hasta in limites]
+    total_s = limites[-1][2] - limites[0][1] if limites else 0
+    return {
+        "descripcion": ENLACES[enlace],
+        "throughput_sostenido_filas_por_s": round(len(estado.escritas) / total_s, 2) if total_s else 0,
+        "errores_escritura": estado.errores_escritura,
+        "pasos": pasos,
+        "saturacion": _saturacion(pasos),
+        "verificacion": await _verificar(estado),
+        "curva_lag": estado.muestras
+    }
+
+
+async def ejecutar_prueba(config: ConfigPrueba) -> dict:
+    """Ejecuta la prueba sobre todos los enlaces configurados a la vez"""
+    resultados = await asyncio.gather(
+        *(ejecutar_enlace(enlace, config) for enlace in config.enlaces), return_exceptions=True
+    )
+    return {
+        "config": asdict(config),
+        "enlaces": {
+            enlace: {"error": str(r)} if isinstance(r, Exception) else r
+            for enlace, r in zip(config.enlaces, resultados)
+        }
+    }
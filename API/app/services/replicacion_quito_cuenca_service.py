@@ -1,6 +1,13 @@
 from typing import List, Dict
 from app.database.postgres_connection import PostgresConnection
 from app.database.oracle_connection import OracleConnection
+from app.services.consulta_paralela import consultar_nodos_en_paralelo, errores_por_nodo, ResultadoNodo
+from app.services.convergencia import esperar_replicacion
+from app.services.metricas_replicacion import metricas_replicacion, QUITO_CUENCA
+from app.services.verificacion_claves import leer_claves, claves_de_filas, comparar_claves, COLUMNAS_HASH_PELICULAS
+from app.services.cache_respuestas import cache_respuestas
+from app.services.snapshot_columnar import SnapshotColumnar, ESQUEMA_PELICULAS, leer_snapshot
+from app.services.trabajos import reportar_progreso
 import logging
 import os
 
@@ -15,81 +22,71 @@ class ReplicacionQuitoCuencaService:
         # Conexión a Cuenca (Oracle - donde se replican via trigger)
         self.cuenca_conn = OracleConnection()
     
-    async def consultar_peliculas_quito(self) -> List[Dict]:
+    async def consultar_peliculas_quito(self) -> SnapshotColumnar:
         """Consulta películas en Quito (PostgreSQL)"""
-        logger.info("   → Consultando Quito (PostgreSQL)...")
         try:
-            async with self.quito_conn.get_session() as session:
-                logger.info("   → Ejecutando query SELECT...")
-                query = "SELECT * FROM peliculas_catalogo ORDER BY pelicula_id"
-                result = await session.execute(query)
-                logger.info("   → Procesando resultados...")
-                rows = result.fetchall()
-                peliculas = [
-                    {
-                        "pelicula_id": row[0],
-                        "titulo": row[1],
-                        "genero": row[2],
-                        "clasificacion": row[3],
-                        "director": row[4],
-                        "sinopsis": row[5],
-                        "url_poster": row[6],
-                        "fecha_creacion": str(row[7])
-                    }
-                    for row in rows
-                ]
-                logger.info(f"   → Consulta Quito exitosa: {len(peliculas)} películas")
-                return peliculas
+            peliculas = await leer_snapshot(self.quito_conn, "peliculas_catalogo", ESQUEMA_PELICULAS, "pelicula_id")
+            logger.info(f"   → Consulta Quito exitosa: {len(peliculas)} películas")
+            return peliculas
         except Exception as e:
             logger.error(f"   ✗ Error consultando películas en Quito: {e}")
-            logger.error(f"   ✗ Tipo de error: {type(e).__name__}")
-            return []
+            raise
     
-    async def consultar_peliculas_cuenca(self) -> List[Dict]:
+    async def consultar_peliculas_cuenca(self) -> SnapshotColumnar:
         """Consulta películas en Cuenca (Oracle)"""
-        logger.info("   → Consultando Cuenca (Oracle)...")
         try:
-                connection = self.cuenca_conn.get_connection().__enter__()
-                logger.info("   → Creando cursor...")
-                cursor = connection.cursor()
-                logger.info("   → Ejecutando query SELECT...")
-                query = "SELECT * FROM peliculas_catalogo ORDER BY pelicula_id"
-                cursor.execute(query)
-                logger.info("   → Obteniendo resultados...")
-                result = cursor.fetchall()
-                logger.info("   → Procesando resultados...")
-                
-                peliculas = []
-                for i, row in enumerate(result):
-                    try:
-                        # Convertir cada campo de forma segura
-                        logger.info(f"   → Procesando fila {i+1}: tipos = {[type(cell).__name__ for cell in row]}")
-                        
-                        pelicula = {
-                            "pelicula_id": int(row[0]) if row[0] is not None else None,
-                            "titulo": str(row[1]) if row[1] is not None else "",
-                            "genero": str(row[2]) if row[2] is not None else "",
-                            "clasificacion": str(row[3]) if row[3] is not None else "",
-                            "director": str(row[4]) if row[4] is not None else "",
-                            "sinopsis": str(row[5]) if row[5] is not None else "",
-                            "url_poster": str(row[6]) if row[6] is not None else "",
-                            "fecha_creacion": str(row[7]) if row[7] is not None else ""
-                        }
-                        peliculas.append(pelicula)
-                    except Exception as row_error:
-                        logger.error(f"   ✗ Error procesando fila {i+1}: {row_error}")
-                        logger.error(f"   ✗ Tipos de datos: {[type(cell).__name__ for cell in row]}")
-                        logger.error(f"   ✗ Valores: {[str(cell)[:50] if cell is not None else 'NULL' for cell in row]}")
-                        continue
-                
-                logger.info(f"   → Consulta Cuenca exitosa: {len(peliculas)} películas")
-                return peliculas
+            peliculas = SnapshotColumnar.desde_dicts(ESQUEMA_PELICULAS, await self.cuenca_conn.consultar_sentencia("peliculas.listar", slo=False))
+            logger.info(f"   → Consulta Cuenca exitosa: {len(peliculas)} películas")
+            return peliculas
         except Exception as e:
             logger.error(f"   ✗ Error consultando películas en Cuenca: {e}")
-            logger.error(f"   ✗ Tipo de error: {type(e).__name__}")
-            import traceback
-            logger.error(f"   ✗ Traceback: {traceback.format_exc()}")
+            raise
+    
+    async def consultar_estado_nodos(self, incluir_tablas: bool = False) -> Dict[str, ResultadoNodo]:
+        """Consulta el catálogo de Quito y Cuenca en paralelo
+        
+        Por defecto solo lee claves y hash de contenido; con incluir_tablas
+        lee las tablas completas.
+        """
+        if incluir_tablas:
+            return await consultar_nodos_en_paralelo({
+                "quito": self.consultar_peliculas_quito(),
+                "cuenca": self.consultar_peliculas_cuenca()
+            }, default=[])
+        return await consultar_nodos_en_paralelo({
+            "quito": leer_claves(self.quito_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS),
+            "cuenca": leer_claves(self.cuenca_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS)
+        }, default={})
+    
+    def _resumir_estado(self, resultados: Dict[str, ResultadoNodo], incluir_tablas: bool) -> Dict:
+        """Conteos por nodo y, si se pidieron, las tablas completas"""
+        estado = {
+            "quito_count": len(resultados["quito"].datos),
+            "cuenca_count": len(resultados["cuenca"].datos),
+            "errores": errores_por_nodo(resultados)
+        }
+        if incluir_tablas:
+            estado["quito_peliculas"] = resultados["quito"].datos
+            estado["cuenca_peliculas"] = resultados["cuenca"].datos
+        return estado
+    
+    def _verificar(self, resultados: Dict[str, ResultadoNodo], incluir_tablas: bool) -> Dict:
+        """Diferencias de claves Quito (origen) vs Cuenca (destino)"""
+        quito, cuenca = resultados["quito"].datos, resultados["cuenca"].datos
+        if incluir_tablas:
+            quito = claves_de_filas(quito, "pelicula_id", COLUMNAS_HASH_PELICULAS)
+            cuenca = claves_de_filas(cuenca, "pelicula_id", COLUMNAS_HASH_PELICULAS)
+        return comparar_claves(quito, cuenca).to_dict()
+    
+    async def buscar_peliculas_cuenca(self, ids: List[int]) -> List[int]:
+        """Devuelve cuáles de los pelicula_id dados ya existen en Cuenca"""
+        if not ids:
             return []
+        marcadores = ", ".join(f":{i + 1}" for i in range(len(ids)))
+        async with self.cuenca_conn.get_session() as session:
+            query = f"SELECT pelicula_id FROM peliculas_catalogo WHERE pelicula_id IN ({marcadores})"
+            result = await session.execute(query, list(ids))
+            return [int(row[0]) for row in result.fetchall()]
     
     async def insertar_peliculas_quito(self, cantidad: int) -> List[Dict]:
         """Inserta películas en Quito (se replicarán automáticamente a Cuenca via trigger)"""
@@ -104,14 +101,7 @@ class ReplicacionQuitoCuencaService:
                     sinopsis = f"Esta es una película de prueba para replicación Quito → Cuenca número {i+1}"
                     url_poster = f"https://ejemplo.com/poster_{i+1}.jpg"
                     
-                    query = """
-                    INSERT INTO peliculas_catalogo 
-                    (titulo, genero, clasificacion, director, sinopsis, url_poster)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING pelicula_id, fecha_creacion
-                    """
-                    
-                    result = await session.execute(query, (
+                    result = await session.ejecutar("peliculas.insertar", (
                         titulo, genero, clasificacion, director, sinopsis, url_poster
                     ))
                     row = result.fetchone()
@@ -130,77 +120,79 @@ class ReplicacionQuitoCuencaService:
                     
                 await session.commit()
                 logger.info(f"Insertadas {cantidad} películas en Quito para replicación a Cuenca")
+            await cache_respuestas.invalidar_tablas(["peliculas_catalogo"])
                 
         except Exception as e:
+            # get_session ya hizo rollback (o no llegó a abrir la sesión si el nodo no admitía)
             logger.error(f"Error insertando películas en Quito: {e}")
-            await session.rollback()
             raise
         
         return peliculas_insertadas
     
-    async def evidenciar_replicacion_quito_cuenca(self, cantidad_peliculas: int = 3) -> Dict:
+    async def evidenciar_replicacion_quito_cuenca(self, cantidad_peliculas: int = 3, incluir_tablas: bool = False) -> Dict:
         """
         Evidencia la replicación unidireccional Quito → Cuenca
         1. Consulta estado inicial en ambos nodos
         2. Inserta películas en Quito
         3. Consulta estado final para verificar replicación
+        
+        Sin incluir_tablas solo se leen claves y el resultado trae un diff compacto.
         """
         try:
             logger.info("=== INICIANDO EVIDENCIA REPLICACIÓN QUITO-CUENCA ===")
             
-            # Estado inicial
-            logger.info("1. Consultando estado inicial en Quito...")
-            peliculas_quito_inicial = await self.consultar_peliculas_quito()
-            logger.info(f"   ✓ Quito inicial: {len(peliculas_quito_inicial)} películas")
-            
-            logger.info("2. Consultando estado inicial en Cuenca...")
-            peliculas_cuenca_inicial = await self.consultar_peliculas_cuenca()
-            logger.info(f"   ✓ Cuenca inicial: {len(peliculas_cuenca_inicial)} películas")
+            # Estado inicial (Quito y Cuenca en paralelo)
+            logger.info("1-2. Consultando estado inicial en Quito y Cuenca...")
+            reportar_progreso("consultando estado inicial", 0.0)
+            inicial = await self.consultar_estado_nodos(incluir_tablas)
+            estado_inicial = self._resumir_estado(inicial, incluir_tablas)
+            logger.info(f"   ✓ Quito inicial: {estado_inicial['quito_count']} películas")
+            logger.info(f"   ✓ Cuenca inicial: {estado_inicial['cuenca_count']} películas")
             
             # Insertar en Quito (origen)
             logger.info(f"3. Insertando {cantidad_peliculas} películas en Quito...")
+            reportar_progreso("insertando en Quito", 0.25)
             peliculas_insertadas = await self.insertar_peliculas_quito(cantidad_peliculas)
             logger.info(f"   ✓ Insertadas {len(peliculas_insertadas)} películas en Quito")
             
-            # Esperar un momento para la replicación
-            logger.info("4. Esperando 2 segundos para replicación...")
-            import asyncio
-            await asyncio.sleep(2)
+            # Esperar a que el trigger replique las películas en Cuenca
+            logger.info("4. Esperando replicación en Cuenca...")
+            reportar_progreso("esperando replicación en Cuenca", 0.5)
+            convergencia = await esperar_replicacion(
+                self.buscar_peliculas_cuenca,
+                [p["pelicula_id"] for p in peliculas_insertadas]
+            )
+            logger.info(f"   ✓ Convergencia: {convergencia.to_dict()}")
+            metricas_replicacion.registrar(QUITO_CUENCA, convergencia)
             
-            # Estado final
-            logger.info("5. Consultando estado final en Quito...")
-            peliculas_quito_final = await self.consultar_peliculas_quito()
-            logger.info(f"   ✓ Quito final: {len(peliculas_quito_final)} películas")
+            # Estado final (Quito y Cuenca en paralelo)
+            logger.info("5-6. Consultando estado final en Quito y Cuenca...")
+            reportar_progreso("consultando estado final", 0.75)
+            final = await self.consultar_estado_nodos(incluir_tablas)
+            estado_final = self._resumir_estado(final, incluir_tablas)
+            logger.info(f"   ✓ Quito final: {estado_final['quito_count']} películas")
+            logger.info(f"   ✓ Cuenca final: {estado_final['cuenca_count']} películas")
             
-            logger.info("6. Consultando estado final en Cuenca...")
-            peliculas_cuenca_final = await self.consultar_peliculas_cuenca()
-            logger.info(f"   ✓ Cuenca final: {len(peliculas_cuenca_final)} películas")
+            incremento_quito = estado_final["quito_count"] - estado_inicial["quito_count"]
+            incremento_cuenca = estado_final["cuenca_count"] - estado_inicial["cuenca_count"]
             
             logger.info("=== EVIDENCIA COMPLETADA EXITOSAMENTE ===")
             
             return {
                 "tipo_replicacion": "Unidireccional Quito → Cuenca",
                 "descripcion": "Películas insertadas en Quito (PostgreSQL) se replican automáticamente a Cuenca (Oracle) via trigger",
-                "estado_inicial": {
-                    "quito_count": len(peliculas_quito_inicial),
-                    "cuenca_count": len(peliculas_cuenca_inicial),
-                    "quito_peliculas": peliculas_quito_inicial,
-                    "cuenca_peliculas": peliculas_cuenca_inicial
-                },
+                "estado_inicial": estado_inicial,
                 "operacion": {
                     "peliculas_insertadas_quito": cantidad_peliculas,
                     "detalles": peliculas_insertadas
                 },
-                "estado_final": {
-                    "quito_count": len(peliculas_quito_final),
-                    "cuenca_count": len(peliculas_cuenca_final),
-                    "quito_peliculas": peliculas_quito_final,
-                    "cuenca_peliculas": peliculas_cuenca_final
-                },
+                "estado_final": estado_final,
                 "evidencia_replicacion": {
-                    "incremento_quito": len(peliculas_quito_final) - len(peliculas_quito_inicial),
-                    "incremento_cuenca": len(peliculas_cuenca_final) - len(peliculas_cuenca_inicial),
-                    "replicacion_exitosa": (len(peliculas_quito_final) - len(peliculas_quito_inicial)) == (len(peliculas_cuenca_final) - len(peliculas_cuenca_inicial))
+                    "incremento_quito": incremento_quito,
+                    "incremento_cuenca": incremento_cuenca,
+                    "replicacion_exitosa": incremento_quito == incremento_cuenca,
+                    "verificacion_claves": self._verificar(final, incluir_tablas),
+                    "convergencia": convergencia.to_dict()
                 }
             }
             
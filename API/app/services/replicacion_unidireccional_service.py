@@ -1,7 +1,12 @@
 from typing import List, Dict
 from app.database.postgres_connection import PostgresConnection
+from app.services.consulta_paralela import consultar_nodos_en_paralelo, errores_por_nodo, ResultadoNodo
+from app.services.convergencia import esperar_replicacion
+from app.services.metricas_replicacion import metricas_replicacion, GUAYAQUIL_QUITO
+from app.services.verificacion_claves import leer_claves, comparar_claves, COLUMNAS_HASH_PELICULAS
+from app.services.cache_respuestas import cache_respuestas
+from app.services.snapshot_columnar import SnapshotColumnar, ESQUEMA_PELICULAS, leer_snapshot
 import logging
-import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -14,32 +19,43 @@ class ReplicacionUnidireccionalService:
         # Conexión a Quito (donde se replican)
         self.quito_conn = PostgresConnection(db_number=1)
     
-    async def consultar_peliculas_nodo(self, db_number: int) -> List[Dict]:
+    async def consultar_peliculas_nodo(self, db_number: int) -> SnapshotColumnar:
         """Consulta películas de un nodo específico"""
         conn = PostgresConnection(db_number=db_number)
         try:
-            async with conn.get_session() as session:
-                query = "SELECT * FROM peliculas_catalogo ORDER BY pelicula_id"
-                result = await session.execute(query)
-                return [
-                    {
-                        "pelicula_id": row[0],
-                        "titulo": row[1],
-                        "genero": row[2],
-                        "clasificacion": row[3],
-                        "director": row[4],
-                        "sinopsis": row[5],
-                        "url_poster": row[6],
-                        "fecha_creacion": str(row[7])
-                    }
-                    for row in result.fetchall()
-                ]
+            return await leer_snapshot(conn, "peliculas_catalogo", ESQUEMA_PELICULAS, "pelicula_id")
         except Exception as e:
             logger.error(f"Error consultando películas DB{db_number}: {e}")
-            return []
+            raise
         finally:
             conn.close()
     
+    async def buscar_peliculas_nodo(self, db_number: int, ids: List[int]) -> List[int]:
+        """Devuelve cuáles de los pelicula_id dados ya existen en un nodo"""
+        conn = PostgresConnection(db_number=db_number)
+        try:
+            async with conn.get_session() as session:
+                result = await session.ejecutar("peliculas.existentes", (list(ids),))
+                return [row[0] for row in result.fetchall()]
+        finally:
+            conn.close()
+    
+    async def consultar_estado_nodos(self, incluir_tablas: bool = False) -> Dict[str, ResultadoNodo]:
+        """Consulta el catálogo de Quito y Guayaquil en paralelo
+        
+        Por defecto solo lee claves y hash de contenido; con incluir_tablas
+        lee las tablas completas.
+        """
+        if incluir_tablas:
+            return await consultar_nodos_en_paralelo({
+                "quito": self.consultar_peliculas_nodo(1),
+                "guayaquil": self.consultar_peliculas_nodo(2)
+            }, default=[])
+        return await consultar_nodos_en_paralelo({
+            "quito": leer_claves(self.quito_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS),
+            "guayaquil": leer_claves(self.guayaquil_conn, "peliculas_catalogo", "pelicula_id", COLUMNAS_HASH_PELICULAS)
+        }, default={})
+    
     async def insertar_peliculas_guayaquil(self, cantidad: int) -> List[Dict]:
         """Inserta películas en Guayaquil (nodo origen)"""
         peliculas_insertadas = []
@@ -53,13 +69,7 @@ class ReplicacionUnidireccionalService:
                     sinopsis = f"Sinopsis de la película {i+1} para probar replicación unidireccional"
                     url_poster = f"https://poster{i+1}.jpg"
                     
-                    query = """
-                    INSERT INTO peliculas_catalogo (titulo, genero, clasificacion, director, sinopsis, url_poster)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING pelicula_id
-                    """
-                    
-                    result = await session.execute(query, (titulo, genero, clasificacion, director, sinopsis, url_poster))
+                    result = await session.ejecutar("peliculas.insertar", (titulo, genero, clasificacion, director, sinopsis, url_poster))
                     nuevo_id = result.fetchone()[0]
                     
                     peliculas_insertadas.append({
@@ -72,6 +82,7 @@ class ReplicacionUnidireccionalService:
                 
                 await session.commit()
                 logger.info(f"✅ Insertadas {cantidad} películas en Guayaquil")
+            await cache_respuestas.invalidar_tablas(["peliculas_catalogo"])
                 
         except Exception as e:
             logger.error(f"❌ Error insertando películas en Guayaquil: {e}")
@@ -86,21 +97,28 @@ class ReplicacionUnidireccionalService:
             
             # 1. Estado ANTES
             logger.info("📊 Consultando estado ANTES...")
-            quito_antes = await self.consultar_peliculas_nodo(1)
-            guayaquil_antes = await self.consultar_peliculas_nodo(2)
+            antes = await self.consultar_estado_nodos()
+            quito_antes = antes["quito"].datos
+            guayaquil_antes = antes["guayaquil"].datos
             
             # 2. INSERCIÓN en Guayaquil
             logger.info(f"📝 Insertando {cantidad_peliculas} películas en Guayaquil...")
             peliculas_nuevas = await self.insertar_peliculas_guayaquil(cantidad_peliculas)
             
-            # 3. ESPERAR replicación
-            logger.info("⏳ Esperando 5 segundos para replicación...")
-            await asyncio.sleep(5)
+            # 3. ESPERAR replicación: sondear Quito hasta ver las claves insertadas
+            logger.info("⏳ Esperando replicación en Quito...")
+            convergencia = await esperar_replicacion(
+                lambda ids: self.buscar_peliculas_nodo(1, ids),
+                [p["pelicula_id"] for p in peliculas_nuevas],
+                tabla="peliculas_catalogo"
+            )
+            metricas_replicacion.registrar(GUAYAQUIL_QUITO, convergencia)
             
             # 4. Estado DESPUÉS
             logger.info("📊 Consultando estado DESPUÉS...")
-            quito_despues = await self.consultar_peliculas_nodo(1)
-            guayaquil_despues = await self.consultar_peliculas_nodo(2)
+            despues = await self.consultar_estado_nodos()
+            quito_despues = despues["quito"].datos
+            guayaquil_despues = despues["guayaquil"].datos
             
             # 5. ANÁLISIS
             incremento_guayaquil = len(guayaquil_despues) - len(guayaquil_antes)
@@ -115,11 +133,13 @@ class ReplicacionUnidireccionalService:
                     "peliculas_insertadas": cantidad_peliculas,
                     "estado_antes": {
                         "guayaquil_total": len(guayaquil_antes),
-                        "quito_total": len(quito_antes)
+                        "quito_total": len(quito_antes),
+                        "errores": errores_por_nodo(antes)
                     },
                     "estado_despues": {
                         "guayaquil_total": len(guayaquil_despues),
-                        "quito_total": len(quito_despues)
+                        "quito_total": len(quito_despues),
+                        "errores": errores_por_nodo(despues)
                     },
                     "incrementos": {
                         "guayaquil": incremento_guayaquil,
@@ -127,6 +147,8 @@ class ReplicacionUnidireccionalService:
                     },
                     "peliculas_nuevas": peliculas_nuevas,
                     "replicacion_exitosa": replicacion_exitosa,
+                    "verificacion_claves": comparar_claves(guayaquil_despues, quito_despues).to_dict(),
+                    "convergencia": convergencia.to_dict(),
                     "diagnostico": "✅ Replicación funcionando" if replicacion_exitosa else f"❌ FALLA: Guayaquil +{incremento_guayaquil}, Quito +{incremento_quito}, esperado +{cantidad_peliculas} en ambos"
                 }
             }
@@ -0,0 +1,206 @@
+"""Sondeo periódico de la salud de los nodos
+
+Cada SALUD_INTERVALO segundos se hace un ping a cada nodo a través de su
+pool (SELECT 1), midiendo la latencia de ida y vuelta, y se leen
+estimaciones baratas de filas por tabla (pg_class.reltuples en
+PostgreSQL, NUM_ROWS de user_tables en Oracle; ambas dependen de las
+últimas estadísticas recogidas). El estado activo/caído cambia con
+histéresis: hacen falta varios fallos seguidos para marcar un nodo como
+caído y varios éxitos seguidos para volver a activo. La sonda toma la
+conexión directamente del pool, sin pasar por el control de admisión ni
+el circuit breaker (app.database.resiliencia): es una medición
+independiente, también mientras el circuito está abierto. La respuesta de
+/nodos/estado se serializa una vez por sondeo y se sirve desde memoria.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import os
+import time
+import logging
+
+from app.database.pool_registry import pool_registry, QUITO, GUAYAQUIL, CUENCA
+from app.database.sessions import OraclePooledSession, PostgresPooledSession
+from app.services.serializacion import serializar
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre sondeos (0 = desactivado) y tiempo máximo de cada sondeo (s)
+SALUD_INTERVALO = float(os.getenv('SALUD_INTERVALO', 10))
+SALUD_TIMEOUT = float(os.getenv('SALUD_TIMEOUT', 3))
+# Histéresis: fallos seguidos para marcar caído y éxitos seguidos para volver a activo
+SALUD_FALLOS_CAIDA = int(os.getenv('SALUD_FALLOS_CAIDA', 3))
+SALUD_EXITOS_RECUPERACION = int(os.getenv('SALUD_EXITOS_RECUPERACION', 2))
+
+# Estados de un nodo
+DESCONOCIDO = "desconocido"
+ACTIVO = "activo"
+CAIDO = "caido"
+
+# Peso de la última medición en la latencia suavizada
+ALFA_LATENCIA = 0.3
+
+PING_POSTGRES = "SELECT 1"
+PING_ORACLE = "SELECT 1 FROM DUAL"
+
+# reltuples es -1 en tablas sin estadísticas (nunca analizadas)
+ESTIMACION_POSTGRES = """
+SELECT c.relname, c.reltuples::bigint
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+"""
+ESTIMACION_ORACLE = "SELECT LOWER(table_name), num_rows FROM user_tables"
+
+MOTORES = {QUITO: "PostgreSQL", GUAYAQUIL: "PostgreSQL", CUENCA: "Oracle"}
+
+
+@dataclass
+class EstadoNodo:
+    nodo: str
+    motor: str
+    estado: str = DESCONOCIDO
+    latencia_ms: Optional[float] = None
+    latencia_media_ms: Optional[float] = None
+    filas_por_tabla: Dict[str, Optional[int]] = field(default_factory=dict)
+    fallos_seguidos: int = 0
+    exitos_seguidos: int = 0
+    sondeos: int = 0
+    ultimo_sondeo: Optional[datetime] = None
+    ultimo_cambio: Optional[datetime] = None
+    ultimo_error: Optional[str] = None
+
+    @property
+    def filas_estimadas(self) -> int:
+        return sum(filas for filas in self.filas_por_tabla.values() if filas)
+
+    def _cambiar(self, estado: str):
+        if estado != self.estado:
+            logger.info(f"{'🟢' if estado == ACTIVO else '🔴'} Nodo {self.nodo}: {self.estado} → {estado}")
+            self.estado = estado
+            self.ultimo_cambio = datetime.now()
+
+    def registrar_exito(self, latencia_ms: float, filas_por_tabla: Dict[str, Optional[int]]):
+        self.sondeos += 1
+        self.ultimo_sondeo = datetime.now()
+        self.latencia_ms = latencia_ms
+        self.latencia_media_ms = latencia_ms if self.latencia_media_ms is None else (
+            ALFA_LATENCIA * latencia_ms + (1 - ALFA_LATENCIA) * self.latencia_media_ms
+        )
+        self.filas_por_tabla = filas_por_tabla
+        self.ultimo_error = None
+        self.fallos_seguidos = 0
+        self.exitos_seguidos += 1
+        if self.estado == DESCONOCIDO or self.exitos_seguidos >= SALUD_EXITOS_RECUPERACION:
+            self._cambiar(ACTIVO)
+
+    def registrar_fallo(self, error: str):
+        self.sondeos += 1
+        self.ultimo_sondeo = datetime.now()
+        self.latencia_ms = None
+        self.ultimo_error = error
+        self.exitos_seguidos = 0
+        self.fallos_seguidos += 1
+        if self.estado == DESCONOCIDO or self.fallos_seguidos >= SALUD_FALLOS_CAIDA:
+            self._cambiar(CAIDO)
+
+    def to_dict(self) -> dict:
+        return {
+            "nodo": self.nodo,
+            "motor": self.motor,
+            "estado": self.estado,
+            "latencia_ms": round(self.latencia_ms, 2) if self.latencia_ms is not None else None,
+            "latencia_media_ms": round(self.latencia_media_ms, 2) if self.latencia_media_ms is not None else None,
+            "filas_estimadas": self.filas_estimadas,
+            "filas_por_tabla": self.filas_por_tabla,
+            "fallos_seguidos": self.fallos_seguidos,
+            "exitos_seguidos": self.exitos_seguidos,
+            "sondeos": self.sondeos,
+            "ultimo_sondeo": self.ultimo_sondeo.isoformat() if self.ultimo_sondeo else None,
+            "ultimo_cambio": self.ultimo_cambio.isoformat() if self.ultimo_cambio else None,
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+class SondaSaludNodos:
+    """Sondea los tres nodos en segundo plano y conserva su último estado"""
+
+    def __init__(self):
+        self.nodos: Dict[str, EstadoNodo] = {nodo: EstadoNodo(nodo, motor) for nodo, motor in MOTORES.items()}
+        self._tarea = None
+        self._cuerpo = serializar(self.resumen())
+
+    async def _medir(self, nodo: str):
+        """(latencia del ping en ms, filas estimadas por tabla) usando una conexión del pool"""
+        oracle = nodo == CUENCA
+        async with pool_registry.acquire(nodo) as connection:
+            session = OraclePooledSession(connection) if oracle else PostgresPooledSession(connection)
+            inicio = time.perf_counter()
+            await session.execute(PING_ORACLE if oracle else PING_POSTGRES)
+            latencia_ms = (time.perf_counter() - inicio) * 1000
+            result = await session.execute(ESTIMACION_ORACLE if oracle else ESTIMACION_POSTGRES)
+            filas = {
+                tabla: int(estimadas) if estimadas is not None and estimadas >= 0 else None
+                for tabla, estimadas in result.fetchall()
+            }
+        return latencia_ms, filas
+
+    async def _sondear(self, nodo: str):
+        estado = self.nodos[nodo]
+        # Solo a través del pool: sin pool no se abre una conexión nueva en cada sondeo
+        if not pool_registry.is_open(nodo):
+            estado.registrar_fallo("Pool no disponible")
+            return
+        try:
+            latencia_ms, filas = await asyncio.wait_for(self._medir(nodo), SALUD_TIMEOUT)
+        except asyncio.TimeoutError:
+            estado.registrar_fallo(f"Sin respuesta en {SALUD_TIMEOUT}s")
+        except Exception as e:
+            estado.registrar_fallo(str(e))
+        else:
+            estado.registrar_exito(latencia_ms, filas)
+
+    async def sondear(self):
+        """Sondea todos los nodos en paralelo y actualiza la respuesta en memoria"""
+        await asyncio.gather(*(self._sondear(nodo) for nodo in self.nodos))
+        self._cuerpo = serializar(self.resumen())
+
+    def resumen(self) -> dict:
+        return {
+            "intervalo_s": SALUD_INTERVALO,
+            "histeresis": {"fallos_caida": SALUD_FALLOS_CAIDA, "exitos_recuperacion": SALUD_EXITOS_RECUPERACION},
+            "nodos": {nodo: estado.to_dict() for nodo, estado in self.nodos.items()},
+        }
+
+    @property
+    def cuerpo(self) -> bytes:
+        """Último resumen ya serializado"""
+        return self._cuerpo
+
+    async def _bucle(self, intervalo: float):
+        while True:
+            try:
+                await self.sondear()
+            except Exception as e:
+                logger.error(f"❌ Error sondeando los nodos: {e}")
+            await asyncio.sleep(intervalo)
+
+    def iniciar(self, intervalo: float = None):
+        """Arranca el sondeo periódico si hay intervalo configurado"""
+        intervalo = SALUD_INTERVALO if intervalo is None else intervalo
+        if intervalo > 0 and self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle(intervalo))
+            logger.info(f"🩺 Sondeo de nodos cada {intervalo}s")
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+sonda_salud = SondaSaludNodos()
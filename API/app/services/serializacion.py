@@ -0,0 +1,108 @@
+"""Serialización JSON rápida para respuestas grandes
+
+Con JSON_RAPIDO=true (y el paquete orjson instalado) las respuestas se
+serializan con orjson, que maneja datetime, date y UUID de forma nativa;
+Decimal se convierte a float. Los servicios pueden devolver `Filas`
+(tuplas + nombres de columna) o un SnapshotColumnar en lugar de un dict por fila.
+"""
+from decimal import Decimal
+from typing import Any, List, Sequence
+import json
+import os
+import time
+import logging
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.database.instrumentacion import instrumentacion
+from app.services.snapshot_columnar import SnapshotColumnar
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_RAPIDO = os.getenv('JSON_RAPIDO', 'false').lower() == 'true'
+if JSON_RAPIDO and orjson is None:
+    logger.warning("⚠️ JSON_RAPIDO=true requiere el paquete 'orjson'; se usa el serializador estándar")
+    JSON_RAPIDO = False
+
+
+class Filas:
+    """Resultado tabular sin un dict por fila
+
+    Se serializa como lista de objetos o, con compacto=True, como
+    {"columnas": [...], "filas": [[...], ...]} sin construir ningún dict.
+    No es un dataclass a propósito: orjson serializa los dataclasses por su cuenta.
+    """
+    __slots__ = ("columnas", "filas", "compacto")
+
+    def __init__(self, columnas: List[str], filas: Sequence[Sequence], compacto: bool = False):
+        self.columnas = columnas
+        self.filas = filas
+        self.compacto = compacto
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def __iter__(self):
+        columnas = self.columnas
+        return (dict(zip(columnas, fila)) for fila in self.filas)
+
+    def columna(self, nombre: str) -> list:
+        """Valores de una columna, sin pasar por dicts"""
+        i = self.columnas.index(nombre)
+        return [fila[i] for fila in self.filas]
+
+    def a_json(self):
+        """Estructura equivalente con tipos JSON (listas y dicts)"""
+        filas = self.filas if not self.filas or isinstance(self.filas[0], tuple) else [tuple(f) for f in self.filas]
+        if self.compacto:
+            return {"columnas": self.columnas, "filas": filas}
+        columnas = self.columnas
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+
+def _por_defecto(obj: Any):
+    """Tipos que orjson no serializa por sí mismo"""
+    if isinstance(obj, (Filas, SnapshotColumnar)):
+        return obj.a_json()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def _serializar(contenido: Any) -> bytes:
+    if JSON_RAPIDO:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    tabular = {tipo: lambda f: jsonable_encoder(f.a_json()) for tipo in (Filas, SnapshotColumnar)}
+    contenido = jsonable_encoder(contenido, custom_encoder=tabular)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def serializar(contenido: Any) -> bytes:
+    """Cuerpo JSON de una respuesta (orjson si está activo, si no jsonable_encoder + json)"""
+    inicio = time.perf_counter()
+    cuerpo = _serializar(contenido)
+    instrumentacion.serializacion((time.perf_counter() - inicio) * 1000, len(cuerpo))
+    return cuerpo
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que serializa con `serializar`"""
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
+
+
+def respuesta_json(contenido: Any, status_code: int = 200, headers: dict = None) -> RespuestaJSON:
+    """Respuesta ya serializada: evita el jsonable_encoder que FastAPI aplica a lo que retorna la ruta"""
+    return RespuestaJSON(contenido, status_code=status_code, headers=headers)
@@ -0,0 +1,255 @@
+"""Snapshots de tablas almacenados por columnas
+
+Los ids, fechas y numéricos se guardan en `array` (8 bytes por valor, sin
+objetos Python) y el texto como str internados, de modo que los valores
+repetidos entre filas y entre snapshots de distintos nodos (género,
+director, títulos replicados...) se comparten. Con numpy instalado las
+columnas numéricas pueden verse como ndarray sin copiar.
+"""
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import math
+import os
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Tipos de columna
+ENTERO = "entero"
+NUMERICO = "numerico"
+FECHA = "fecha"
+# Fecha que se entrega como str(datetime) ("2024-01-31 10:00:00"), el formato
+# que la API siempre devolvió para fecha_creacion de películas
+FECHA_TEXTO = "fecha_texto"
+TEXTO = "texto"
+
+# Formatos de serialización
+FORMATO_FILAS = "filas"
+FORMATO_COLUMNAR = "columnar"
+
+# Filas por lote al leer un snapshot con cursor del servidor
+LOTE_SNAPSHOT = int(os.getenv('SNAPSHOT_LOTE', 5000))
+
+# NULL en columnas enteras y de fecha (en numéricas se usa NaN)
+NULO_ENTERO = -2 ** 63
+EPOCA = datetime(1970, 1, 1)
+
+ESQUEMA_PELICULAS = {
+    "pelicula_id": ENTERO,
+    "titulo": TEXTO,
+    "genero": TEXTO,
+    "clasificacion": TEXTO,
+    "director": TEXTO,
+    "sinopsis": TEXTO,
+    "url_poster": TEXTO,
+    "fecha_creacion": FECHA_TEXTO,
+}
+
+ESQUEMA_PROMOCIONES = {
+    "promocion_id": ENTERO,
+    "codigo_promo": TEXTO,
+    "descripcion": TEXTO,
+    "descuento_porcentaje": NUMERICO,
+    "fecha_creacion": FECHA,
+    "ciudad": TEXTO,
+}
+
+
+def _a_microsegundos(valor) -> int:
+    """µs desde la época; las fechas con zona se pasan a UTC y las `date` se toman a medianoche"""
+    if valor is None:
+        return NULO_ENTERO
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if not isinstance(valor, datetime):
+        if not isinstance(valor, date):
+            raise TypeError(f"Fecha no soportada: {type(valor).__name__}")
+        valor = datetime(valor.year, valor.month, valor.day)
+    elif valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = valor - EPOCA
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _de_microsegundos(valor: int) -> Optional[datetime]:
+    return None if valor == NULO_ENTERO else EPOCA + timedelta(microseconds=valor)
+
+
+def _de_microsegundos_texto(valor: int) -> Optional[str]:
+    return None if valor == NULO_ENTERO else str(EPOCA + timedelta(microseconds=valor))
+
+
+def _columna_vacia(tipo: str):
+    if tipo in (ENTERO, FECHA, FECHA_TEXTO):
+        return array("q")
+    if tipo == NUMERICO:
+        return array("d")
+    return []
+
+
+_CONVERSIONES = {
+    ENTERO: lambda v: NULO_ENTERO if v is None else int(v),
+    FECHA: _a_microsegundos,
+    FECHA_TEXTO: _a_microsegundos,
+    NUMERICO: lambda v: math.nan if v is None else float(v),
+    TEXTO: lambda v: None if v is None else sys.intern(str(v)),
+}
+
+_LECTURAS = {
+    ENTERO: lambda v: None if v == NULO_ENTERO else v,
+    FECHA: _de_microsegundos,
+    FECHA_TEXTO: _de_microsegundos_texto,
+    NUMERICO: lambda v: None if math.isnan(v) else v,
+    TEXTO: lambda v: v,
+}
+
+
+class SnapshotColumnar:
+    """Snapshot inmutable de una tabla, columna por columna
+
+    El slicing devuelve una vista sobre las mismas columnas (sin copiar) y
+    la serialización produce filas u objeto columnar solo al responder.
+    """
+    __slots__ = ("esquema", "_columnas", "_inicio", "_fin", "formato")
+
+    def __init__(self, esquema: Dict[str, str], columnas: Dict[str, object],
+                 inicio: int = 0, fin: Optional[int] = None, formato: str = FORMATO_FILAS):
+        self.esquema = esquema
+        self._columnas = columnas
+        self._inicio = inicio
+        self._fin = len(next(iter(columnas.values()), ())) if fin is None else fin
+        self.formato = formato
+
+    @classmethod
+    def desde_filas(cls, esquema: Dict[str, str], filas: Iterable[Iterable]) -> "SnapshotColumnar":
+        """Construye el snapshot desde tuplas (o Records) en el orden del esquema"""
+        constructor = ConstructorSnapshot(esquema)
+        constructor.agregar(filas)
+        return constructor.construir()
+
+    @classmethod
+    def desde_dicts(cls, esquema: Dict[str, str], filas: Iterable[dict]) -> "SnapshotColumnar":
+        nombres = list(esquema)
+        return cls.desde_filas(esquema, ([fila.get(n) for n in nombres] for fila in filas))
+
+    @property
+    def columnas(self) -> List[str]:
+        return list(self.esquema)
+
+    def __len__(self) -> int:
+        return self._fin - self._inicio
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fin, paso = indice.indices(len(self))
+            if paso != 1:
+                raise ValueError("SnapshotColumnar solo admite slices contiguos")
+            return SnapshotColumnar(
+                self.esquema, self._columnas, self._inicio + inicio, self._inicio + max(inicio, fin), self.formato
+            )
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return {nombre: valor for nombre, valor in zip(self.esquema, self._fila(self._inicio + indice))}
+
+    def __iter__(self) -> Iterator[dict]:
+        nombres = self.columnas
+        return (dict(zip(nombres, fila)) for fila in self.tuplas())
+
+    def como(self, formato: str) -> "SnapshotColumnar":
+        """Misma vista, serializada como filas u objeto columnar"""
+        return SnapshotColumnar(self.esquema, self._columnas, self._inicio, self._fin, formato)
+
+    def _fila(self, i: int) -> tuple:
+        return tuple(_LECTURAS[tipo](self._columnas[nombre][i]) for nombre, tipo in self.esquema.items())
+
+    def crudo(self, nombre: str):
+        """Columna tal como se almacena: memoryview sin copiar para arrays, slice de la lista para texto"""
+        columna = self._columnas[nombre]
+        if isinstance(columna, array):
+            return memoryview(columna)[self._inicio:self._fin]
+        return columna[self._inicio:self._fin]
+
+    def numpy(self, nombre: str):
+        """Columna entera, de fecha (µs) o numérica como ndarray sin copiar; requiere numpy"""
+        if numpy is None:
+            raise RuntimeError("SnapshotColumnar.numpy requiere instalar el paquete 'numpy'")
+        columna = self._columnas[nombre]
+        if not isinstance(columna, array):
+            raise ValueError(f"La columna {nombre} no es numérica")
+        return numpy.frombuffer(columna, dtype=numpy.int64 if columna.typecode == "q" else numpy.float64)[
+            self._inicio:self._fin
+        ]
+
+    def columna(self, nombre: str) -> list:
+        """Valores de una columna con sus tipos de Python (None para NULL)"""
+        leer = _LECTURAS[self.esquema[nombre]]
+        return [leer(v) for v in self.crudo(nombre)]
+
+    def tuplas(self) -> Iterator[tuple]:
+        return zip(*(self.columna(nombre) for nombre in self.esquema))
+
+    def contar(self, nombre: Optional[str] = None, valor=None) -> int:
+        """Filas de la vista, o filas cuya columna `nombre` es igual a `valor`"""
+        if nombre is None:
+            return len(self)
+        objetivo = _CONVERSIONES[self.esquema[nombre]](valor)
+        return sum(1 for v in self.crudo(nombre) if v == objetivo)
+
+    def diferencia(self, otro: "SnapshotColumnar", columna_id: str) -> Tuple[List[int], List[int]]:
+        """(claves que faltan en `otro`, claves que sobran en `otro`) comparando la columna id"""
+        propias, ajenas = set(self.crudo(columna_id)), set(otro.crudo(columna_id))
+        return sorted(propias - ajenas), sorted(ajenas - propias)
+
+    def a_json(self):
+        """Lista de objetos (formato filas) o {"columnas": {nombre: valores}} (formato columnar)"""
+        if self.formato == FORMATO_COLUMNAR:
+            return {"total": len(self), "columnas": {nombre: self.columna(nombre) for nombre in self.esquema}}
+        nombres = self.columnas
+        return [dict(zip(nombres, fila)) for fila in self.tuplas()]
+
+    def bytes_estimados(self) -> int:
+        """Tamaño de las columnas (arrays y referencias a texto, sin los str compartidos)"""
+        return sum(
+            c.itemsize * len(c) if isinstance(c, array) else sys.getsizeof(c) for c in self._columnas.values()
+        )
+
+
+class ConstructorSnapshot:
+    """Acumula lotes de filas en columnas; permite construir el snapshot mientras se hace streaming"""
+
+    def __init__(self, esquema: Dict[str, str]):
+        self.esquema = esquema
+        self._columnas = {nombre: _columna_vacia(tipo) for nombre, tipo in esquema.items()}
+        self._destinos = [
+            (self._columnas[nombre].append, _CONVERSIONES[tipo]) for nombre, tipo in esquema.items()
+        ]
+
+    def agregar(self, filas: Iterable[Iterable]):
+        destinos = self._destinos
+        for fila in filas:
+            for (agregar, convertir), valor in zip(destinos, fila):
+                agregar(convertir(valor))
+
+    def construir(self) -> SnapshotColumnar:
+        return SnapshotColumnar(self.esquema, self._columnas)
+
+
+def con_formato(datos, formato: str):
+    """Aplica el formato de serialización si `datos` es un snapshot (un nodo caído deja una lista vacía)"""
+    return datos.como(formato) if isinstance(datos, SnapshotColumnar) else datos
+
+
+async def leer_snapshot(conn, tabla: str, esquema: Dict[str, str], orden: str, lote: int = LOTE_SNAPSHOT) -> SnapshotColumnar:
+    """Lee una tabla completa por lotes directamente a columnas, sin materializar todas las filas"""
+    constructor = ConstructorSnapshot(esquema)
+    query = f"SELECT {', '.join(esquema)} FROM {tabla} ORDER BY {orden}"
+    async with conn.get_session() as session:
+        async for filas in session.stream(query, None, lote):
+            constructor.agregar(filas)
+    return constructor.construir()
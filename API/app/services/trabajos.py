@@ -0,0 +1,305 @@
+"""Cola de trabajos asíncronos para las evidencias de replicación
+
+Las evidencias (insertar, esperar la replicación y leer cuatro tablas)
+tardan segundos; las rutas las encolan y responden 202 con el id del
+trabajo, que se consulta en GET /jobs/{id}. Un grupo acotado de workers
+los ejecuta, con un límite de trabajos simultáneos por nodo: cada worker
+toma el primer trabajo pendiente cuyos nodos tengan capacidad, así los
+trabajos de un nodo saturado no ocupan workers que podrían atender a los
+demás. Los resultados se conservan TRABAJOS_TTL segundos después de terminar.
+
+Con TRABAJOS_BACKEND=memoria los trabajos solo existen en el proceso que
+los encoló: se pierden al reiniciar y otro worker de uvicorn responde 404.
+Con TRABAJOS_BACKEND=redis cada cambio de estado (encolado, en curso,
+terminado) se guarda también en Redis con el mismo TTL, y GET /jobs/{id}
+lo encuentra desde cualquier proceso y tras un reinicio (el progreso
+intermedio solo se ve en el proceso que lo ejecuta).
+"""
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import os
+import time
+import uuid
+import logging
+
+from app.database.instrumentacion import BUCKETS_MS, Histograma
+from app.database.pool_registry import QUITO, GUAYAQUIL, CUENCA
+from app.services.serializacion import serializar
+
+logger = logging.getLogger(__name__)
+
+# Workers, trabajos en espera como máximo, trabajos simultáneos por nodo y vida de los resultados (s)
+TRABAJOS_WORKERS = int(os.getenv('TRABAJOS_WORKERS', 4))
+TRABAJOS_COLA_MAXIMO = int(os.getenv('TRABAJOS_COLA_MAXIMO', 100))
+TRABAJOS_POR_NODO = int(os.getenv('TRABAJOS_POR_NODO', 2))
+TRABAJOS_TTL = float(os.getenv('TRABAJOS_TTL', 900))
+# Dónde se guardan los trabajos: "memoria" (solo este proceso) o "redis" (compartido y persistente)
+TRABAJOS_BACKEND = os.getenv('TRABAJOS_BACKEND', 'memoria')
+TRABAJOS_REDIS_URL = os.getenv('TRABAJOS_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+
+# Estados de un trabajo
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+COMPLETADO = "completado"
+FALLIDO = "fallido"
+
+
+class ColaLlena(Exception):
+    """La cola de trabajos alcanzó TRABAJOS_COLA_MAXIMO"""
+
+
+@dataclass
+class Trabajo:
+    id: str
+    tipo: str
+    nodos: Tuple[str, ...]
+    funcion: Callable[[], Awaitable[dict]]
+    estado: str = PENDIENTE
+    progreso: float = 0.0
+    etapa: Optional[str] = None
+    creado: datetime = field(default_factory=datetime.now)
+    iniciado: Optional[datetime] = None
+    terminado: Optional[datetime] = None
+    resultado: Optional[dict] = None
+    error: Optional[str] = None
+    # Relojes monotónicos para la espera en cola, la duración y el TTL
+    _encolado: float = field(default_factory=time.monotonic)
+    _inicio: Optional[float] = None
+    _fin: Optional[float] = None
+
+    @property
+    def espera_ms(self) -> Optional[float]:
+        return (self._inicio - self._encolado) * 1000 if self._inicio is not None else None
+
+    @property
+    def duracion_ms(self) -> Optional[float]:
+        return (self._fin - self._inicio) * 1000 if self._fin is not None and self._inicio is not None else None
+
+    def to_dict(self) -> dict:
+        datos = {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "progreso": round(self.progreso, 2),
+            "etapa": self.etapa,
+            "nodos": list(self.nodos),
+            "creado": self.creado.isoformat(),
+            "iniciado": self.iniciado.isoformat() if self.iniciado else None,
+            "terminado": self.terminado.isoformat() if self.terminado else None,
+            "espera_ms": round(self.espera_ms, 1) if self.espera_ms is not None else None,
+            "duracion_ms": round(self.duracion_ms, 1) if self.duracion_ms is not None else None,
+        }
+        if self.estado == COMPLETADO:
+            datos["resultado"] = self.resultado
+        elif self.estado == FALLIDO:
+            datos["error"] = self.error
+        return datos
+
+
+class AlmacenRedis:
+    """Estado serializado de los trabajos en Redis, con TTL; requiere el paquete redis (opcional)"""
+
+    def __init__(self, url: str = TRABAJOS_REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("TRABAJOS_BACKEND=redis requiere instalar el paquete 'redis'")
+        self._redis = redis.from_url(url)
+
+    async def guardar(self, trabajo_id: str, cuerpo: bytes, ttl: float):
+        await self._redis.set(f"trabajo:{trabajo_id}", cuerpo, ex=max(1, int(ttl)))
+
+    async def obtener(self, trabajo_id: str) -> Optional[bytes]:
+        return await self._redis.get(f"trabajo:{trabajo_id}")
+
+
+_trabajo_actual: ContextVar[Optional[Trabajo]] = ContextVar("trabajo_actual", default=None)
+
+
+def reportar_progreso(etapa: str, progreso: float):
+    """Actualiza la etapa del trabajo en curso (no hace nada fuera de un trabajo)"""
+    trabajo = _trabajo_actual.get()
+    if trabajo is not None:
+        trabajo.etapa = etapa
+        trabajo.progreso = progreso
+
+
+class ColaTrabajos:
+    """Cola acotada de trabajos, workers y resultados con TTL"""
+
+    def __init__(self):
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._pendientes: Optional[deque] = None
+        # Se activa al encolar o al liberar capacidad de un nodo
+        self._cambio = asyncio.Event()
+        self._workers = []
+        self._en_curso_por_nodo: Dict[str, int] = {nodo: 0 for nodo in (QUITO, GUAYAQUIL, CUENCA)}
+        # Sin almacén (memoria) los trabajos viven solo en self._trabajos
+        self._almacen = AlmacenRedis() if TRABAJOS_BACKEND == "redis" else None
+        self._guardando = set()
+        self.encolados = 0
+        self.rechazados = 0
+        self.expirados = 0
+        self.duracion_ms = Histograma(
+            "trabajos_duracion_ms", "Duración de la ejecución de cada trabajo", ("tipo", "estado"), BUCKETS_MS
+        )
+        self.espera_ms = Histograma(
+            "trabajos_espera_ms", "Tiempo en cola antes de empezar", ("tipo",), BUCKETS_MS
+        )
+
+    def iniciar(self, workers: int = None):
+        """Arranca los workers de la cola"""
+        if self._workers:
+            return
+        workers = TRABAJOS_WORKERS if workers is None else workers
+        self._pendientes = deque()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        logger.info(f"🧵 Cola de trabajos con {workers} workers ({TRABAJOS_POR_NODO} por nodo)")
+
+    async def detener(self):
+        for tarea in self._workers:
+            tarea.cancel()
+        for tarea in self._workers:
+            try:
+                await tarea
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    def encolar(self, tipo: str, nodos: Tuple[str, ...], funcion: Callable[[], Awaitable[dict]]) -> Trabajo:
+        """Registra un trabajo y lo deja en la cola; ColaLlena si no hay espacio"""
+        if self._pendientes is None:
+            raise RuntimeError("La cola de trabajos no está iniciada")
+        self._purgar()
+        if len(self._pendientes) >= TRABAJOS_COLA_MAXIMO:
+            self.rechazados += 1
+            raise ColaLlena(f"Hay {len(self._pendientes)} trabajos en espera; reintente más tarde")
+        trabajo = Trabajo(uuid.uuid4().hex, tipo, tuple(sorted(nodos)), funcion)
+        self._pendientes.append(trabajo)
+        self._cambio.set()
+        self._trabajos[trabajo.id] = trabajo
+        self.encolados += 1
+        if self._almacen is not None:
+            tarea = asyncio.create_task(self._persistir(trabajo))
+            self._guardando.add(tarea)
+            tarea.add_done_callback(self._guardando.discard)
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[Trabajo]:
+        self._purgar()
+        return self._trabajos.get(trabajo_id)
+
+    async def obtener_persistido(self, trabajo_id: str) -> Optional[bytes]:
+        """JSON del trabajo guardado por cualquier proceso (None sin almacén o si expiró)"""
+        if self._almacen is None:
+            return None
+        return await self._almacen.obtener(trabajo_id)
+
+    async def _persistir(self, trabajo: Trabajo):
+        if self._almacen is None:
+            return
+        try:
+            await self._almacen.guardar(trabajo.id, serializar(trabajo.to_dict()), TRABAJOS_TTL)
+        except Exception as e:
+            logger.error(f"❌ No se pudo guardar el trabajo {trabajo.id}: {e}")
+
+    def _purgar(self):
+        """Elimina los trabajos terminados hace más de TRABAJOS_TTL segundos"""
+        limite = time.monotonic() - TRABAJOS_TTL
+        expirados = [t.id for t in self._trabajos.values() if t._fin is not None and t._fin < limite]
+        for trabajo_id in expirados:
+            del self._trabajos[trabajo_id]
+        self.expirados += len(expirados)
+
+    def _tomar(self) -> Optional[Trabajo]:
+        """Saca el primer trabajo pendiente cuyos nodos tienen capacidad y la reserva"""
+        for trabajo in self._pendientes:
+            if all(self._en_curso_por_nodo[nodo] < TRABAJOS_POR_NODO for nodo in trabajo.nodos):
+                self._pendientes.remove(trabajo)
+                for nodo in trabajo.nodos:
+                    self._en_curso_por_nodo[nodo] += 1
+                return trabajo
+        return None
+
+    async def _worker(self):
+        while True:
+            # Sin await entre _tomar() y clear(): un set() posterior siempre despierta al worker
+            trabajo = self._tomar()
+            if trabajo is None:
+                self._cambio.clear()
+                await self._cambio.wait()
+                continue
+            await self._ejecutar(trabajo)
+
+    async def _ejecutar(self, trabajo: Trabajo):
+        try:
+            trabajo.estado = EN_CURSO
+            trabajo.iniciado = datetime.now()
+            trabajo._inicio = time.monotonic()
+            self.espera_ms.observar((trabajo.tipo,), trabajo.espera_ms)
+            await self._persistir(trabajo)
+            token = _trabajo_actual.set(trabajo)
+            try:
+                trabajo.resultado = await trabajo.funcion()
+                trabajo.estado = COMPLETADO
+                trabajo.progreso = 1.0
+            except Exception as e:
+                logger.error(f"❌ Trabajo {trabajo.tipo} {trabajo.id} falló: {e}")
+                trabajo.estado = FALLIDO
+                trabajo.error = str(e)
+            finally:
+                _trabajo_actual.reset(token)
+        finally:
+            for nodo in trabajo.nodos:
+                self._en_curso_por_nodo[nodo] -= 1
+            self._cambio.set()
+            trabajo.terminado = datetime.now()
+            trabajo._fin = time.monotonic()
+            if trabajo.duracion_ms is not None:
+                self.duracion_ms.observar((trabajo.tipo, trabajo.estado), trabajo.duracion_ms)
+            await self._persistir(trabajo)
+
+    def metricas(self) -> dict:
+        self._purgar()
+        por_estado = {estado: 0 for estado in (PENDIENTE, EN_CURSO, COMPLETADO, FALLIDO)}
+        for trabajo in self._trabajos.values():
+            por_estado[trabajo.estado] += 1
+        return {
+            "workers": len(self._workers),
+            "profundidad_cola": len(self._pendientes) if self._pendientes is not None else 0,
+            "cola_maximo": TRABAJOS_COLA_MAXIMO,
+            "limite_por_nodo": TRABAJOS_POR_NODO,
+            "en_curso_por_nodo": dict(self._en_curso_por_nodo),
+            "ttl_s": TRABAJOS_TTL,
+            "backend": TRABAJOS_BACKEND,
+            "trabajos_guardados": por_estado,
+            "encolados": self.encolados,
+            "rechazados": self.rechazados,
+            "expirados": self.expirados,
+            "duracion_ms": self.duracion_ms.resumen(),
+            "espera_ms": self.espera_ms.resumen(),
+        }
+
+    def prometheus(self) -> str:
+        lineas = [
+            "# HELP trabajos_profundidad_cola Trabajos en espera",
+            "# TYPE trabajos_profundidad_cola gauge",
+            f"trabajos_profundidad_cola {len(self._pendientes) if self._pendientes is not None else 0}",
+            "# HELP trabajos_en_curso Trabajos ejecutándose por nodo",
+            "# TYPE trabajos_en_curso gauge",
+        ]
+        lineas += [f'trabajos_en_curso{{nodo="{nodo}"}} {n}' for nodo, n in self._en_curso_por_nodo.items()]
+        lineas += [
+            "# HELP trabajos_rechazados_total Trabajos rechazados con la cola llena",
+            "# TYPE trabajos_rechazados_total counter",
+            f"trabajos_rechazados_total {self.rechazados}",
+        ]
+        lineas += self.duracion_ms.prometheus() + self.espera_ms.prometheus()
+        return "\n".join(lineas) + "\n"
+
+
+cola_trabajos = ColaTrabajos()
@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import os
+import logging
+
+from app.database.oracle_connection import OracleConnection
+from app.services.serializacion import Filas
+from app.services.snapshot_columnar import SnapshotColumnar
+
+logger = logging.getLogger(__name__)
+
+# Columnas comparadas por contenido (VARCHAR en PostgreSQL y Oracle)
+COLUMNAS_HASH_PELICULAS = ["titulo", "genero", "clasificacion", "director", "url_poster"]
+COLUMNAS_HASH_PROMOCIONES = ["codigo_promo", "descripcion", "descuento_porcentaje", "ciudad"]
+
+# Máximo de claves listadas por categoría en el reporte (el total siempre se informa)
+MAX_CLAVES_REPORTE = int(os.getenv('VERIFICACION_MAX_CLAVES', 100))
+
+
+def expresion_hash_postgres(columnas: List[str]) -> str:
+    """md5 de las columnas unidas por '|' (NULL como cadena vacía, igual que Oracle)"""
+    return "md5(" + " || '|' || ".join(f"coalesce({c}::text, '')" for c in columnas) + ")"
+
+
+def expresion_hash_oracle(columnas: List[str]) -> str:
+    """Mismo hash que expresion_hash_postgres calculado en Oracle"""
+    return "LOWER(RAWTOHEX(STANDARD_HASH(" + " || '|' || ".join(columnas) + ", 'MD5')))"
+
+
+def expresion_hash(conn, columnas: List[str]) -> str:
+    """Expresión de hash por fila adecuada al motor del nodo"""
+    if isinstance(conn, OracleConnection):
+        return expresion_hash_oracle(columnas)
+    return expresion_hash_postgres(columnas)
+
+
+async def leer_claves(
+    conn, tabla: str, columna_id: str, columnas_hash: List[str] = None, filtro: str = None
+) -> Dict[int, Optional[str]]:
+    """Lee solo las claves primarias (y opcionalmente un hash por fila) de un nodo"""
+    columnas = columna_id
+    if columnas_hash:
+        columnas = f"{columna_id}, {expresion_hash(conn, columnas_hash)}"
+    query = f"SELECT {columnas} FROM {tabla}"
+    if filtro:
+        query += f" WHERE {filtro}"
+    # Lectura de la tabla completa: fuera del SLO de latencia del circuito
+    async with conn.get_session(slo=False) as session:
+        result = await session.execute(query)
+        if columnas_hash:
+            return {int(row[0]): row[1] for row in result.fetchall()}
+        return {int(row[0]): None for row in result.fetchall()}
+
+
+def hash_valores(valores: Iterable) -> str:
+    """md5 de los valores unidos por '|' (NULL como cadena vacía), calculado en Python"""
+    texto = "|".join("" if v is None else str(v) for v in valores)
+    return hashlib.md5(texto.encode("utf-8")).hexdigest()
+
+
+def claves_de_filas(
+    filas: Iterable[dict], columna_id: str, columnas_hash: List[str] = None
+) -> Dict[int, Optional[str]]:
+    """Claves de un snapshot completo y, con columnas_hash, un hash de contenido por fila
+
+    El hash se calcula sobre las filas ya leídas: solo es comparable con
+    otro snapshot hasheado igual, no con el de leer_claves.
+    """
+    if isinstance(filas, (Filas, SnapshotColumnar)):
+        claves = filas.columna(columna_id)
+        if not columnas_hash:
+            return {int(clave): None for clave in claves}
+        columnas = zip(*(filas.columna(c) for c in columnas_hash))
+        return {int(clave): hash_valores(valores) for clave, valores in zip(claves, columnas)}
+    if not columnas_hash:
+        return {int(fila[columna_id]): None for fila in filas}
+    return {int(fila[columna_id]): hash_valores(fila.get(c) for c in columnas_hash) for fila in filas}
+
+
+@dataclass
+class ReporteDiferencias:
+    """Diferencias entre las claves de un nodo origen y un nodo destino"""
+    total_origen: int
+    total_destino: int
+    faltantes: List[int] = field(default_factory=list)
+    sobrantes: List[int] = field(default_factory=list)
+    distintas: List[int] = field(default_factory=list)
+
+    @property
+    def sincronizado(self) -> bool:
+        return not (self.faltantes or self.sobrantes or self.distintas)
+
+    def to_dict(self) -> dict:
+        def compacto(claves):
+            return {"total": len(claves), "claves": claves[:MAX_CLAVES_REPORTE]}
+        return {
+            "total_origen": self.total_origen,
+            "total_destino": self.total_destino,
+            "sincronizado": self.sincronizado,
+            "faltantes_en_destino": compacto(self.faltantes),
+            "sobrantes_en_destino": compacto(self.sobrantes),
+            "contenido_distinto": compacto(self.distintas)
+        }
+
+
+def comparar_claves(
+    origen: Dict[int, Optional[str]], destino: Dict[int, Optional[str]], solo_origen: bool = False
+) -> ReporteDiferencias:
+    """Calcula claves faltantes, sobrantes y con contenido distinto en el destino
+
+    Con `solo_origen` el destino también recibe filas de otros nodos (Cuenca
+    tiene las de Quito además de las de Guayaquil): solo se exige que el
+    origen esté contenido en el destino y no se reportan sobrantes.
+    """
+    comunes = origen.keys() & destino.keys()
+    return ReporteDiferencias(
+        total_origen=len(origen),
+        total_destino=len(destino),
+        faltantes=sorted(origen.keys() - destino.keys()),
+        sobrantes=[] if solo_origen else sorted(destino.keys() - origen.keys()),
+        distintas=sorted(k for k in comunes if origen[k] != destino[k])
+    )
@@ -0,0 +1,76 @@
+"""Benchmark: vista de Quito vs merge join de fragmentos en la API para empleados
+
+Ejecuta ambos modos de EmpleadosVistaCompletaService contra las bases
+configuradas en .env y compara latencia total, tiempo hasta el primer lote
+y pico de memoria (tracemalloc) al consumir el resultado en streaming.
+
+Uso (desde API/):
+    python benchmarks/benchmark_empleados_merge.py --repeticiones 5 --lote 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from app.database.pool_registry import pool_registry  # noqa: E402
+from app.services.empleados_vista_completa_service import (  # noqa: E402
+    EmpleadosVistaCompletaService, MODO_VISTA, MODO_MERGE
+)
+
+
+async def medir_modo(modo: str, lote: int) -> dict:
+    service = EmpleadosVistaCompletaService()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    primer_lote_ms = None
+    filas = 0
+    async for empleados in service.stream_empleados_completos(lote, modo=modo):
+        if primer_lote_ms is None:
+            primer_lote_ms = (time.perf_counter() - inicio) * 1000
+        filas += len(empleados)
+    total_ms = (time.perf_counter() - inicio) * 1000
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"filas": filas, "total_ms": total_ms, "primer_lote_ms": primer_lote_ms or total_ms,
+            "pico_memoria_kb": pico / 1024}
+
+
+def resumir(mediciones: list) -> dict:
+    return {
+        "filas": mediciones[-1]["filas"],
+        **{
+            f"{clave}_mediana": round(statistics.median(m[clave] for m in mediciones), 1)
+            for clave in ("total_ms", "primer_lote_ms", "pico_memoria_kb")
+        }
+    }
+
+
+async def main(repeticiones: int, lote: int) -> dict:
+    await pool_registry.open()
+    try:
+        resultados = {}
+        for modo in (MODO_VISTA, MODO_MERGE):
+            # Una pasada de calentamiento para abrir conexiones y llenar cachés
+            await medir_modo(modo, lote)
+            resultados[modo] = resumir([await medir_modo(modo, lote) for _ in range(repeticiones)])
+        return resultados
+    finally:
+        await pool_registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.repeticiones, args.lote)), indent=2, ensure_ascii=False))
@@ -0,0 +1,204 @@
+"""Suite pytest-benchmark de todos los routers contra nodos locales sembrados con datos sintéticos
+
+Mide, con la app en proceso (httpx + ASGI):
+  - costo de conexión en frío (sin pool, conexión por petición) vs en caliente (pool)
+  - latencia por endpoint (al menos uno por router de app/routes)
+  - costo de serialización de resultados grandes (variantes de benchmarks/benchmark_serializacion.py)
+  - throughput con clientes concurrentes
+
+Quito y Guayaquil usan un PostgreSQL local (ver benchmarks/standins.py) y
+Cuenca un Oracle falso; las opciones de conexión y tamaño están en
+benchmarks/conftest.py. Sin PostgreSQL local solo corren los benchmarks de
+serialización. --benchmark-json guarda los resultados con el commit actual
+para comparar regresiones (pytest-benchmark compare).
+
+Uso (desde API/):
+    pytest benchmarks/benchmark_routers.py --sembrar --filas 100000 --benchmark-json=benchmark.json
+    pytest benchmarks/benchmark_routers.py --repeticiones 50 --benchmark-json=benchmark.json
+    pytest benchmarks/benchmark_routers.py -k serializacion
+"""
+import asyncio
+import functools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from benchmarks.benchmark_serializacion import VARIANTES, filas_cliente  # noqa: E402
+
+# (nombre, método, ruta): al menos un endpoint por router; agregar aquí los routers nuevos.
+# Las evidencias de replicación usan esperar=true: sin él responden 202 al encolar y solo
+# se mediría el encolado, no comparable con corridas anteriores.
+ENDPOINTS = [
+    ("clientes_completo", "GET", "/api/v1/clientes-unificados/"),
+    ("clientes_pagina", "GET", "/api/v1/clientes-unificados/pagina?limit=100"),
+    ("clientes_federado_quito", "GET", "/api/v1/clientes-unificados/federado?ciudad=Quito&limit=100"),
+    ("clientes_federado_todos", "GET", "/api/v1/clientes-unificados/federado?limit=100"),
+    ("clientes_stream", "GET", "/api/v1/clientes-unificados/stream"),
+    ("empleados_completo", "GET", "/api/v1/empleados-vista-completa/"),
+    ("empleados_pagina", "GET", "/api/v1/empleados-vista-completa/pagina?limit=100"),
+    ("empleados_pagina_merge", "GET", "/api/v1/empleados-vista-completa/pagina?limit=100&modo=merge"),
+    ("empleados_stream_csv", "GET", "/api/v1/empleados-vista-completa/stream?formato=csv"),
+    ("replicacion_bidireccional", "POST", "/api/v1/replicacion-bidireccional?nodo_para_insertar=Quito&cantidad_registros=1&esperar=true"),
+    ("replicacion_quito_cuenca", "POST", "/api/v1/replicacion-unidireccional/quito-cuenca?cantidad=1&esperar=true"),
+    ("replicacion_guayaquil_cuenca", "POST", "/api/v1/replicacion-unidireccional/guayaquil-cuenca?cantidad=1&esperar=true"),
+    ("pools_estadisticas", "GET", "/api/v1/pools/estadisticas"),
+    ("metricas_replicacion", "GET", "/api/v1/replicacion/metricas"),
+    ("metricas_prometheus", "GET", "/api/v1/replicacion/metricas/prometheus"),
+    ("consistencia", "GET", "/api/v1/consistencia"),
+    ("consistencia_verificar", "POST", "/api/v1/consistencia/verificar"),
+    ("cache_estadisticas", "GET", "/api/v1/cache/estadisticas"),
+    ("eventos_estado", "GET", "/api/v1/eventos/estado"),
+    ("carga_masiva", "POST", "/api/v1/carga-masiva/guayaquil_quito?cantidad=1000&lote=1000"),
+    ("instrumentacion", "GET", "/api/v1/instrumentacion"),
+    ("instrumentacion_consultas_lentas", "GET", "/api/v1/instrumentacion/consultas-lentas"),
+    ("instrumentacion_prometheus", "GET", "/api/v1/instrumentacion/prometheus"),
+    ("trabajos_metricas", "GET", "/api/v1/jobs/metricas"),
+    ("trabajos_prometheus", "GET", "/api/v1/jobs/metricas/prometheus"),
+    ("nodos_estado", "GET", "/api/v1/nodos/estado"),
+    ("nodos_sondear", "POST", "/api/v1/nodos/estado/sondear"),
+]
+
+# Endpoints que devuelven la tabla completa: se omiten con --sin-completos (1M filas)
+COMPLETOS = {"clientes_completo", "clientes_stream", "empleados_completo", "empleados_stream_csv"}
+
+ENDPOINT_FRIO_CALIENTE = "/api/v1/clientes-unificados/pagina?limit=10"
+ENDPOINT_CONCURRENCIA = "/api/v1/clientes-unificados/pagina?limit=100"
+# Trabajo encolado sin esperar, para medir GET /jobs/{id}
+ENDPOINT_TRABAJO = "/api/v1/replicacion-unidireccional/quito-cuenca?cantidad=1"
+
+NIVELES_CONCURRENCIA = (1, 8, 32)
+PETICIONES_POR_CLIENTE = 10
+TAMANOS_SERIALIZACION = (10_000, 100_000, 1_000_000)
+RONDAS_SERIALIZACION = 3
+
+
+class Api:
+    """Cliente httpx sobre la app en proceso, con su propio event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        self.loop = loop
+        self.client = client
+
+    def correr(self, corrutina):
+        return self.loop.run_until_complete(corrutina)
+
+    async def _pedir(self, metodo: str, ruta: str) -> httpx.Response:
+        response = await self.client.request(metodo, ruta)
+        response.raise_for_status()
+        return response
+
+    def pedir(self, metodo: str, ruta: str) -> httpx.Response:
+        return self.correr(self._pedir(metodo, ruta))
+
+
+@pytest.fixture(scope="module")
+def opciones(request):
+    return request.config.option
+
+
+@pytest.fixture(scope="module")
+def api(opciones):
+    from benchmarks.standins import instalar_oracle_falso, sembrar
+    instalar_oracle_falso()
+    from app.database.pool_registry import pool_registry, postgres_params, QUITO
+    from app.main import app
+
+    loop = asyncio.new_event_loop()
+    if opciones.sembrar:
+        destinos = {opciones.pg_db: 1, (opciones.pg_db_guayaquil or opciones.pg_db): 2}
+        try:
+            for db, db_number in destinos.items():
+                print(f"Sembrando {db} con {opciones.filas} filas...")
+                loop.run_until_complete(sembrar(postgres_params(db_number), opciones.filas, opciones.filas_catalogo))
+        except OSError as e:
+            loop.close()
+            pytest.skip(f"PostgreSQL local no disponible: {e}")
+
+    lifespan = app.router.lifespan_context(app)
+    loop.run_until_complete(lifespan.__aenter__())
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=opciones.timeout_peticion
+    )
+    try:
+        if not pool_registry.is_open(QUITO):
+            pytest.skip(f"PostgreSQL local no disponible en {opciones.pg_host}:{opciones.pg_port}")
+        yield Api(loop, client)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.run_until_complete(lifespan.__aexit__(None, None, None))
+        loop.close()
+
+
+def _medir(benchmark, api: Api, opciones, metodo: str, ruta: str):
+    api.pedir(metodo, ruta)  # calentamiento
+    benchmark.pedantic(api.pedir, args=(metodo, ruta), rounds=opciones.repeticiones, iterations=1)
+
+
+@pytest.mark.parametrize("nombre,metodo,ruta", ENDPOINTS, ids=[e[0] for e in ENDPOINTS])
+def test_endpoint(benchmark, api, opciones, nombre, metodo, ruta):
+    if opciones.sin_completos and nombre in COMPLETOS:
+        pytest.skip("tabla completa omitida con --sin-completos")
+    benchmark.group = "endpoints"
+    _medir(benchmark, api, opciones, metodo, ruta)
+
+
+def test_trabajo(benchmark, api, opciones):
+    """GET /jobs/{id} de un trabajo recién encolado"""
+    benchmark.group = "endpoints"
+    url = api.pedir("POST", ENDPOINT_TRABAJO).headers["Location"]
+    _medir(benchmark, api, opciones, "GET", url)
+
+
+def test_conexion_sin_pool(benchmark, api, opciones):
+    """Conexión en frío: sin pool, cada petición abre y cierra su conexión"""
+    from app.database.pool_registry import pool_registry
+    benchmark.group = "frio_vs_caliente"
+    api.correr(pool_registry.close())
+    try:
+        benchmark.pedantic(api.pedir, args=("GET", ENDPOINT_FRIO_CALIENTE), rounds=opciones.repeticiones, iterations=1)
+    finally:
+        api.correr(pool_registry.open())
+
+
+def test_conexion_con_pool(benchmark, api, opciones):
+    benchmark.group = "frio_vs_caliente"
+    _medir(benchmark, api, opciones, "GET", ENDPOINT_FRIO_CALIENTE)
+
+
+@pytest.mark.parametrize("clientes", NIVELES_CONCURRENCIA)
+def test_concurrencia(benchmark, api, opciones, clientes):
+    """Ráfaga de `clientes` clientes concurrentes, cada uno con PETICIONES_POR_CLIENTE peticiones seguidas"""
+    benchmark.group = "concurrencia"
+
+    async def cliente():
+        for _ in range(PETICIONES_POR_CLIENTE):
+            await api._pedir("GET", ENDPOINT_CONCURRENCIA)
+
+    async def rafaga():
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+
+    benchmark.pedantic(lambda: api.correr(rafaga()), rounds=max(1, opciones.repeticiones // 4), iterations=1)
+    peticiones = clientes * PETICIONES_POR_CLIENTE
+    benchmark.extra_info["peticiones_por_ronda"] = peticiones
+    benchmark.extra_info["peticiones_por_s"] = round(peticiones / benchmark.stats.stats.mean, 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _filas(n: int) -> list:
+    return filas_cliente(n)
+
+
+@pytest.mark.parametrize("filas", TAMANOS_SERIALIZACION)
+@pytest.mark.parametrize("variante", list(VARIANTES))
+def test_serializacion(benchmark, opciones, variante, filas):
+    """Construir la estructura del servicio y el cuerpo JSON; no necesita base de datos"""
+    if filas > max(opciones.filas, TAMANOS_SERIALIZACION[0]):
+        pytest.skip(f"{filas} filas supera --filas {opciones.filas}")
+    benchmark.group = f"serializacion_{filas}"
+    cuerpo = benchmark.pedantic(VARIANTES[variante], args=(_filas(filas),), rounds=RONDAS_SERIALIZACION, iterations=1)
+    benchmark.extra_info["bytes"] = len(cuerpo)
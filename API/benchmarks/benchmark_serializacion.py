@@ -0,0 +1,107 @@
+"""Costo de serializar resultados grandes: serializador estándar vs orjson vs Filas
+
+Parte de las mismas tuplas que devuelve la base de datos y mide, por variante,
+construir la estructura que entrega el servicio y convertirla en el cuerpo JSON:
+  - estandar:         dict por fila + jsonable_encoder + json (comportamiento original)
+  - orjson_dicts:     dict por fila + orjson
+  - orjson_filas:     Filas (tuplas + columnas) + orjson, lista de objetos
+  - orjson_compacto:  Filas compacto + orjson, {"columnas", "filas"} sin dicts
+
+Sin el paquete orjson solo se mide la variante estándar.
+No necesita base de datos. Uso (desde API/):
+    python benchmarks/benchmark_serializacion.py --filas 100000 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.services.clientes_unificados_service import COLUMNAS_CLIENTE  # noqa: E402
+from app.services.serializacion import Filas, _por_defecto  # noqa: E402
+
+POR_FILAS = 100_000
+
+
+def filas_cliente(n: int) -> list:
+    """Tuplas con la forma de vista_clientes_unificados (más un Decimal para cubrir NUMERIC)"""
+    base = datetime(2024, 1, 1)
+    return [
+        (i, f"Nombre{i}", f"Apellido{i}", f"c{i}@correo.ec", "0999999999", f"Calle {i}",
+         "Quito", base + timedelta(minutes=i), Decimal("10.50"))
+        for i in range(n)
+    ]
+
+
+COLUMNAS = COLUMNAS_CLIENTE + ["saldo"]
+
+
+def _orjson(contenido) -> bytes:
+    return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+
+
+VARIANTES = {
+    "estandar": lambda filas: JSONResponse(jsonable_encoder([dict(zip(COLUMNAS, f)) for f in filas])).body,
+}
+if orjson is not None:
+    VARIANTES.update({
+        "orjson_dicts": lambda filas: _orjson([dict(zip(COLUMNAS, f)) for f in filas]),
+        "orjson_filas": lambda filas: _orjson(Filas(COLUMNAS, filas)),
+        "orjson_compacto": lambda filas: _orjson(Filas(COLUMNAS, filas, compacto=True)),
+    })
+
+
+def medir(filas: list, repeticiones: int) -> dict:
+    resultados = {}
+    for nombre, variante in VARIANTES.items():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cuerpo = variante(filas)
+            tiempos.append(time.perf_counter() - inicio)
+        ms = statistics.median(tiempos) * 1000
+        resultados[nombre] = {
+            "ms": round(ms, 1),
+            "ms_por_100k_filas": round(ms * POR_FILAS / len(filas), 1),
+            "bytes": len(cuerpo),
+        }
+    estandar = resultados["estandar"]["ms_por_100k_filas"]
+    for nombre, r in resultados.items():
+        r["ahorro_ms_por_100k_filas"] = round(estandar - r["ms_por_100k_filas"], 1)
+        r["aceleracion"] = round(estandar / r["ms_por_100k_filas"], 1) if r["ms_por_100k_filas"] else None
+    return resultados
+
+
+def serializacion(tamanos: list, repeticiones: int = 3) -> dict:
+    return {str(n): medir(filas_cliente(n), repeticiones) for n in tamanos}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=lambda s: [int(x) for x in s.split(",")], default=[POR_FILAS])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", default=None, help="Archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    resultado = serializacion(args.filas, args.repeticiones)
+    for n, variantes in resultado.items():
+        print(f"\n{n} filas")
+        print(f"  {'variante':<18}{'ms':>10}{'ms/100k':>10}{'ahorro/100k':>13}{'x':>6}{'MB':>8}")
+        for nombre, r in variantes.items():
+            print(f"  {nombre:<18}{r['ms']:>10}{r['ms_por_100k_filas']:>10}"
+                  f"{r['ahorro_ms_por_100k_filas']:>13}{r['aceleracion']:>6}{r['bytes'] / 1e6:>8.1f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
@@ -0,0 +1,68 @@
+"""Memoria pico de una evidencia con cuatro snapshots del catálogo (Quito/Cuenca antes y después)
+
+Compara la representación original (un dict por fila) con SnapshotColumnar.
+Cada snapshot parte de tuplas nuevas, como las que entrega el driver en cada
+consulta, así que los textos repetidos entre nodos solo se comparten si se internan.
+
+No necesita base de datos. Uso (desde API/):
+    python benchmarks/benchmark_snapshots.py --filas 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.snapshot_columnar import ESQUEMA_PELICULAS, SnapshotColumnar  # noqa: E402
+
+SNAPSHOTS = 4
+GENEROS = ["Acción", "Drama", "Comedia", "Terror", "Sci-Fi"]
+
+
+def filas_driver(n: int):
+    """Tuplas con objetos nuevos en cada llamada (como un fetch real)"""
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        yield (
+            i + 1, "".join(["Película ", str(i)]), "".join(GENEROS[i % 5]), "".join(["PG"]),
+            "".join(["Director ", str(i % 500)]), "".join(["Sinopsis de la película ", str(i)]),
+            "".join(["https://ejemplo.com/poster_", str(i), ".jpg"]), base + timedelta(seconds=i)
+        )
+
+
+def como_dicts(n: int) -> list:
+    columnas = list(ESQUEMA_PELICULAS)
+    return [dict(zip(columnas, fila)) for fila in filas_driver(n)]
+
+
+def como_columnar(n: int) -> SnapshotColumnar:
+    return SnapshotColumnar.desde_filas(ESQUEMA_PELICULAS, filas_driver(n))
+
+
+def medir(construir, n: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    snapshots = [construir(n) for _ in range(SNAPSHOTS)]
+    segundos = time.perf_counter() - inicio
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del snapshots
+    return {"pico_mb": round(pico / 1e6, 1), "retenido_mb": round(actual / 1e6, 1), "segundos": round(segundos, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas por snapshot")
+    args = parser.parse_args()
+
+    dicts = medir(como_dicts, args.filas)
+    columnar = medir(como_columnar, args.filas)
+    print(f"{SNAPSHOTS} snapshots x {args.filas} filas")
+    print(f"  dict por fila:    {dicts}")
+    print(f"  SnapshotColumnar: {columnar}")
+    print(f"  reducción del pico: {dicts['pico_mb'] / columnar['pico_mb']:.1f}x")
@@ -0,0 +1,55 @@
+"""Opciones y entorno de la suite pytest-benchmark (benchmarks/benchmark_routers.py)"""
+import os
+
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("nodos", "Nodos locales para los benchmarks")
+    grupo.addoption("--pg-host", default="localhost")
+    grupo.addoption("--pg-port", type=int, default=5432)
+    grupo.addoption("--pg-usuario", default="postgres")
+    grupo.addoption("--pg-password", default="postgres")
+    grupo.addoption("--pg-db", default="postgres", help="Base de Quito (y Cuenca, vía Oracle falso)")
+    grupo.addoption("--pg-db-guayaquil", default=None, help="Base de Guayaquil (por defecto la misma que Quito)")
+    grupo.addoption("--sembrar", action="store_true", help="Crear esquema y datos sintéticos antes de medir")
+    grupo.addoption("--filas", type=int, default=10_000, help="Clientes y empleados sintéticos (10k, 100k, 1M)")
+    grupo.addoption("--filas-catalogo", type=int, default=1_000, help="Películas y promociones sintéticas")
+    grupo.addoption("--repeticiones", type=int, default=20, help="Rondas por endpoint")
+    grupo.addoption("--sin-completos", action="store_true", help="Omitir endpoints que devuelven tablas completas")
+    grupo.addoption("--con-cache", action="store_true", help="Medir con la cache de respuestas activa")
+    grupo.addoption("--timeout-peticion", type=float, default=300)
+
+
+def pytest_configure(config):
+    """Apunta Quito y Guayaquil al PostgreSQL local y apaga tareas de fondo antes de importar la app"""
+    opciones = config.option
+    for prefijo in ("POSTGRES", "POSTGRES2"):
+        os.environ[f"{prefijo}_HOST"] = opciones.pg_host
+        os.environ[f"{prefijo}_PORT"] = str(opciones.pg_port)
+        os.environ[f"{prefijo}_USERNAME"] = opciones.pg_usuario
+        os.environ[f"{prefijo}_PASSWORD"] = opciones.pg_password
+    os.environ["POSTGRES_DB"] = opciones.pg_db
+    os.environ["POSTGRES2_DB"] = opciones.pg_db_guayaquil or opciones.pg_db
+    os.environ.update({
+        "NOTIFY_HABILITADO": "false",
+        "LAG_SONDEO_INTERVALO": "0",
+        "CONSISTENCIA_INTERVALO": "0",
+        "SALUD_INTERVALO": "0",
+        "REPLICACION_DEADLINE": "2",
+    })
+    if not opciones.con_cache:
+        os.environ.update({"CACHE_TTL_CLIENTES": "0", "CACHE_TTL_EMPLEADOS": "0"})
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Guarda en el JSON la configuración de la corrida (sin la contraseña) para comparar entre commits"""
+    opciones = config.option
+    output_json["config"] = {
+        "filas": opciones.filas,
+        "filas_catalogo": opciones.filas_catalogo,
+        "repeticiones": opciones.repeticiones,
+        "sin_completos": opciones.sin_completos,
+        "con_cache": opciones.con_cache,
+        "pg_host": opciones.pg_host,
+        "pg_db": opciones.pg_db,
+        "pg_db_guayaquil": opciones.pg_db_guayaquil,
+    }
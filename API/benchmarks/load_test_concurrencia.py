@@ -0,0 +1,83 @@
+"""Prueba de carga: verifica que las consultas a nodos distintos no se serializan
+
+Ejecuta cada endpoint por separado y luego todos a la vez contra una API en
+marcha, mientras mide la latencia de /health. Si la capa de datos bloquea el
+event loop, el tiempo concurrente se acerca a la suma de los individuales y
+/health se dispara; si no, se acerca al más lento y /health se mantiene.
+
+Uso:
+    python benchmarks/load_test_concurrencia.py --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+ENDPOINTS_POR_DEFECTO = [
+    "/test-postgres1",                      # Quito
+    "/test-postgres2",                      # Guayaquil
+    "/test-oracle",                         # Cuenca
+    "/api/v1/clientes-unificados/",
+    "/api/v1/empleados-vista-completa/",
+]
+
+
+async def medir(client: httpx.AsyncClient, path: str) -> float:
+    inicio = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    return (time.perf_counter() - inicio) * 1000
+
+
+async def sondear_health(client: httpx.AsyncClient, detener: asyncio.Event, intervalo: float) -> list:
+    latencias = []
+    while not detener.is_set():
+        latencias.append(await medir(client, "/health"))
+        await asyncio.sleep(intervalo)
+    return latencias
+
+
+async def main(base_url: str, endpoints: list, repeticiones: int, timeout: float) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        individuales = {}
+        for path in endpoints:
+            individuales[path] = min([await medir(client, path) for _ in range(repeticiones)])
+
+        detener = asyncio.Event()
+        sonda = asyncio.create_task(sondear_health(client, detener, 0.02))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(medir(client, path) for path in endpoints for _ in range(repeticiones)))
+        concurrente_ms = (time.perf_counter() - inicio) * 1000
+        detener.set()
+        health = await sonda
+
+    suma_ms = sum(individuales.values()) * repeticiones
+    mas_lento_ms = max(individuales.values())
+    return {
+        "individual_ms": {path: round(ms, 1) for path, ms in individuales.items()},
+        "suma_secuencial_ms": round(suma_ms, 1),
+        "mas_lento_ms": round(mas_lento_ms, 1),
+        "concurrente_ms": round(concurrente_ms, 1),
+        "speedup_vs_secuencial": round(suma_ms / concurrente_ms, 2) if concurrente_ms else None,
+        "health_durante_carga_ms": {
+            "muestras": len(health),
+            "max": round(max(health), 1) if health else None,
+            "promedio": round(sum(health) / len(health), 1) if health else None,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", action="append", dest="endpoints",
+                        help="Endpoint a incluir (repetible); por defecto uno por nodo")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    reporte = asyncio.run(main(args.base_url, args.endpoints or ENDPOINTS_POR_DEFECTO,
+                               args.repeticiones, args.timeout))
+    print(json.dumps(reporte, indent=2, ensure_ascii=False))
@@ -0,0 +1,164 @@
+"""Nodos locales para los benchmarks: esquema sintético en PostgreSQL y Oracle falso
+
+Quito y Guayaquil apuntan a un PostgreSQL local (por defecto la misma base,
+así la "replicación" entre ellos es inmediata). Cuenca se sustituye por un
+Oracle falso que traduce el dialecto Oracle que usan los servicios y lee
+los datos de Quito, como si el trigger Quito → Cuenca replicara al instante.
+
+    docker run -d --name bench-pg -e POSTGRES_PASSWORD=postgres -p 5432:5432 postgres:16
+"""
+import re
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from app.database.sentencias import ORACLE, obtener
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS peliculas_catalogo (
+    pelicula_id SERIAL PRIMARY KEY, titulo VARCHAR(200), genero VARCHAR(50), clasificacion VARCHAR(10),
+    director VARCHAR(100), sinopsis TEXT, url_poster VARCHAR(300), fecha_creacion TIMESTAMP DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS promociones (
+    promocion_id SERIAL PRIMARY KEY, codigo_promo VARCHAR(30), descripcion TEXT,
+    descuento_porcentaje NUMERIC(5, 2), fecha_creacion TIMESTAMP DEFAULT now(), ciudad VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS clientes_quito (
+    cliente_id INTEGER PRIMARY KEY, nombre VARCHAR(100), apellido VARCHAR(100), email VARCHAR(150),
+    telefono VARCHAR(20), direccion VARCHAR(200), ciudad_registro VARCHAR(50), fecha_creacion TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS clientes_guayaquil (LIKE clientes_quito INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS clientes_cuenca (LIKE clientes_quito INCLUDING ALL);
+CREATE OR REPLACE VIEW vista_clientes_unificados AS
+    SELECT * FROM clientes_quito UNION ALL SELECT * FROM clientes_guayaquil UNION ALL SELECT * FROM clientes_cuenca;
+CREATE TABLE IF NOT EXISTS empleados_principal (
+    empleado_id INTEGER PRIMARY KEY, nombre VARCHAR(100), apellido VARCHAR(100),
+    cargo VARCHAR(50), ciudad_tienda VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS empleados_complementario (
+    empleado_id INTEGER PRIMARY KEY, salario NUMERIC(10, 2), fecha_contratacion DATE, contacto_emergencia VARCHAR(100)
+);
+CREATE OR REPLACE VIEW empleados_vista_completa AS
+    SELECT p.empleado_id, p.nombre, p.apellido, p.cargo, p.ciudad_tienda,
+           c.salario, c.fecha_contratacion, c.contacto_emergencia
+    FROM empleados_principal p JOIN empleados_complementario c USING (empleado_id);
+"""
+
+TABLAS = [
+    "peliculas_catalogo", "promociones", "clientes_quito", "clientes_guayaquil", "clientes_cuenca",
+    "empleados_principal", "empleados_complementario",
+]
+
+# Cada fragmento de clientes recibe un tercio de las filas, con ids disjuntos
+SEMILLAS = {
+    "clientes": """
+        INSERT INTO clientes_{ciudad_tabla} SELECT g, 'Nombre' || g, 'Apellido' || g, 'cliente' || g || '@correo.ec',
+               '09' || lpad(g::text, 8, '0'), 'Calle ' || g, '{ciudad}', now() - (g || ' minutes')::interval
+        FROM generate_series({desde}, {hasta}) g
+    """,
+    "empleados_principal": """
+        INSERT INTO empleados_principal SELECT g, 'Nombre' || g, 'Apellido' || g,
+               (ARRAY['Cajero', 'Gerente', 'Proyeccionista', 'Limpieza'])[1 + g % 4],
+               (ARRAY['Quito', 'Guayaquil', 'Cuenca'])[1 + g % 3]
+        FROM generate_series(1, {filas}) g
+    """,
+    "empleados_complementario": """
+        INSERT INTO empleados_complementario SELECT g, 450 + (g % 1500), date '2015-01-01' + (g % 3000),
+               'Contacto ' || g
+        FROM generate_series(1, {filas}) g
+    """,
+    "peliculas_catalogo": """
+        INSERT INTO peliculas_catalogo (titulo, genero, clasificacion, director, sinopsis, url_poster)
+        SELECT 'Película ' || g, (ARRAY['Acción', 'Drama', 'Comedia', 'Terror'])[1 + g % 4],
+               (ARRAY['G', 'PG', 'PG-13', 'R'])[1 + g % 4], 'Director ' || g,
+               'Sinopsis ' || g, 'https://ejemplo.com/poster_' || g || '.jpg'
+        FROM generate_series(1, {filas}) g
+    """,
+    "promociones": """
+        INSERT INTO promociones (codigo_promo, descripcion, descuento_porcentaje, ciudad)
+        SELECT 'PROMO' || g, 'Promoción ' || g, 5 + g % 50, (ARRAY['Quito', 'Guayaquil'])[1 + g % 2]
+        FROM generate_series(1, {filas}) g
+    """,
+}
+
+
+async def sembrar(params: dict, filas: int, filas_catalogo: int):
+    """Crea el esquema y lo llena con `filas` clientes/empleados y `filas_catalogo` películas/promociones"""
+    conn = await asyncpg.connect(**params)
+    try:
+        await conn.execute(ESQUEMA)
+        await conn.execute(f"TRUNCATE {', '.join(TABLAS)} RESTART IDENTITY")
+        tercio = max(1, filas // 3)
+        for i, ciudad in enumerate(["Quito", "Guayaquil", "Cuenca"]):
+            hasta = filas if i == 2 else (i + 1) * tercio
+            await conn.execute(SEMILLAS["clientes"].format(
+                ciudad_tabla=ciudad.lower(), ciudad=ciudad, desde=i * tercio + 1, hasta=hasta
+            ))
+        await conn.execute(SEMILLAS["empleados_principal"].format(filas=filas))
+        await conn.execute(SEMILLAS["empleados_complementario"].format(filas=filas))
+        await conn.execute(SEMILLAS["peliculas_catalogo"].format(filas=filas_catalogo))
+        await conn.execute(SEMILLAS["promociones"].format(filas=filas_catalogo))
+        await conn.execute(f"ANALYZE {', '.join(TABLAS)}")
+    finally:
+        await conn.close()
+
+
+_TRADUCCIONES = [
+    (re.compile(r"LOWER\(RAWTOHEX\(STANDARD_HASH\((.*?), 'MD5'\)\)\)", re.S), r"md5(\1)"),
+    (re.compile(r"TO_NUMBER\((SUBSTR\(UPPER\(h\), \d+, 8\)), 'XXXXXXXX'\)"), r"('x' || lower(\1))::bit(32)::bigint"),
+    (re.compile(r"FETCH FIRST (\d+) ROWS ONLY"), r"LIMIT \1"),
+    (re.compile(r"\s+FROM DUAL", re.I), ""),
+    (re.compile(r":\d+\b"), "%s"),
+]
+
+
+def traducir_oracle(query: str) -> str:
+    """Dialecto Oracle de los servicios → PostgreSQL"""
+    for patron, reemplazo in _TRADUCCIONES:
+        query = patron.sub(reemplazo, query)
+    return query
+
+
+class SesionOracleFalsa:
+    """Sesión con la interfaz de las sesiones Oracle, servida por PostgreSQL"""
+
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, query, params=None):
+        return await self._session.execute(traducir_oracle(query), tuple(params) if params else None)
+
+    async def stream(self, query, params=None, batch_size=1000):
+        async for filas in self._session.stream(traducir_oracle(query), tuple(params) if params else None, batch_size):
+            yield filas
+
+    async def fetch_dicts(self, query, params=None, preparar_cursor=None):
+        result = await self.execute(query, params)
+        return [dict(zip(result.columns, fila)) for fila in result.fetchall()]
+
+    async def ejecutar(self, nombre, params=None):
+        return await self.execute(obtener(nombre).sql(ORACLE), params)
+
+    async def fetch_dicts_nombre(self, nombre, params=None, preparar_cursor=None):
+        return await self.fetch_dicts(obtener(nombre).sql(ORACLE), params, preparar_cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._session, nombre)
+
+
+def instalar_oracle_falso():
+    """Sustituye Cuenca por el Oracle falso en todo el proceso"""
+    from app.database.oracle_connection import OracleConnection
+    from app.database.postgres_connection import PostgresConnection
+    from app.database.pool_registry import PoolRegistry
+
+    @asynccontextmanager
+    async def get_session(self, slo=True):
+        async with PostgresConnection(db_number=1).get_session(slo) as session:
+            yield SesionOracleFalsa(session)
+
+    async def sin_pool_oracle(self):
+        raise RuntimeError("Cuenca sustituido por Oracle falso (benchmarks)")
+
+    OracleConnection.get_session = get_session
+    PoolRegistry._create_oracle_pool = sin_pool_oracle
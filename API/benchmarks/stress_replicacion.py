@@ -0,0 +1,95 @@
+"""Prueba de estrés de los enlaces de replicación
+
+Escribe a ritmo creciente en Guayaquil y Quito con varios escritores
+concurrentes (usando los métodos de inserción de los servicios), mientras
+muestrea lag y conteo de filas en los destinos. Informa throughput
+sostenido, curva de lag, punto de saturación y claves perdidas o
+duplicadas. El resultado completo se guarda en JSON.
+
+Uso (desde API/):
+    python benchmarks/stress_replicacion.py --tasas 1,2,5,10 --duracion 30 --escritores 4
+    python benchmarks/stress_replicacion.py --enlaces quito_cuenca --salida quito_cuenca.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from app.database.pool_registry import pool_registry  # noqa: E402
+from app.services.metricas_replicacion import ENLACES  # noqa: E402
+from app.services.prueba_carga import ConfigPrueba, ejecutar_prueba  # noqa: E402
+
+
+def imprimir_resumen(resultado: dict):
+    for enlace, r in resultado["enlaces"].items():
+        print(f"\n== {enlace} ==")
+        if "error" in r:
+            print(f"  error: {r['error']}")
+            continue
+        print(f"  throughput sostenido: {r['throughput_sostenido_filas_por_s']} filas/s"
+              f"  (errores de escritura: {r['errores_escritura']})")
+        print(f"  {'tasa':>6} {'origen/s':>9} {'destino/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'sin rep.':>9}")
+        for p in r["pasos"]:
+            print(f"  {p['tasa_objetivo']:>6} {p['filas_por_s_origen']:>9} {p['filas_por_s_destino']:>10} "
+                  f"{str(p['lag_p50_ms']):>9} {str(p['lag_p95_ms']):>9} {p['sin_replicar']:>9}")
+        saturacion = r["saturacion"]
+        if saturacion:
+            print(f"  saturación: {saturacion['tasa']}/s ({saturacion['motivo']})")
+        else:
+            print("  saturación: no alcanzada")
+        v = r["verificacion"]
+        if "error" in v:
+            print(f"  verificación: error {v['error']}")
+        else:
+            print(f"  claves: {v['escritas']} escritas, {v['perdidas']['total']} perdidas, "
+                  f"{v['duplicadas_destino']['total']} duplicadas en destino")
+
+
+async def main(config: ConfigPrueba) -> dict:
+    await pool_registry.open()
+    try:
+        return await ejecutar_prueba(config)
+    finally:
+        await pool_registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--enlaces", default=",".join(ENLACES), help="Enlaces separados por coma")
+    parser.add_argument("--tasas", default="1,2,5,10", help="Escrituras/s por enlace en cada paso")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos por paso")
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--filas", type=int, default=1, help="Filas por escritura")
+    parser.add_argument("--muestreo", type=float, default=0.5, help="Intervalo de muestreo (s)")
+    parser.add_argument("--drenaje", type=float, default=30, help="Espera final a que el destino alcance (s)")
+    parser.add_argument("--salida", default="stress_replicacion.json")
+    args = parser.parse_args()
+
+    try:
+        config = ConfigPrueba(
+            enlaces=[e.strip() for e in args.enlaces.split(",") if e.strip()],
+            tasas=[float(t) for t in args.tasas.split(",")],
+            duracion_paso=args.duracion,
+            escritores=args.escritores,
+            filas_por_escritura=args.filas,
+            intervalo_muestreo=args.muestreo,
+            drenaje=args.drenaje
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    desconocidos = set(config.enlaces) - set(ENLACES)
+    if desconocidos:
+        parser.error(f"enlaces desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultado = asyncio.run(main(config))
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False, default=str)
+    imprimir_resumen(resultado)
+    print(f"\nResultado completo en {args.salida}")
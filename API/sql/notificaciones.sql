@@ -0,0 +1,56 @@
+-- Triggers de LISTEN/NOTIFY para app/services/notificaciones.py
+-- Ejecutar en Quito y en Guayaquil: crea los triggers de las tablas que existan en el nodo.
+--
+-- Triggers a nivel de sentencia: un INSERT/UPDATE/DELETE de N filas envía una
+-- sola notificación por el canal cambios_<tabla> con {"operacion", "filas"} y,
+-- si afectó una sola fila, su "id". Las tablas de transición exigen un trigger
+-- por operación.
+
+CREATE OR REPLACE FUNCTION notificar_cambio() RETURNS trigger AS $$
+DECLARE
+    cantidad bigint;
+    clave text;
+BEGIN
+    SELECT count(*), min(row_to_json(f)->>TG_ARGV[0]) INTO cantidad, clave FROM filas f;
+    IF cantidad = 0 THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('cambios_' || TG_TABLE_NAME, json_build_object(
+        'operacion', TG_OP,
+        'filas', cantidad,
+        'id', CASE WHEN cantidad = 1 THEN clave END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t record;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('peliculas_catalogo', 'pelicula_id'),
+            ('promociones', 'promocion_id'),
+            ('clientes_quito', 'cliente_id'),
+            ('clientes_guayaquil', 'cliente_id'),
+            ('empleados_principal', 'empleado_id'),
+            ('empleados_complementario', 'empleado_id')
+        ) AS tablas(tabla, columna_id)
+        WHERE to_regclass(tabla) IS NOT NULL
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS notificar_insert ON %I', t.tabla);
+        EXECUTE format('DROP TRIGGER IF EXISTS notificar_update ON %I', t.tabla);
+        EXECUTE format('DROP TRIGGER IF EXISTS notificar_delete ON %I', t.tabla);
+        EXECUTE format(
+            'CREATE TRIGGER notificar_insert AFTER INSERT ON %I REFERENCING NEW TABLE AS filas '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio(%L)', t.tabla, t.columna_id);
+        EXECUTE format(
+            'CREATE TRIGGER notificar_update AFTER UPDATE ON %I REFERENCING NEW TABLE AS filas '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio(%L)', t.tabla, t.columna_id);
+        EXECUTE format(
+            'CREATE TRIGGER notificar_delete AFTER DELETE ON %I REFERENCING OLD TABLE AS filas '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio(%L)', t.tabla, t.columna_id);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,33 @@
+"""Comparación de claves entre nodos (app.services.verificacion_claves)"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.verificacion_claves import comparar_claves  # noqa: E402
+
+# Guayaquil origina los ids 1-3; Cuenca además tiene los de Quito (100-101)
+GUAYAQUIL = {1: "a", 2: "b", 3: "c"}
+CUENCA = {1: "a", 2: "b", 3: "c", 100: "q", 101: "r"}
+
+
+def test_filas_de_quito_en_cuenca_no_son_sobrantes():
+    reporte = comparar_claves(GUAYAQUIL, CUENCA, solo_origen=True)
+    assert reporte.sincronizado
+    assert reporte.sobrantes == []
+    assert reporte.total_destino == 5
+
+
+def test_solo_origen_sigue_detectando_faltantes_y_distintas():
+    cuenca = {1: "a", 2: "x", 100: "q"}
+    reporte = comparar_claves(GUAYAQUIL, cuenca, solo_origen=True)
+    assert not reporte.sincronizado
+    assert reporte.faltantes == [3]
+    assert reporte.distintas == [2]
+    assert reporte.sobrantes == []
+
+
+def test_replica_completa_reporta_sobrantes():
+    reporte = comparar_claves(GUAYAQUIL, CUENCA)
+    assert reporte.sobrantes == [100, 101]
+    assert not reporte.sincronizado
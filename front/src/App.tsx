@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import Header from './components/Header';
 import DatabaseButton from './components/DatabaseButton';
 import ResultsPanel from './components/ResultsPanel';
@@ -34,6 +34,31 @@ interface Node {
   records: number;
 }
 
+const API_URL = 'http://localhost:8000';
+
+// Consulta del trabajo cada segundo, como máximo durante 5 minutos
+const INTERVALO_TRABAJO_MS = 1000;
+const ESPERA_MAXIMA_TRABAJO_MS = 5 * 60 * 1000;
+
+// Las evidencias de replicación responden 202 con un trabajo; se consulta hasta que termine
+const esperarResultado = async (response: Response) => {
+  if (response.status !== 202) return response.json();
+  const trabajo = await response.json();
+  if (!trabajo?.url) throw new Error("Respuesta 202 sin URL del trabajo");
+  const limite = Date.now() + ESPERA_MAXIMA_TRABAJO_MS;
+  while (Date.now() < limite) {
+    await new Promise((resolver) => setTimeout(resolver, INTERVALO_TRABAJO_MS));
+    const consulta = await fetch(`${API_URL}${trabajo.url}`);
+    // 404: el trabajo expiró (TRABAJOS_TTL) o, con TRABAJOS_BACKEND=memoria, el servidor se reinició
+    // o la consulta llegó a otro worker
+    if (!consulta.ok) throw new Error(`El trabajo ${trabajo.id} no está disponible (HTTP ${consulta.status})`);
+    const estado = await consulta.json();
+    if (estado.estado === 'completado') return estado.resultado;
+    if (estado.estado === 'fallido') throw new Error(estado.error);
+  }
+  throw new Error(`El trabajo ${trabajo.id} no terminó en ${ESPERA_MAXIMA_TRABAJO_MS / 1000}s`);
+};
+
 function App() {
   console.log("App cargada");
 
@@ -53,9 +78,9 @@ function App() {
   const [mostrarTablas, setMostrarTablas] = useState(false);
 
   const [nodes, setNodes] = useState<Node[]>([
-    { id: 'quito', name: 'Quito', status: 'online', dbms: 'PostgreSQL 17', records: 1250 },
-    { id: 'guayaquil', name: 'Guayaquil', status: 'online', dbms: 'PostgreSQL 17', records: 1250 },
-    { id: 'cuenca', name: 'Cuenca', status: 'online', dbms: 'Oracle 21c', records: 1250 }
+    { id: 'quito', name: 'Quito', status: 'online', dbms: 'PostgreSQL 17', records: 0 },
+    { id: 'guayaquil', name: 'Guayaquil', status: 'online', dbms: 'PostgreSQL 17', records: 0 },
+    { id: 'cuenca', name: 'Cuenca', status: 'online', dbms: 'Oracle 21c', records: 0 }
   ]);
 
 
@@ -84,6 +109,58 @@ function App() {
     }, 2000);
   };
 
+  // Estado, latencia y filas estimadas de los nodos (sondeo en segundo plano de la API)
+  useEffect(() => {
+    const actualizarNodos = async () => {
+      try {
+        const { nodos } = await (await fetch(`${API_URL}/api/v1/nodos/estado`)).json();
+        setNodes(prev => prev.map(n => {
+          const estado = nodos[n.id];
+          if (!estado || estado.estado === 'desconocido') return n;
+          return { ...n, status: estado.estado === 'activo' ? 'online' : 'offline', records: estado.filas_estimadas };
+        }));
+      } catch (error) {
+        console.error('❌ Error al obtener el estado de los nodos:', error);
+      }
+    };
+    actualizarNodos();
+    const intervalo = setInterval(actualizarNodos, 10000);
+    return () => clearInterval(intervalo);
+  }, []);
+
+  // Cambios en vivo (LISTEN/NOTIFY de los nodos PostgreSQL vía SSE)
+  useEffect(() => {
+    const eventos = new EventSource('http://localhost:8000/api/v1/eventos/stream');
+
+    eventos.addEventListener('estado', (e) => {
+      const { nodo, escuchando } = JSON.parse((e as MessageEvent).data);
+      setNodes(prev => prev.map(n =>
+        n.id === nodo ? { ...n, status: escuchando ? 'online' : 'offline' } : n
+      ));
+    });
+
+    eventos.addEventListener('cambio', (e) => {
+      const cambio = JSON.parse((e as MessageEvent).data);
+      setNodes(prev => prev.map(n =>
+        n.id === cambio.nodo ? { ...n, status: 'syncing' } : n
+      ));
+      setTimeout(() => {
+        setNodes(prev => prev.map(n =>
+          n.id === cambio.nodo && n.status === 'syncing' ? { ...n, status: 'online' } : n
+        ));
+      }, 1500);
+      // Los cambios llegan agrupados por tabla y operación: `cantidad` filas, con los primeros `ids`
+      const filas = cambio.cantidad ?? cambio.filas;
+      addOperation(
+        'Cambio notificado',
+        `${cambio.operacion ?? 'Cambio'} en ${cambio.tabla} (${cambio.nodo})${filas > 1 ? `: ${filas} filas` : ''}`,
+        cambio.id ? `ID: ${cambio.id}` : cambio.ids?.length ? `IDs: ${cambio.ids.join(', ')}` : undefined
+      );
+    });
+
+    return () => eventos.close();
+  }, []);
+
 // Fragmentación horizontal Datos
     const handleFragmentacionHorizontal = async () => {
      if (!clientesCargados) {
@@ -140,13 +217,13 @@ function App() {
 const handleReplicacion = async (origen: string, destino: string) => {
   try {
     const cantidadRegistros = 1;
-    const response = await fetch(`http://localhost:8000/api/v1/replicacion-bidireccional?nodo_para_insertar=${origen}&cantidad_registros=${cantidadRegistros}`, {
+    const response = await fetch(`http://localhost:8000/api/v1/replicacion-bidireccional?nodo_para_insertar=${origen}&cantidad_registros=${cantidadRegistros}&incluir_tablas=true`, {
       method: "POST"
     });
 
     if (!response.ok) throw new Error("Fallo en la replicación");
 
-    const resultado = await response.json();
+    const resultado = await esperarResultado(response);
     const antes = resultado.evidencia_replicacion_bidireccional["1_estado_antes"];
     const despues = resultado.evidencia_replicacion_bidireccional["3_estado_despues"];
 
@@ -179,13 +256,13 @@ const handleReplicacion = async (origen: string, destino: string) => {
 const handleReplicacionUnidireccionalQuitoCuenca = async () => {
   try {
     const cantidad = 1; // siempre será 1 como pediste
-    const response = await fetch(`http://localhost:8000/api/v1/replicacion-unidireccional/quito-cuenca?cantidad=${cantidad}`, {
+    const response = await fetch(`http://localhost:8000/api/v1/replicacion-unidireccional/quito-cuenca?cantidad=${cantidad}&incluir_tablas=true`, {
       method: 'POST'
     });
 
     if (!response.ok) throw new Error("Error en la replicación Quito → Cuenca");
 
-    const data = await response.json();
+    const data = await esperarResultado(response);
 
     // Extraer estado antes y después para Cuenca
     const antes = data.tablas_antes.cuenca_peliculas;
@@ -210,13 +287,13 @@ const handleReplicacionUnidireccionalQuitoCuenca = async () => {
 const handleReplicacionUnidireccionalGuayaquilCuenca = async () => {
   try {
     const cantidad = 1; // igual que en el otro caso
-    const response = await fetch(`http://localhost:8000/api/v1/replicacion-unidireccional/guayaquil-cuenca?cantidad=${cantidad}`, {
+    const response = await fetch(`http://localhost:8000/api/v1/replicacion-unidireccional/guayaquil-cuenca?cantidad=${cantidad}&incluir_tablas=true`, {
       method: 'POST'
     });
 
     if (!response.ok) throw new Error("Error en la replicación Guayaquil → Cuenca");
 
-    const data = await response.json();
+    const data = await esperarResultado(response);
 
     // Extraer estado antes y después para Cuenca
     const antes = data.tablas_antes.cuenca_peliculas;